@@ -0,0 +1,229 @@
+"""
+End-to-end throughput and latency with deterministic fake OpenAI, Whisper and Azure TTS.
+
+Scenarios:
+    graph  - the chatbot graph alone (chatbot.ainvoke)
+    chat   - POST /api/chat/message through the FastAPI app
+    voice  - POST /api/voice/chat (transcription + chat) through the FastAPI app
+
+The app runs in-process behind httpx's ASGI transport; its OpenAI client talks
+HTTP to FakeOpenAIServer (see fakes.py) and TTS is FakeTTSProvider, so no
+network or credentials are needed. Every request uses a different message and
+audio, so response and transcript caches don't hide the pipeline's cost.
+
+Usage:
+    python benchmarks/e2e.py [--scenarios graph chat voice] [--requests 200] [--concurrency 8]
+    python benchmarks/e2e.py --output e2e_baseline.json
+    python benchmarks/e2e.py --baseline e2e_baseline.json [--tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import (  # noqa: E402
+    FakeOpenAIServer,
+    FakeTTSProvider,
+    LatencyModel,
+    install_fakes,
+    wav_bytes,
+)
+
+SCENARIOS = ["graph", "chat", "voice"]
+MESSAGES = [
+    "I feel sad and lonely today",
+    "I had a great day at school",
+    "My brother broke my toy and I am so mad",
+    "I am nervous about my test tomorrow",
+    "What should we talk about",
+]
+
+
+def percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(latencies, errors: int, elapsed: float, concurrency: int):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(ordered, 0.5) * 1000,
+        "p90_ms": percentile(ordered, 0.9) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+    }
+
+
+async def run_load(send, requests: int, concurrency: int, warmup: int):
+    """
+    Call send(i) for i in range(requests) with `concurrency` workers.
+
+    send returns True on success. The first `warmup` requests are not measured.
+    """
+    for i in range(warmup):
+        await send(-1 - i)
+
+    latencies, errors = [], 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                ok = await send(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start, concurrency)
+
+
+def message(index: int) -> str:
+    return f"{MESSAGES[index % len(MESSAGES)]} (request {index})"
+
+
+def audio(index: int) -> bytes:
+    data = bytearray(wav_bytes(1.0))
+    data[44:48] = (index % 2**31).to_bytes(4, "little", signed=True)  # Distinct PCM per request
+    return bytes(data)
+
+
+def scenario_graph():
+    from miramind.llm.langgraph.chatbot import get_chatbot
+
+    graph = get_chatbot()
+
+    async def send(index: int) -> bool:
+        state = await graph.ainvoke({"user_input": message(index), "chat_history": []})
+        return bool(state.get("response")) and not state.get("degraded")
+
+    return send
+
+
+def scenario_http(path: str):
+    import httpx
+
+    from miramind.api.main import app
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def send(index: int) -> bool:
+        if path == "/api/voice/chat":
+            payload = {"audioData": base64.b64encode(audio(index)).decode(), "chatHistory": []}
+        else:
+            payload = {"userInput": message(index), "chatHistory": []}
+        payload["sessionId"] = f"bench-{index % 16}"
+        response = await client.post(path, json=payload, timeout=60)
+        return response.status_code == 200 and not response.json().get("degraded")
+
+    return send
+
+
+def build_scenario(name: str):
+    if name == "graph":
+        return scenario_graph()
+    return scenario_http({"chat": "/api/chat/message", "voice": "/api/voice/chat"}[name])
+
+
+def compare(results, baseline, tolerance: float) -> bool:
+    ok = True
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for key, higher_is_better in (
+            ("throughput_rps", True),
+            ("p50_ms", False),
+            ("p99_ms", False),
+        ):
+            change = result[key] / before[key] - 1 if before[key] else 0.0
+            regressed = -change > tolerance if higher_is_better else change > tolerance
+            ok = ok and not regressed
+            print(
+                f"{name:<6} {key:<15} {before[key]:>10.1f} -> {result[key]:>10.1f} ({change:+.0%})"
+                f" {'REGRESSION' if regressed else 'ok'}"
+            )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--llm-median-ms", type=float, default=300.0)
+    parser.add_argument("--llm-sigma", type=float, default=0.3)
+    parser.add_argument("--llm-tail-probability", type=float, default=0.01)
+    parser.add_argument("--llm-tail-ms", type=float, default=2000.0)
+    parser.add_argument("--stt-median-ms", type=float, default=400.0)
+    parser.add_argument("--tts-median-ms", type=float, default=250.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON from a previous --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed change (0.2=20%%)")
+    args = parser.parse_args()
+
+    chat_latency = LatencyModel(
+        args.llm_median_ms, args.llm_sigma, args.llm_tail_probability, args.llm_tail_ms, args.seed
+    )
+    stt_latency = LatencyModel(args.stt_median_ms, seed=args.seed + 1)
+    tts_latency = LatencyModel(args.tts_median_ms, seed=args.seed + 2)
+    server = FakeOpenAIServer(chat_latency=chat_latency, stt_latency=stt_latency).start()
+    tts = FakeTTSProvider(tts_latency)
+
+    install_fakes(server, tts, tempfile.mkdtemp(prefix="miramind-bench-"))
+
+    results = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency": chat_latency.to_dict(),
+            "stt_latency": stt_latency.to_dict(),
+            "tts_latency": tts_latency.to_dict(),
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios:
+            send = build_scenario(name)
+            result = asyncio.run(run_load(send, args.requests, args.concurrency, args.warmup))
+            results["scenarios"][name] = result
+            print(
+                f"{name:<6} {result['throughput_rps']:>7.1f} req/s  p50 {result['p50_ms']:>7.1f} ms"
+                f"  p90 {result['p90_ms']:>7.1f} ms  p99 {result['p99_ms']:>7.1f} ms"
+                f"  errors {result['errors']}"
+            )
+        results["fake_requests"] = dict(server.requests)
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(results, baseline, args.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Deterministic local stand-ins for OpenAI (chat completions and Whisper) and Azure TTS.
+
+FakeOpenAIServer is an OpenAI-compatible HTTP server on 127.0.0.1: point the
+OpenAI SDK at it with base_url (or OPENAI_BASE_URL) and the real client, its
+HTTP stack and timeouts are exercised. Latencies are drawn from seeded
+distributions, so two runs with the same seed see the same latencies.
+FakeTTSProvider replaces AzureTTSProvider in-process (the Speech SDK has its
+own protocol) and returns fixed-size WAV audio after a sampled delay.
+
+Usage:
+    with FakeOpenAIServer(chat_latency=LatencyModel(median_ms=300)) as server:
+        client = OpenAI(api_key="fake", base_url=server.base_url)
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+EMOTIONS = ["happy", "sad", "angry", "scared", "excited", "neutral"]
+REPLY = "That sounds really important. Can you tell me a little more about how it felt?"
+TRANSCRIPT = "I had a hard day at school today"
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution.
+
+    Attributes:
+        median_ms: median latency.
+        sigma: spread of the lognormal (0 = constant latency).
+        tail_probability: share of requests that also get tail_ms added (stragglers).
+        tail_ms: extra latency of a straggler.
+    """
+
+    def __init__(
+        self,
+        median_ms: float = 0.0,
+        sigma: float = 0.3,
+        tail_probability: float = 0.0,
+        tail_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.tail_probability = tail_probability
+        self.tail_ms = tail_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """Next latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            ms = self.median_ms * math.exp(self._random.gauss(0.0, self.sigma))
+            if self._random.random() < self.tail_probability:
+                ms += self.tail_ms
+        return ms / 1000
+
+    def to_dict(self):
+        return {
+            "median_ms": self.median_ms,
+            "sigma": self.sigma,
+            "tail_probability": self.tail_probability,
+            "tail_ms": self.tail_ms,
+        }
+
+
+def wav_bytes(duration: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """Silent mono 16-bit WAV of the given duration."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(2 * int(duration * sample_rate)))
+    return buffer.getvalue()
+
+
+def _emotion_for(text: str) -> str:
+    # Same input, same emotion: runs are comparable
+    return EMOTIONS[hashlib.md5(text.encode()).digest()[0] % len(EMOTIONS)]
+
+
+def _estimate_tokens(messages) -> int:
+    return sum(len(str(message.get("content", ""))) // 4 + 4 for message in messages)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.endswith("/chat/completions"):
+            self._chat(json.loads(body))
+        elif self.path.endswith("/audio/transcriptions"):
+            time.sleep(self.server.fake.stt_latency.sample())
+            self.server.fake.count("transcriptions")
+            # Different audio, different transcript: keeps the response cache out of the way
+            self._json({"text": f"{TRANSCRIPT} ({hashlib.md5(body).hexdigest()[:8]})"})
+        else:
+            self._json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def _chat(self, request):
+        fake = self.server.fake
+        fake.count("chat_completions")
+        messages = request.get("messages", [])
+        user_text = next(
+            (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        if request.get("response_format"):
+            content = json.dumps({"emotion": _emotion_for(user_text), "confidence": 0.9})
+        else:
+            content = REPLY
+        prompt_tokens = _estimate_tokens(messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4,
+            "prompt_tokens_details": {"cached_tokens": (prompt_tokens // 1024) * 1024},
+        }
+
+        time.sleep(fake.chat_latency.sample())  # Time to first token
+        if request.get("stream"):
+            self._stream(request, content, usage)
+            return
+        self._json(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+
+    def _stream(self, request, content: str, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(payload: str):
+            data = f"data: {payload}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        words = content.split(" ")
+        for index, word in enumerate(words):
+            token = word if index == 0 else " " + word
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            event = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+            chunk(json.dumps(event))
+            time.sleep(self.server.fake.token_interval)
+        final = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        chunk(json.dumps(final))
+        chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _json(self, payload, status: int = 200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeOpenAIServer"
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI-compatible HTTP stub: /v1/chat/completions (JSON or streamed) and
+    /v1/audio/transcriptions.
+
+    Emotion requests (those with a response_format) get a structured
+    {"emotion", "confidence"} reply; others a fixed reply, streamed word by
+    word every token_interval seconds when the request asks for a stream.
+    """
+
+    def __init__(
+        self,
+        chat_latency: Optional[LatencyModel] = None,
+        stt_latency: Optional[LatencyModel] = None,
+        token_interval: float = 0.0,
+        port: int = 0,
+    ):
+        self.chat_latency = chat_latency or LatencyModel()
+        self.stt_latency = stt_latency or LatencyModel()
+        self.token_interval = token_interval
+        self.requests = {"chat_completions": 0, "transcriptions": 0}
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeTTSProvider:
+    """Stand-in for AzureTTSProvider: fixed-size WAV audio after a sampled delay."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, audio_seconds: float = 2.0):
+        self.latency = latency or LatencyModel()
+        self.audio = wav_bytes(audio_seconds)
+        self.calls = 0
+
+    def synthesize(self, input_json: str) -> bytes:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return self.audio
+
+    async def synthesize_async(self, input_json: str) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        return self.audio
+
+
+def install_fakes(server: FakeOpenAIServer, tts: FakeTTSProvider, workdir: str):
+    """
+    Point the app at the fakes and keep the files it writes in workdir.
+
+    Must run before miramind builds its OpenAI clients, i.e. before miramind.api.main
+    or the chatbot graph is first imported or built.
+    """
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.pop("MIRAMIND_TRACE_EXPORTER", None)
+    os.chdir(workdir)  # Emotion and memory logs are written to the working directory
+
+    import logging
+
+    from miramind.api import main
+    from miramind.api import rate_limit as api_rate_limit
+    from miramind.llm.langgraph import chatbot, run_chat
+
+    chatbot.get_tts_provider = lambda name="azure": tts
+    run_chat.OUTPUT_AUDIO_PATH = os.path.join(workdir, "output.wav")
+    main.SESSIONS_LOG_PATH = os.path.join(workdir, "sessions_log.json")
+    # Every virtual user shares one client IP; measure the server, not the per-client limits
+    api_rate_limit.RATE_LIMIT_IP_BURST = api_rate_limit.RATE_LIMIT_SESSION_BURST = 10**9
+    logging.getLogger("miramind").setLevel(logging.WARNING)
@@ -0,0 +1,146 @@
+"""
+Microbenchmark of per-turn LangGraph overhead with stubbed LLM and TTS.
+
+Compares the flattened chatbot graph (chatbot.get_graph) with the previous
+layout that nested one compiled subgraph per emotion flow. The stubs answer
+instantly, so the timings are framework overhead only.
+
+Usage:
+    python benchmarks/graph_overhead.py [--iterations 2000] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+from langgraph.graph import END, StateGraph  # noqa: E402
+
+from miramind.llm.langgraph import chatbot  # noqa: E402
+from miramind.llm.langgraph.state import ChatState  # noqa: E402
+from miramind.llm.langgraph.subgraphs import (  # noqa: E402
+    EMOTION_ROUTES,
+    build_angry_flow,
+    build_excited_flow,
+    build_gentle_flow,
+    build_neutral_flow,
+    build_sad_flow,
+)
+from miramind.llm.langgraph.utils import text_to_speech  # noqa: E402
+
+MESSAGES = {
+    "sad": "I feel sad and lonely today",
+    "happy": "I had a great day at school",
+    "angry": "My brother broke my toy and I am so mad",
+    "neutral": "What is the weather like",
+}
+
+
+class StubCompletions:
+    def __init__(self):
+        self.emotion = "neutral"
+
+    def create(self, messages, response_format=None, **kwargs):
+        if response_format is not None:
+            content = json.dumps({"emotion": self.emotion, "confidence": 0.9})
+        else:
+            content = "That sounds important. Tell me more."
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class StubClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=StubCompletions())
+
+
+class StubTTS:
+    def synthesize(self, input_json: str) -> bytes:
+        return b"RIFF" + bytes(1024)
+
+
+class StubEmotionLogger:
+    def log(self, *args, **kwargs):
+        pass
+
+
+def build_nested_graph():
+    """The previous layout: one compiled subgraph per flow, nested as nodes."""
+    graph = StateGraph(ChatState)
+    graph.add_node("detect_emotion", RunnableLambda(chatbot.detect_emotion))
+    builders = {
+        "sad_flow": build_sad_flow,
+        "angry_flow": build_angry_flow,
+        "excited_flow": build_excited_flow,
+        "gentle_flow": build_gentle_flow,
+        "neutral_flow": build_neutral_flow,
+    }
+    graph.add_node("text_to_speech", text_to_speech(chatbot.tts_provider))
+    for flow, builder in builders.items():
+        graph.add_node(flow, builder(chatbot.client, chatbot.emotion_logger).compile())
+        graph.add_edge(flow, "text_to_speech")
+    graph.add_edge("text_to_speech", END)
+    graph.set_entry_point("detect_emotion")
+    graph.add_conditional_edges("detect_emotion", chatbot.route_emotion, EMOTION_ROUTES)
+    return graph.compile()
+
+
+def measure(graph, client, iterations: int):
+    samples = []
+    emotions = list(MESSAGES)
+    for i in range(iterations):
+        emotion = emotions[i % len(emotions)]
+        client.chat.completions.emotion = emotion
+        state = {"user_input": MESSAGES[emotion], "chat_history": [], "memory": ""}
+        start = time.perf_counter()
+        graph.invoke(state)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    client = StubClient()
+    chatbot.client = client
+    chatbot.tts_provider = StubTTS()
+    chatbot.emotion_logger = StubEmotionLogger()
+    chatbot.local_classifier = None
+    chatbot.emotion_batcher = None
+
+    graphs = {"nested": build_nested_graph(), "flattened": chatbot.get_graph()}
+    results = {}
+    for name, graph in graphs.items():
+        measure(graph, client, args.warmup)
+        results[name] = measure(graph, client, args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'graph':<10} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['mean_us']:>10.1f} {result['p50_us']:>10.1f} "
+            f"{result['p99_us']:>10.1f}"
+        )
+    speedup = results["nested"]["mean_us"] / results["flattened"]["mean_us"]
+    print(f"flattened graph is {speedup:.2f}x faster per turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Cold-start import time of the server, the chatbot and the subprocess fallback.
+
+Each module is imported in a fresh interpreter with `python -X importtime` and
+the cumulative time of its top-level import is recorded. With --baseline the
+medians are compared to a previous --json run and the script exits non-zero
+when a module got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--json] [--top 10]
+    python benchmarks/import_time.py --json > import_baseline.json
+    python benchmarks/import_time.py --baseline import_baseline.json [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+
+MODULES = [
+    "miramind.api.main",  # server
+    "miramind.llm.langgraph.chatbot",  # tests, direct chatbot use
+    "miramind.llm.langgraph.run_chat",  # subprocess fallback
+]
+
+
+def parse_importtime(stderr: str):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_once(module: str):
+    env = {**os.environ, "PYTHONPATH": SRC, "OPENAI_API_KEY": "benchmark"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure(module: str, repeat: int, top: int):
+    totals = []
+    rows = []
+    for _ in range(repeat):
+        rows = import_once(module)
+        # The requested module is the last top-level entry; everything it pulled in is nested
+        totals.append(next(c for name, _, c, d in reversed(rows) if name == module and d == 0))
+    # Slowest direct dependencies of the last run (depth 1 = imported by a top-level module)
+    slowest = sorted((r for r in rows if r[3] == 1), key=lambda r: r[2], reverse=True)
+    return {
+        "repeat": repeat,
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "slowest": [{"module": name, "cumulative_ms": c / 1000} for name, _, c, _ in slowest[:top]],
+    }
+
+
+def compare(results, baseline, tolerance: float) -> bool:
+    ok = True
+    for module, result in results.items():
+        if module not in baseline:
+            continue
+        before, after = baseline[module]["median_ms"], result["median_ms"]
+        change = after / before - 1
+        status = "ok"
+        if change > tolerance:
+            status, ok = "REGRESSION", False
+        print(f"{module:<36} {before:>9.1f} -> {after:>9.1f} ms ({change:+.0%}) {status}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="slowest dependencies to list")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--baseline", help="JSON from a previous --json run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown (0.2=20%%)")
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.repeat, args.top) for module in args.modules}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(results, baseline, args.tolerance) else 1)
+    for module, result in results.items():
+        print(
+            f"{module:<36} median {result['median_ms']:>8.1f} ms  min {result['min_ms']:>8.1f} ms"
+        )
+        for dep in result["slowest"]:
+            print(f"    {dep['module']:<32} {dep['cumulative_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Load test: concurrent child sessions against the FastAPI app, ramping until it saturates.
+
+Each virtual user replays session scripts: POST /api/chat/start, then turns
+alternating between typed messages (/api/chat/message) and voice messages
+(/api/voice/chat), with a think time between turns and the reply's memory and
+history carried into the next turn. Concurrency goes up stage by stage; each
+stage reports turn throughput, error rate and tail latency.
+
+The saturation point is the first stage where throughput stops growing with
+concurrency (less than --min-gain more turns/s than the previous stage), p99
+exceeds --slo-ms or the error rate exceeds --max-error-rate. The stage before
+it is the most concurrent sessions the app holds.
+
+Backends are the offline stand-ins from fakes.py, so no network or credentials
+are needed.
+
+Usage:
+    python benchmarks/load_test.py [--stages 1 2 4 8 16 32] [--stage-seconds 30]
+    python benchmarks/load_test.py --think-time-ms 2000 --turns 6 --output load.json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from e2e import MESSAGES, audio, percentile  # noqa: E402
+from fakes import FakeOpenAIServer, FakeTTSProvider, LatencyModel, install_fakes  # noqa: E402
+
+
+class Recorder:
+    """Turn latencies and failures of one stage."""
+
+    def __init__(self):
+        self.latencies = {"text": [], "voice": [], "start": []}
+        self.errors = {"text": 0, "voice": 0, "start": 0}
+        self.sessions = 0
+
+    def record(self, kind: str, seconds: float, ok: bool):
+        self.latencies[kind].append(seconds)
+        self.errors[kind] += not ok
+
+    def summary(self, concurrency: int, elapsed: float):
+        turns = self.latencies["text"] + self.latencies["voice"]
+        failed = self.errors["text"] + self.errors["voice"]
+        ordered = sorted(turns)
+        result = {
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "sessions": self.sessions,
+            "turns": len(turns),
+            "throughput_tps": len(turns) / elapsed if elapsed else 0.0,
+            "error_rate": failed / len(turns) if turns else 0.0,
+            "start_errors": self.errors["start"],
+        }
+        if ordered:
+            result.update(
+                mean_ms=statistics.fmean(ordered) * 1000,
+                p50_ms=percentile(ordered, 0.5) * 1000,
+                p95_ms=percentile(ordered, 0.95) * 1000,
+                p99_ms=percentile(ordered, 0.99) * 1000,
+            )
+        for kind in ("text", "voice"):
+            if self.latencies[kind]:
+                result[f"{kind}_p99_ms"] = percentile(sorted(self.latencies[kind]), 0.99) * 1000
+        return result
+
+
+class VirtualUser:
+    """Replays session scripts until the stage ends."""
+
+    def __init__(self, client, user_id: int, args, recorder: Recorder, seed: int):
+        self.client = client
+        self.user_id = user_id
+        self.args = args
+        self.recorder = recorder
+        self.random = random.Random(seed)
+        self.turn = 0
+
+    async def _post(self, kind: str, path: str, payload=None):
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(path, json=payload, timeout=self.args.timeout)
+            body = response.json()
+            ok = response.status_code == 200 and not body.get("degraded")
+        except Exception:
+            body, ok = {}, False
+        self.recorder.record(kind, time.perf_counter() - start, ok)
+        return body if ok else None
+
+    async def _think(self):
+        if self.args.think_time_ms > 0:
+            await asyncio.sleep(self.random.expovariate(1000 / self.args.think_time_ms))
+
+    async def session(self, stop_at: float):
+        started = await self._post("start", "/api/chat/start")
+        if started is None:
+            return
+        session_id = started["sessionId"]
+        history, memory = [], ""
+        for turn in range(self.args.turns):
+            if time.monotonic() >= stop_at:
+                return
+            await self._think()
+            self.turn += 1
+            text = f"{self.random.choice(MESSAGES)} (user {self.user_id} turn {self.turn})"
+            payload = {"chatHistory": history, "memory": memory, "sessionId": session_id}
+            if turn % 2 and self.args.voice:
+                payload["audioData"] = base64.b64encode(
+                    audio(self.user_id * 1_000_000 + self.turn)
+                ).decode()
+                reply = await self._post("voice", "/api/voice/chat", payload)
+            else:
+                payload["userInput"] = text
+                reply = await self._post("text", "/api/chat/message", payload)
+            if reply is None:
+                continue
+            memory = reply.get("memory") or memory
+            history = history + [
+                {"role": "user", "content": reply.get("transcript") or text},
+                {"role": "assistant", "content": reply.get("response_text", "")},
+            ]
+        self.recorder.sessions += 1
+
+    async def run(self, stop_at: float):
+        while time.monotonic() < stop_at:
+            await self.session(stop_at)
+
+
+async def run_stage(client, concurrency: int, args, seed: int):
+    recorder = Recorder()
+    start = time.monotonic()
+    stop_at = start + args.stage_seconds
+    users = [
+        VirtualUser(client, user_id, args, recorder, seed * 10_000 + user_id)
+        for user_id in range(concurrency)
+    ]
+
+    async def arrive(user):
+        # Stagger arrivals over one think time so sessions don't move in lockstep
+        await asyncio.sleep(user.random.uniform(0, args.think_time_ms / 1000))
+        await user.run(stop_at)
+
+    await asyncio.gather(*(arrive(user) for user in users))
+    # Turns still in flight when the stage ended count towards it
+    return recorder.summary(concurrency, time.monotonic() - start)
+
+
+def find_saturation(stages, min_gain: float, slo_ms: float, max_error_rate: float):
+    """
+    Index of the first saturated stage, and why (None, None if none saturated).
+    """
+    for index, stage in enumerate(stages):
+        if stage["turns"] == 0 or stage["error_rate"] > max_error_rate:
+            return index, f"error rate {stage['error_rate']:.1%}"
+        if stage["p99_ms"] > slo_ms:
+            return index, f"p99 {stage['p99_ms']:.0f} ms over the {slo_ms:.0f} ms SLO"
+        if index and stage["throughput_tps"] < stages[index - 1]["throughput_tps"] * (1 + min_gain):
+            return index, "throughput stopped growing"
+    return None, None
+
+
+async def run(args):
+    import httpx
+
+    from miramind.api.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    stages = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        for number, concurrency in enumerate(args.stages):
+            stage = await run_stage(client, concurrency, args, args.seed + number)
+            stages.append(stage)
+            print(
+                f"{concurrency:>5} sessions {stage['throughput_tps']:>7.1f} turns/s"
+                f"  p50 {stage.get('p50_ms', 0):>7.0f} ms  p99 {stage.get('p99_ms', 0):>7.0f} ms"
+                f"  errors {stage['error_rate']:>6.1%}"
+            )
+            saturated, _ = find_saturation(stages, args.min_gain, args.slo_ms, args.max_error_rate)
+            if saturated is not None and not args.full_ramp:
+                break
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stages", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--stage-seconds", type=float, default=30.0)
+    parser.add_argument("--turns", type=int, default=6, help="turns per session")
+    parser.add_argument("--think-time-ms", type=float, default=1000.0, help="mean think time")
+    parser.add_argument("--no-voice", dest="voice", action="store_false", help="text turns only")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p99 turn latency SLO")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.1, help="throughput gain per stage")
+    parser.add_argument("--full-ramp", action="store_true", help="keep ramping past saturation")
+    parser.add_argument("--llm-median-ms", type=float, default=300.0)
+    parser.add_argument("--stt-median-ms", type=float, default=400.0)
+    parser.add_argument("--tts-median-ms", type=float, default=250.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    chat_latency = LatencyModel(args.llm_median_ms, tail_probability=0.01, tail_ms=2000.0)
+    stt_latency = LatencyModel(args.stt_median_ms, seed=args.seed + 1)
+    tts_latency = LatencyModel(args.tts_median_ms, seed=args.seed + 2)
+    server = FakeOpenAIServer(chat_latency=chat_latency, stt_latency=stt_latency).start()
+    install_fakes(server, FakeTTSProvider(tts_latency), tempfile.mkdtemp(prefix="miramind-load-"))
+
+    try:
+        stages = asyncio.run(run(args))
+    finally:
+        server.stop()
+
+    saturated, reason = find_saturation(stages, args.min_gain, args.slo_ms, args.max_error_rate)
+    if saturated is None:
+        print(f"Not saturated at {stages[-1]['concurrency']} sessions")
+        capacity = stages[-1]["concurrency"]
+    else:
+        capacity = stages[saturated - 1]["concurrency"] if saturated else 0
+        print(
+            f"Saturated at {stages[saturated]['concurrency']} sessions ({reason});"
+            f" capacity {capacity} sessions"
+        )
+
+    if args.output:
+        results = {
+            "config": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("output", "full_ramp")
+            },
+            "stages": stages,
+            "saturation": {
+                "concurrency": stages[saturated]["concurrency"] if saturated is not None else None,
+                "reason": reason,
+                "capacity": capacity,
+            },
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Admission control for chat requests: a cap on the chats being processed and a
+bounded queue in front of it.
+
+Without it every request goes straight to the chatbot, so a spike queues work
+in the thread pools until clients time out while the server still pays for the
+LLM calls. Requests beyond the queue are turned away at once with 503 and
+Retry-After, and queued requests whose client went away never reach the LLM.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Optional
+
+from fastapi import HTTPException
+
+from miramind.api.const import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_QUEUE_WAIT,
+    ADMISSION_POLL_INTERVAL,
+    ADMISSION_RETRY_AFTER,
+)
+from miramind.llm.langgraph.performance_monitor import PerformanceMonitor
+
+QUEUE_WAIT = "queue_wait"
+
+IsDisconnected = Callable[[], Awaitable[bool]]
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before its request was processed."""
+
+
+class AdmissionController:
+    """
+    Admits at most max_in_flight requests at a time; up to max_queue more wait
+    in FIFO order.
+
+    State is only touched on the event loop thread, so no lock is needed.
+
+    Attributes:
+        max_in_flight: requests processed concurrently.
+        max_queue: requests waiting for a slot; more are rejected with 503.
+        max_queue_wait: seconds a request may wait before it is rejected with 503.
+        retry_after: seconds clients are told to wait before retrying.
+        monitor: queue wait times (QUEUE_WAIT) and admitted/rejected/abandoned counts.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+        poll_interval: float = ADMISSION_POLL_INTERVAL,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.retry_after = retry_after
+        self.poll_interval = poll_interval
+        self.monitor = PerformanceMonitor(track_memory=False)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, reason: str) -> HTTPException:
+        self.monitor.increment(f"rejected.{reason}")
+        return HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def _acquire(self, is_disconnected: Optional[IsDisconnected]):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.monitor.record(QUEUE_WAIT, 0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            while not waiter.done():
+                # Wake up now and then to notice clients that went away
+                await asyncio.wait({waiter}, timeout=self.poll_interval)
+                if waiter.done():
+                    break
+                if is_disconnected is not None and await is_disconnected():
+                    self.monitor.increment("abandoned")
+                    raise ClientDisconnected()
+                if time.perf_counter() - start > self.max_queue_wait:
+                    raise self._reject("queue_timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # The slot was handed over as we gave up: pass it on
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.monitor.record(QUEUE_WAIT, time.perf_counter() - start)
+
+    def _release(self):
+        # Hand the slot straight to the next waiter, so in_flight stays the same
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, is_disconnected: Optional[IsDisconnected] = None):
+        """
+        Hold a processing slot for the duration of the block.
+
+        Raises:
+            HTTPException: 503 with Retry-After when the queue is full or the wait too long.
+            ClientDisconnected: the client went away while the request was queued.
+        """
+        await self._acquire(is_disconnected)
+        try:
+            if is_disconnected is not None and await is_disconnected():
+                self.monitor.increment("abandoned")
+                raise ClientDisconnected()
+            self.monitor.increment("admitted")
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self):
+        counters = self.monitor.get_counters()
+        wait = self.monitor.histogram(QUEUE_WAIT)
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": counters.get("admitted", 0),
+            "rejected_queue_full": counters.get("rejected.queue_full", 0),
+            "rejected_queue_timeout": counters.get("rejected.queue_timeout", 0),
+            "abandoned": counters.get("abandoned", 0),
+            "p50_queue_wait": (wait.percentile(0.5) or 0) / 1_000_000,
+            "p99_queue_wait": (wait.percentile(0.99) or 0) / 1_000_000,
+        }
+
+
+chat_admission = AdmissionController()
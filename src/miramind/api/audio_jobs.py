@@ -0,0 +1,127 @@
+"""
+Background synthesis of response audio for text-first chat replies.
+
+A job keeps the audio in every encoding synthesized for it so far (e.g. Ogg
+Opus for clients that play it, WAV for those that do not), each served as is.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from miramind.api.const import AUDIO_JOB_MAX_ENTRIES, AUDIO_JOB_TTL
+from miramind.audio.tts.audio_formats import WAV
+from miramind.shared.logger import logger
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class AudioJob:
+    """
+    State of one background audio synthesis.
+
+    Attributes:
+        text, emotion: what is synthesized, kept to add other encodings later.
+        encodings: audio by format name, in the order synthesized.
+    """
+
+    def __init__(self, job_id: str, text: str = "", emotion: str = "neutral"):
+        self.job_id = job_id
+        self.text = text
+        self.emotion = emotion
+        self.status = PENDING
+        self.encodings: Dict[str, bytes] = {}
+        self.error: Optional[str] = None
+        self.created = time.monotonic()
+
+    @property
+    def audio(self) -> Optional[bytes]:
+        """The first encoding synthesized."""
+        return next(iter(self.encodings.values()), None)
+
+
+class AudioJobStore:
+    """
+    In-memory store of audio jobs, bounded in size and age.
+
+    Attributes:
+        max_entries: maximum number of jobs kept (oldest are dropped first).
+        ttl: seconds a job (and its audio) is kept.
+    """
+
+    def __init__(self, max_entries: int = AUDIO_JOB_MAX_ENTRIES, ttl: float = AUDIO_JOB_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._jobs = OrderedDict()  # job_id -> AudioJob
+        self._lock = threading.Lock()
+
+    def create(self, text: str = "", emotion: str = "neutral") -> str:
+        """Register a pending job and return its id."""
+        job = AudioJob(uuid.uuid4().hex, text, emotion)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[AudioJob]:
+        """Get a job, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and time.monotonic() - job.created > self.ttl:
+                del self._jobs[job_id]
+                job = None
+            return job
+
+    def complete(self, job_id: str, audio: Optional[bytes], audio_format: str = WAV):
+        """
+        Store the synthesized audio in this encoding.
+
+        A job without audio is marked failed; once done, further encodings are
+        only added (a failed one leaves the job done).
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        if audio:
+            job.encodings[audio_format], job.status = audio, DONE
+        elif job.status != DONE:
+            job.error, job.status = "No audio generated", FAILED
+
+    def fail(self, job_id: str, error: str):
+        job = self.get(job_id)
+        if job is not None:
+            job.error, job.status = error, FAILED
+
+    def clear(self):
+        with self._lock:
+            self._jobs.clear()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+async def run_audio_job(
+    store: AudioJobStore,
+    job_id: str,
+    synthesize: Callable[..., Awaitable[bytes]],
+    *args,
+    audio_format: str = WAV,
+):
+    """
+    Run synthesize(*args, audio_format=audio_format) and store its audio under job_id.
+
+    The same audio_format is used for synthesis and storage, so they cannot disagree.
+
+    Meant to be scheduled with FastAPI BackgroundTasks after the text reply is sent.
+    """
+    try:
+        audio = await synthesize(*args, audio_format=audio_format)
+        store.complete(job_id, audio, audio_format)
+    except Exception as e:
+        logger.error(f"Audio job {job_id} failed: {e}")
+        store.fail(job_id, str(e))
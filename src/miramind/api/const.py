@@ -14,6 +14,11 @@ NEXTJS_STATIC_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "frontend", ".next", "static")
 )
 
+# Call sessions and their messages (GET /api/transcripts reads them back)
+SESSIONS_LOG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "sessions_log.json")
+)
+
 # Path to the chat script
 SCRIPT_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "llm", "langgraph", "run_chat.py")
@@ -27,3 +32,26 @@ CORS_ALLOW_HEADERS = ["*"]
 
 # Timeout settings
 SCRIPT_EXECUTION_TIMEOUT = 30  # Reduced from 60 seconds for faster failure detection
+CHAT_REQUEST_DEADLINE = 15.0  # Seconds a chat request may spend on LLM calls
+
+# Admission control of chat requests (api/admission.py)
+ADMISSION_MAX_IN_FLIGHT = 8  # Chats processed at once
+ADMISSION_MAX_QUEUE = 32  # Chats waiting for a slot; more get 503
+ADMISSION_MAX_QUEUE_WAIT = 10.0  # Seconds a chat may wait for a slot before it gets 503
+ADMISSION_RETRY_AFTER = 2  # Retry-After (seconds) sent with 503
+ADMISSION_POLL_INTERVAL = 0.25  # Seconds between checks for disconnected queued clients
+
+# Per-client rate limits (api/rate_limit.py), in upstream calls: a turn is charged what it costs
+CHAT_REQUEST_COST = 3  # Emotion detection, reply and TTS
+VOICE_REQUEST_COST = 4  # The same plus transcription
+RATE_LIMIT_SESSION_PER_MINUTE = 60  # About 20 turns a minute per session
+RATE_LIMIT_SESSION_BURST = 15  # Turns in quick succession before smoothing starts
+RATE_LIMIT_IP_PER_MINUTE = 600  # Per client IP (several sessions may share one, e.g. a school)
+RATE_LIMIT_IP_BURST = 60
+RATE_LIMIT_MAX_DELAY = 2.0  # Seconds a request over the rate is delayed before it gets 429
+
+# Text-first replies: synthesized audio kept for the client to fetch
+AUDIO_JOB_TTL = 300  # seconds
+AUDIO_JOB_MAX_ENTRIES = 256
+# Encoding when the client's Accept names none; "ogg_opus" and "mp3" are ~10x smaller
+AUDIO_JOB_FORMAT = "wav"
@@ -5,18 +5,24 @@ import subprocess
 import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from queue import Queue
 from typing import Optional
 
-from fastapi import BackgroundTasks, FastAPI, File, HTTPException, UploadFile
+from fastapi import BackgroundTasks, FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from openai import OpenAI
 from pydantic import BaseModel
 
+from miramind.api.admission import ClientDisconnected, chat_admission
+from miramind.api.audio_jobs import FAILED, PENDING, AudioJobStore, run_audio_job
 from miramind.api.const import (
+    AUDIO_JOB_FORMAT,
+    CHAT_REQUEST_COST,
+    CHAT_REQUEST_DEADLINE,
     CORS_ALLOW_CREDENTIALS,
     CORS_ALLOW_HEADERS,
     CORS_ALLOW_METHODS,
@@ -25,22 +31,48 @@ from miramind.api.const import (
     NEXTJS_STATIC_PATH,
     SCRIPT_EXECUTION_TIMEOUT,
     SCRIPT_PATH,
+    SESSIONS_LOG_PATH,
+    VOICE_REQUEST_COST,
 )
+from miramind.api.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from miramind.api.metrics import MetricsMiddleware, render_metrics
+from miramind.api.rate_limit import throttle
+from miramind.api.tracing import TracingMiddleware
+from miramind.audio.stt.stt_cache import TranscriptCache, transcribe_with_cache
 from miramind.audio.stt.stt_class import STT
 from miramind.audio.stt.stt_threads import timed_listen_and_transcribe
+from miramind.audio.tts.audio_formats import (
+    AUDIO_FORMATS,
+    negotiate_audio_format,
+    requested_audio_format,
+)
 
 # Import chatbot directly for faster processing
-from miramind.llm.langgraph.chatbot import get_chatbot
-from miramind.llm.langgraph.run_chat import process_chat_message_async
+from miramind.llm.langgraph.chatbot import get_chatbot, get_emotion_classifier_stats
+from miramind.llm.langgraph.context_builder import trim_history
+from miramind.llm.langgraph.emotion_parser import get_parse_stats
+from miramind.llm.langgraph.performance_monitor import get_performance_monitor
+from miramind.llm.langgraph.run_chat import (
+    process_chat_message_async,
+    synthesize_response_audio,
+)
+from miramind.llm.langgraph.utils import (
+    DEFAULT_CANNED_REPLY,
+    get_openai_stats,
+    openai_breaker,
+)
+from miramind.shared.circuit_breaker import CircuitOpenError, get_breaker_stats
+from miramind.shared.env import load_env
 from miramind.shared.logger import logger
+from miramind.shared.rate_limit import get_rate_limit_stats
+from miramind.shared.tracing import configure_from_env as configure_tracing
 
 app = FastAPI()
 
 # Initialize OpenAI client for STT
 try:
-    from dotenv import load_dotenv
-
-    load_dotenv()
+    load_env()
+    configure_tracing()
 
     # Fix SSL certificate issue on Windows
     import ssl
@@ -79,6 +111,10 @@ app.add_middleware(
     allow_headers=CORS_ALLOW_HEADERS,
 )
 
+# Outermost, so request latencies and traces include the other middleware
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 
 # Input model for chat
 class ChatInput(BaseModel):
@@ -86,6 +122,7 @@ class ChatInput(BaseModel):
     chatHistory: list = []
     memory: str = ""
     sessionId: str = None  # Add session tracking
+    deferAudio: bool = False  # Reply with text first, fetch audio from audio_url
 
 
 # New input model for voice recording
@@ -110,6 +147,18 @@ current_session_id = None
 # Store for ongoing voice recordings
 voice_recordings = {}  # session_id -> recording_data
 
+# Transcripts of recently uploaded audio (clients retry uploads after network hiccups)
+transcript_cache = TranscriptCache()
+
+# Audio of text-first replies, synthesized after the text is returned
+audio_jobs = AudioJobStore()
+
+# Stage timings and cache counters, exported by /metrics
+perf_monitor = get_performance_monitor()
+
+# The event loop's default executor (set on startup), so /metrics can report its queue
+default_executor = ThreadPoolExecutor(thread_name_prefix="default")
+
 
 @app.post("/api/chat/start")
 async def start_call():
@@ -124,9 +173,7 @@ async def start_call():
     logger.info(f"Starting new chat session: {current_session_id}")
 
     # Save session start to a sessions file
-    sessions_log_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sessions_log.json"
-    )
+    sessions_log_path = SESSIONS_LOG_PATH
 
     session_data = {
         "sessionId": current_session_id,
@@ -178,6 +225,50 @@ async def get_audio_file():
         return JSONResponse(status_code=404, content={"error": "Audio file not found"})
 
 
+@app.get("/api/audio/jobs/{job_id}")
+async def get_audio_job(job_id: str, request: Request):
+    """
+    Audio of a text-first reply: 202 while it is being synthesized, then the audio file.
+
+    Served in the encoding the Accept header prefers among those already
+    synthesized; an accepted encoding the job does not have yet is synthesized
+    on first request and kept for the next.
+    """
+    job = audio_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Audio job not found"})
+    if job.status == PENDING:
+        return JSONResponse(status_code=202, content={"status": job.status})
+    if job.status == FAILED:
+        return JSONResponse(status_code=500, content={"status": job.status, "error": job.error})
+
+    accept = request.headers.get("accept")
+    audio_format = negotiate_audio_format(accept, job.encodings)
+    if audio_format is None:
+        audio_format = negotiate_audio_format(accept, AUDIO_FORMATS)
+        if audio_format is None:
+            media_types = [f.media_type for f in AUDIO_FORMATS.values()]
+            return JSONResponse(
+                status_code=406,
+                content={"error": "No acceptable audio format", "available": media_types},
+            )
+        try:
+            audio = await synthesize_response_audio(job.text, job.emotion, audio_format)
+        except Exception as e:
+            logger.error(f"Audio job {job_id} {audio_format} encoding failed: {e}")
+            return JSONResponse(status_code=500, content={"status": FAILED, "error": str(e)})
+        audio_jobs.complete(job_id, audio, audio_format)
+        if not audio:
+            return JSONResponse(
+                status_code=500, content={"status": FAILED, "error": "No audio generated"}
+            )
+    return Response(
+        content=job.encodings[audio_format],
+        media_type=AUDIO_FORMATS[audio_format].media_type,
+        headers={"Vary": "Accept"},
+    )
+
+
 @app.get("/output.wav")
 async def get_audio_file_simple():
     """Simple endpoint to serve the audio file"""
@@ -196,12 +287,28 @@ async def get_audio_file_simple():
         return JSONResponse(status_code=404, content={"error": "Audio file not found"})
 
 
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected(request: Request, exc: ClientDisconnected):
+    # Nobody reads this; 499 (client closed request) keeps these apart in the metrics
+    return Response(status_code=499)
+
+
 @app.post("/api/chat/message")
-async def chat_message(input: ChatInput, background_tasks: BackgroundTasks):
+async def chat_message(input: ChatInput, background_tasks: BackgroundTasks, request: Request):
+    """Chat reply, rate limited per client and admitted through chat_admission"""
+    await throttle(request, input.sessionId or current_session_id, CHAT_REQUEST_COST)
+    async with chat_admission.admit(request.is_disconnected):
+        return await _chat_message(input, background_tasks, request.headers.get("accept"))
+
+
+async def _chat_message(
+    input: ChatInput, background_tasks: BackgroundTasks, accept: Optional[str] = None
+):
     global current_session_id
     logger.info(f"Received chat message: {input.userInput}")
 
     start_time = time.time()
+    deadline = time.monotonic() + CHAT_REQUEST_DEADLINE
 
     try:
         # Check cache first
@@ -210,19 +317,24 @@ async def chat_message(input: ChatInput, background_tasks: BackgroundTasks):
             cached_data, timestamp = api_response_cache[cache_key]
             if _is_cache_valid(timestamp):
                 logger.info(f"API cache hit for: {input.userInput[:30]}...")
+                perf_monitor.increment("api_response_cache.hits")
                 cached_data["processing_time"] = time.time() - start_time
                 cached_data["cached"] = True
                 return cached_data
+        perf_monitor.increment("api_response_cache.misses")
 
         # Use direct async chatbot call for much faster processing
-        # Optimize chat history - only keep last 6 messages for faster processing
-        optimized_history = (
-            input.chatHistory[-6:] if len(input.chatHistory) > 6 else input.chatHistory
-        )
+        # Keep only the recent history that fits the prompt token budget
+        optimized_history = trim_history(input.chatHistory)
 
         # Call chatbot directly using async version
         result = await process_chat_message_async(
-            user_input_text=input.userInput, chat_history=optimized_history, memory=input.memory
+            user_input_text=input.userInput,
+            chat_history=optimized_history,
+            memory=input.memory,
+            session_id=input.sessionId or current_session_id,
+            defer_audio=input.deferAudio,
+            deadline=deadline,
         )
 
         processing_time = time.time() - start_time
@@ -235,9 +347,34 @@ async def chat_message(input: ChatInput, background_tasks: BackgroundTasks):
             "memory": result.get("memory", input.memory),
             "processing_time": processing_time,
         }
-
-        # Cache the response
-        api_response_cache[cache_key] = (response_data, time.time())
+        if result.get("degraded"):
+            response_data["degraded"] = True
+
+        if (
+            input.deferAudio
+            and response_data["response_text"]
+            and not result.get("audio_file_path")
+        ):
+            # Synthesize after the response is sent; the client polls audio_url.
+            # "Accept: application/json, audio/ogg" asks for the audio as Ogg Opus.
+            audio_format = requested_audio_format(accept) or AUDIO_JOB_FORMAT
+            response_text = response_data["response_text"]
+            emotion = result.get("emotion", "neutral")
+            job_id = audio_jobs.create(response_text, emotion)
+            background_tasks.add_task(
+                run_audio_job,
+                audio_jobs,
+                job_id,
+                synthesize_response_audio,
+                response_text,
+                emotion,
+                audio_format=audio_format,
+            )
+            response_data["audio_job_id"] = job_id
+            response_data["audio_url"] = f"/api/audio/jobs/{job_id}"
+        elif not response_data.get("degraded"):
+            # Cache the response
+            api_response_cache[cache_key] = (response_data, time.time())
 
         # Add background task for session logging (non-blocking)
         if current_session_id:
@@ -254,6 +391,15 @@ async def chat_message(input: ChatInput, background_tasks: BackgroundTasks):
 
     except Exception as e:
         logger.error(f"Optimized chatbot error: {e}")
+        if openai_breaker.is_open:
+            # The subprocess would call the same failing API: reply without it
+            return {
+                "response_text": DEFAULT_CANNED_REPLY,
+                "audio_file_path": None,
+                "memory": input.memory,
+                "processing_time": time.time() - start_time,
+                "degraded": True,
+            }
         # Fallback to subprocess if direct call fails
         return await chat_message_fallback(input)
 
@@ -267,7 +413,7 @@ async def chat_message_fallback(input: ChatInput):
         input_json = json.dumps(
             {
                 "text": input.userInput,
-                "chat_history": input.chatHistory[-4:],  # Limit context for faster processing
+                "chat_history": trim_history(input.chatHistory),
                 "memory": input.memory,
             }
         )
@@ -323,9 +469,7 @@ async def save_message_to_session_async(
     try:
         from datetime import datetime
 
-        sessions_log_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sessions_log.json"
-        )
+        sessions_log_path = SESSIONS_LOG_PATH
 
         if not os.path.exists(sessions_log_path):
             return
@@ -381,9 +525,7 @@ async def save_message_to_session(
     try:
         from datetime import datetime
 
-        sessions_log_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sessions_log.json"
-        )
+        sessions_log_path = SESSIONS_LOG_PATH
 
         if not os.path.exists(sessions_log_path):
             return
@@ -417,9 +559,7 @@ async def get_transcripts():
     """Get all conversation transcripts from session logs, grouped by actual call sessions"""
     try:
         # Path to sessions log file
-        sessions_log_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sessions_log.json"
-        )
+        sessions_log_path = SESSIONS_LOG_PATH
 
         if not os.path.exists(sessions_log_path):
             logger.warning(f"Sessions log file not found: {sessions_log_path}")
@@ -526,6 +666,46 @@ async def debug_files():
     return info
 
 
+@app.get("/api/debug/emotion-classifier")
+async def debug_emotion_classifier():
+    """Debug endpoint with local emotion classifier and reply parsing metrics"""
+    return {**get_emotion_classifier_stats(), "parsing": get_parse_stats()}
+
+
+@app.get("/api/debug/openai")
+async def debug_openai():
+    """Debug endpoint with OpenAI hedging, retry and deadline metrics"""
+    return get_openai_stats()
+
+
+@app.get("/api/debug/circuit-breakers")
+async def debug_circuit_breakers():
+    """Debug endpoint with the state of each dependency's circuit breaker"""
+    return get_breaker_stats()
+
+
+@app.get("/api/debug/admission")
+async def debug_admission():
+    """Debug endpoint with chat admission control: slots, queue, rejections and queue wait"""
+    return chat_admission.get_stats()
+
+
+@app.get("/api/debug/rate-limits")
+async def debug_rate_limits():
+    """Debug endpoint with requests allowed, delayed and rejected by each rate limiter"""
+    return get_rate_limit_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request latencies, stage timings, caches, queues and breakers"""
+    body = render_metrics(
+        caches={"transcript": (transcript_cache.hits, transcript_cache.misses)},
+        executors={"default": default_executor},
+    )
+    return Response(content=body, media_type=METRICS_CONTENT_TYPE)
+
+
 # Removed duplicate endpoints - using new voice endpoints instead
 
 
@@ -543,26 +723,30 @@ async def upload_voice(file: UploadFile = File(...)):
         # Read audio data
         audio_data = await file.read()
 
-        # Create STT instance and transcribe
+        # Create STT instance and transcribe (repeated uploads are served from cache)
         stt = STT(client=openai_client, logger=logger)
+        with perf_monitor.track_operation("stt"):
+            # In a thread: fingerprinting decodes the audio and the STT request blocks
+            transcript_result, cached = await asyncio.to_thread(
+                transcribe_with_cache,
+                stt,
+                audio_data,
+                transcript_cache,
+                name=file.filename or "audio.wav",
+            )
 
-        # Create a file-like object for the STT
-        import io
-
-        audio_buffer = io.BytesIO(audio_data)
-        audio_buffer.name = file.filename or "audio.wav"
-
-        # Transcribe the audio
-        transcript_result = stt.transcribe_bytes(audio_buffer)
-
-        logger.info(f"Voice transcription: {transcript_result}")
+        logger.info(f"Voice transcription: {transcript_result} (cached: {cached})")
 
         return {
             "transcript": transcript_result.get("transcript", ""),
             "filename": file.filename,
             "success": True,
+            "cached": cached,
         }
 
+    except CircuitOpenError as e:
+        # Speech-to-text is failing: answer right away instead of waiting for its timeout
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Voice upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -677,46 +861,63 @@ async def record_and_transcribe(input: VoiceRecordingInput):
 
 
 @app.post("/api/voice/chat")
-async def voice_chat(input: VoiceChatInput, background_tasks: BackgroundTasks):
+async def voice_chat(input: VoiceChatInput, background_tasks: BackgroundTasks, request: Request):
     """Process voice input and return chat response with optimizations"""
+    await throttle(request, input.sessionId or current_session_id, VOICE_REQUEST_COST)
+    async with chat_admission.admit(request.is_disconnected):
+        return await _voice_chat(input, background_tasks, request.is_disconnected)
+
+
+async def _voice_chat(input: VoiceChatInput, background_tasks: BackgroundTasks, is_disconnected):
     global current_session_id
 
     if not openai_client:
         raise HTTPException(status_code=500, detail="OpenAI client not initialized")
 
     start_time = time.time()
+    # Transcription counts against the same budget as the chat reply
+    deadline = time.monotonic() + CHAT_REQUEST_DEADLINE
 
     try:
         transcript = ""
+        transcript_cached = False
 
         # If audio data provided, transcribe it first
         if input.audioData:
             import base64
-            import io
 
             # Decode base64 audio data
             audio_bytes = base64.b64decode(input.audioData)
-            audio_buffer = io.BytesIO(audio_bytes)
-            audio_buffer.name = "voice_input.wav"
 
-            # Transcribe using async if possible
+            # Transcribe, reusing the transcript of a retried upload
             stt = STT(client=openai_client, logger=logger)
-            transcript_result = stt.transcribe_bytes(audio_buffer)
+            with perf_monitor.track_operation("stt"):
+                transcript_result, transcript_cached = await asyncio.to_thread(
+                    transcribe_with_cache,
+                    stt,
+                    audio_bytes,
+                    transcript_cache,
+                    name="voice_input.wav",
+                )
             transcript = transcript_result.get("transcript", "")
 
-            logger.info(f"Voice chat transcription: {transcript}")
+            logger.info(f"Voice chat transcription: {transcript} (cached: {transcript_cached})")
 
         if not transcript:
             raise HTTPException(status_code=400, detail="No transcript available")
+        if await is_disconnected():
+            raise ClientDisconnected()  # Skip the LLM call nobody would hear
 
         # Use optimized chat processing
-        optimized_history = (
-            input.chatHistory[-6:] if len(input.chatHistory) > 6 else input.chatHistory
-        )
+        optimized_history = trim_history(input.chatHistory)
 
         # Call chatbot directly using async version
         result = await process_chat_message_async(
-            user_input_text=transcript, chat_history=optimized_history, memory=input.memory
+            user_input_text=transcript,
+            chat_history=optimized_history,
+            memory=input.memory,
+            session_id=input.sessionId or current_session_id,
+            deadline=deadline,
         )
 
         processing_time = time.time() - start_time
@@ -728,6 +929,7 @@ async def voice_chat(input: VoiceChatInput, background_tasks: BackgroundTasks):
             "audio_file_path": result.get("audio_file_path"),
             "memory": result.get("memory", input.memory),
             "transcript": transcript,
+            "transcript_cached": transcript_cached,
             "processing_time": processing_time,
         }
 
@@ -744,6 +946,10 @@ async def voice_chat(input: VoiceChatInput, background_tasks: BackgroundTasks):
 
         return response_data
 
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ClientDisconnected:
+        raise
     except Exception as e:
         logger.error(f"Voice chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -824,6 +1030,9 @@ async def periodic_cache_cleanup():
 async def startup_event():
     """Initialize services on startup"""
     try:
+        # Runs the chatbot graph's nodes and to_thread() calls
+        asyncio.get_running_loop().set_default_executor(default_executor)
+
         # Pre-initialize chatbot
         chatbot_instance = get_chatbot()
         logger.info("Chatbot pre-initialized for faster responses")
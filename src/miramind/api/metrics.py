@@ -0,0 +1,356 @@
+"""
+Prometheus text-format /metrics for the API.
+
+Request latencies per route are recorded by MetricsMiddleware; per-stage
+timings and cache counters come from the chatbot's PerformanceMonitor. Both
+keep per-thread fixed-size histograms, so a scrape only locks to list them
+and merges the buckets outside the lock.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from miramind.api.admission import QUEUE_WAIT, AdmissionController, chat_admission
+from miramind.llm.langgraph.performance_monitor import PerformanceMonitor, get_performance_monitor
+from miramind.shared.circuit_breaker import CLOSED, HALF_OPEN, OPEN, get_breaker_stats
+from miramind.shared.histogram import LogHistogram
+from miramind.shared.rate_limit import get_rate_limit_stats
+from miramind.shared.single_flight import get_single_flight_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+NAMESPACE = "miramind"
+
+# Histogram bucket bounds in seconds (the log buckets are folded into these)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+UNMATCHED_ROUTE = "unmatched"  # Requests no route handled (keeps label cardinality bounded)
+
+
+class RequestMetrics:
+    """
+    Latency histogram per route, response counts per status and in-flight requests.
+
+    Attributes:
+        monitor: per-route latencies ("METHOD /route") and response counts
+            ("METHOD /route STATUS").
+        in_flight: requests whose response has not been sent yet.
+    """
+
+    def __init__(self):
+        self.monitor = PerformanceMonitor(track_memory=False)
+        self.in_flight = 0  # Only changed on the event loop thread
+
+    def record(self, method: str, route: str, status: int, seconds: float):
+        self.monitor.record(f"{method} {route}", seconds)
+        self.monitor.increment(f"{method} {route} {status}")
+
+
+request_metrics = RequestMetrics()
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request (e.g. /api/audio/jobs/{job_id})."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request until its response is sent.
+
+    The timing stops at the last body chunk, so background tasks that run
+    after the response are not counted in the request's latency.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        finished = False
+        metrics = self.metrics
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                metrics.in_flight -= 1
+                metrics.record(
+                    scope["method"], route_template(scope), status, time.perf_counter() - start
+                )
+
+        async def send_and_time(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_and_time)
+        finally:
+            finish()
+
+
+# --- Text format ---
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _Writer:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def header(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {NAMESPACE}_{name} {help_text}")
+        self.lines.append(f"# TYPE {NAMESPACE}_{name} {kind}")
+
+    def sample(self, name: str, value, labels: Dict[str, object] = None):
+        self.lines.append(f"{NAMESPACE}_{name}{_labels(labels or {})} {_number(value)}")
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict, object]]):
+        self.header(name, kind, help_text)
+        for labels, value in samples:
+            self.sample(name, value, labels)
+
+    def histogram(self, name: str, labels: Dict[str, object], histogram: LogHistogram):
+        """Fold a log histogram (microseconds) into cumulative LATENCY_BUCKETS (seconds)."""
+        buckets = list(histogram.buckets())
+        cumulative = 0
+        position = 0
+        for bound in LATENCY_BUCKETS:
+            bound_us = bound * 1_000_000
+            while position < len(buckets) and buckets[position][0] <= bound_us:
+                cumulative += buckets[position][1]
+                position += 1
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": bound})
+        self.sample(f"{name}_bucket", histogram.count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_sum", histogram.total / 1_000_000, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _cache_counts(counters: Dict[str, int]) -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) per cache from "<cache>.hits" and "<cache>.misses" counters."""
+    caches: Dict[str, Tuple[int, int]] = {}
+    for name, value in counters.items():
+        cache, _, kind = name.rpartition(".")
+        if kind in ("hits", "misses") and cache:
+            hits, misses = caches.get(cache, (0, 0))
+            caches[cache] = (hits + value, misses) if kind == "hits" else (hits, misses + value)
+    return caches
+
+
+def _queue_depth(executor) -> Optional[int]:
+    """Tasks no worker took yet, or None if the executor does not expose them."""
+    # ThreadPoolExecutor has no public queue size; _work_queue is a CPython detail
+    queue = getattr(executor, "_work_queue", None)
+    try:
+        return queue.qsize() if queue is not None else None
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def render_metrics(
+    caches: Optional[Dict[str, Tuple[int, int]]] = None,
+    executors: Optional[Dict[str, object]] = None,
+    requests: RequestMetrics = None,
+    monitor: PerformanceMonitor = None,
+    admission: AdmissionController = None,
+) -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Args:
+        caches: (hits, misses) of caches not counted by the monitor, by name.
+        executors: thread pools whose queue depth is reported, by name (e.g. the
+            event loop's default executor, which runs the chatbot graph's nodes).
+        requests: per-route request metrics (default: the middleware's).
+        monitor: per-stage timings and counters (default: the chatbot's).
+        admission: chat admission control (default: the API's).
+    """
+    # Imported here: they build the OpenAI caller and thread pools on import
+    from miramind.llm.langgraph.run_chat import executor as chat_io_executor
+    from miramind.llm.langgraph.utils import openai_caller, prompt_cache_stats
+
+    requests = requests or request_metrics
+    monitor = monitor or get_performance_monitor()
+    admission = admission or chat_admission
+    out = _Writer()
+
+    # --- HTTP requests ---
+    out.metric(
+        "http_requests_in_flight",
+        "gauge",
+        "Requests whose response has not been sent yet.",
+        [({}, requests.in_flight)],
+    )
+    out.header("http_request_duration_seconds", "histogram", "Request latency by route.")
+    for operation in requests.monitor.operations():
+        method, _, route = operation.partition(" ")
+        out.histogram(
+            "http_request_duration_seconds",
+            {"method": method, "route": route},
+            requests.monitor.histogram(operation),
+        )
+    responses = []
+    for name, value in requests.monitor.get_counters().items():
+        method, route_status = name.split(" ", 1)
+        route, _, status = route_status.rpartition(" ")
+        responses.append(({"method": method, "route": route, "status": status}, value))
+    out.metric("http_responses_total", "counter", "Responses by route and status.", responses)
+
+    # --- Admission control ---
+    out.metric("admission_in_flight", "gauge", "Chats holding a slot.", [({}, admission.in_flight)])
+    out.metric("admission_queued", "gauge", "Chats waiting for a slot.", [({}, admission.queued)])
+    admission_counts = admission.monitor.get_counters()
+    out.metric(
+        "admission_rejected_total",
+        "counter",
+        "Chats turned away with 503.",
+        [
+            ({"reason": reason}, admission_counts.get(f"rejected.{reason}", 0))
+            for reason in ("queue_full", "queue_timeout")
+        ],
+    )
+    out.metric(
+        "admission_abandoned_total",
+        "counter",
+        "Queued chats dropped because the client disconnected.",
+        [({}, admission_counts.get("abandoned", 0))],
+    )
+    out.header("admission_queue_wait_seconds", "histogram", "Time chats waited for a slot.")
+    out.histogram("admission_queue_wait_seconds", {}, admission.monitor.histogram(QUEUE_WAIT))
+
+    # --- Pipeline stages ---
+    out.header("stage_duration_seconds", "histogram", "Duration of chatbot pipeline stages.")
+    for stage in monitor.operations():
+        out.histogram("stage_duration_seconds", {"stage": stage}, monitor.histogram(stage))
+
+    # --- Caches ---
+    cache_counts = _cache_counts(monitor.get_counters())
+    cache_counts.update(caches or {})
+    out.metric(
+        "cache_requests_total",
+        "counter",
+        "Cache lookups by result.",
+        [
+            ({"cache": cache, "result": result}, count)
+            for cache, (hits, misses) in sorted(cache_counts.items())
+            for result, count in (("hit", hits), ("miss", misses))
+        ],
+    )
+    out.metric(
+        "cache_hit_ratio",
+        "gauge",
+        "Share of cache lookups that were hits.",
+        [
+            ({"cache": cache}, hits / (hits + misses) if hits + misses else 0.0)
+            for cache, (hits, misses) in sorted(cache_counts.items())
+        ],
+    )
+    prompt_cache = sorted(prompt_cache_stats.get_stats().items())
+    out.metric(
+        "prompt_tokens_total",
+        "counter",
+        "Prompt tokens sent to the LLM, and how many the provider served from its cache.",
+        [
+            ({"label": label, "kind": kind}, stats[f"{kind}_tokens"])
+            for label, stats in prompt_cache
+            for kind in ("prompt", "cached")
+        ],
+    )
+    out.metric(
+        "prompt_cache_hit_ratio",
+        "gauge",
+        "Share of prompt tokens served from the provider's prompt cache.",
+        [({"label": label}, stats["hit_ratio"]) for label, stats in prompt_cache],
+    )
+
+    flights = sorted(get_single_flight_stats().items())
+    out.metric(
+        "single_flight_calls_total",
+        "counter",
+        "Calls that ran the work, and identical concurrent calls that shared it.",
+        [
+            ({"name": name, "result": result}, stats[result])
+            for name, stats in flights
+            for result in ("executed", "coalesced")
+        ],
+    )
+
+    # --- Executors ---
+    # run_chat's pool only saves audio and updates the response cache
+    pools = {"chat_io": chat_io_executor, **(executors or {})}
+    openai_stats = openai_caller.get_stats()
+    depths = {name: _queue_depth(pool) for name, pool in pools.items()}
+    depths["openai"] = openai_stats["queue_depth"]
+    out.metric(
+        "executor_queue_depth",
+        "gauge",
+        "Tasks waiting for a worker thread.",
+        # An executor whose queue cannot be read is left out rather than reported as empty
+        [({"executor": name}, depth) for name, depth in depths.items() if depth is not None],
+    )
+
+    # --- OpenAI requests, rate limits and circuit breakers ---
+    for key in ("requests", "hedged", "hedge_wins", "retries", "deadline_exceeded", "failures"):
+        out.metric(
+            f"openai_{key}_total",
+            "counter",
+            f"OpenAI calls: {key.replace('_', ' ')}.",
+            [({}, openai_stats[key])],
+        )
+    limiters = sorted(get_rate_limit_stats().items())
+    out.metric(
+        "rate_limit_requests_total",
+        "counter",
+        "Requests by rate limiter and outcome (delayed ones are also allowed).",
+        [
+            ({"limiter": name, "result": result}, stats[result])
+            for name, stats in limiters
+            for result in ("allowed", "delayed", "rejected")
+        ],
+    )
+    breakers = sorted(get_breaker_stats().items())
+    out.metric(
+        "circuit_breaker_state",
+        "gauge",
+        "1 for the breaker's current state.",
+        [
+            ({"name": name, "state": state}, stats["state"] == state)
+            for name, stats in breakers
+            for state in (CLOSED, OPEN, HALF_OPEN)
+        ],
+    )
+    out.metric(
+        "circuit_breaker_rejected_total",
+        "counter",
+        "Calls rejected while the breaker was open.",
+        [({"name": name}, stats["rejected"]) for name, stats in breakers],
+    )
+    return out.text()
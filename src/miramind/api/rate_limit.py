@@ -0,0 +1,74 @@
+"""
+Per-client rate limiting of chat requests, by session id and by client IP.
+
+A chat turn is charged the upstream calls it causes (emotion detection, the
+reply, TTS and, for voice, transcription), so the buckets track LLM spend
+rather than HTTP requests. A client over its rate is slowed down by up to
+RATE_LIMIT_MAX_DELAY; beyond that it gets 429 with Retry-After.
+"""
+
+import asyncio
+import math
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from miramind.api.const import (
+    RATE_LIMIT_IP_BURST,
+    RATE_LIMIT_IP_PER_MINUTE,
+    RATE_LIMIT_MAX_DELAY,
+    RATE_LIMIT_SESSION_BURST,
+    RATE_LIMIT_SESSION_PER_MINUTE,
+)
+from miramind.shared.rate_limit import get_rate_limiter, refund_async, reserve_async
+
+SESSION_LIMITER = "session"
+IP_LIMITER = "client_ip"
+
+
+def _limiters():
+    # Created on first use, after the environment (and so the backend choice) is loaded
+    return (
+        get_rate_limiter(IP_LIMITER, RATE_LIMIT_IP_PER_MINUTE / 60, RATE_LIMIT_IP_BURST),
+        get_rate_limiter(
+            SESSION_LIMITER, RATE_LIMIT_SESSION_PER_MINUTE / 60, RATE_LIMIT_SESSION_BURST
+        ),
+    )
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def throttle(request: Request, session_id: Optional[str], cost: float):
+    """
+    Charge a chat turn to its client IP and session, sleeping if they are over their rate.
+
+    A turn rejected by one bucket is not charged to the other.
+
+    Raises:
+        HTTPException: 429 with Retry-After if either would have to wait over RATE_LIMIT_MAX_DELAY.
+    """
+    ip_limiter, session_limiter = _limiters()
+    # Session first: a session turned away must not use up its classmates' shared IP bucket,
+    # and a session turned away because of its IP gets its tokens back
+    keys = [(session_limiter, session_id)] if session_id else []
+    keys.append((ip_limiter, client_ip(request)))
+
+    delay = 0.0
+    charged = []
+    for limiter, key in keys:
+        taken, wait = await reserve_async(limiter, key, cost, RATE_LIMIT_MAX_DELAY)
+        if not taken:
+            for charged_limiter, charged_key in charged:
+                await refund_async(charged_limiter, charged_key, cost)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many messages, please slow down",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        charged.append((limiter, key))
+        delay = max(delay, wait)
+    if delay > 0:
+        # Both buckets have refilled by then; waiting for one covers the other
+        await asyncio.sleep(delay)
@@ -0,0 +1,46 @@
+"""
+Per-request tracing for the API: one trace per HTTP request, and a
+Server-Timing header with the time spent in each stage.
+"""
+
+from miramind.api.metrics import route_template
+from miramind.shared.tracing import server_timing, start_trace
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a trace for every HTTP request.
+
+    The root span ends when the response is sent; background tasks that run
+    afterwards still add their spans to the trace, which is exported once
+    they are done. Server-Timing lists the stages finished before the
+    response started, e.g. "emotion_detection;dur=210.3, response_llm;dur=850.1".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with start_trace(
+            f"{scope['method']} {scope['path']}", **{"http.method": scope["method"]}
+        ) as root:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    root.name = f"{scope['method']} {route_template(scope)}"
+                    root.set_attribute("http.route", route_template(scope))
+                    root.set_attribute("http.status_code", message["status"])
+                    timing = server_timing(root.trace, exclude=root)
+                    if timing:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"server-timing", timing.encode("latin-1")))
+                        message = {**message, "headers": headers}
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    root.end()
+
+            await self.app(scope, receive, send_with_timing)
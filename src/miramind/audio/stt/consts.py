@@ -1,2 +1,4 @@
 DURATION = 5
 SAMPLE_RATE = 44100
+TRANSCRIPT_CACHE_SIZE = 128  # max transcripts kept for repeated uploads
+TRANSCRIPT_CACHE_TTL = 600  # seconds
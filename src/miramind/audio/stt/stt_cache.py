@@ -0,0 +1,138 @@
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+import soundfile as sf
+
+from miramind.audio.stt.consts import TRANSCRIPT_CACHE_SIZE, TRANSCRIPT_CACHE_TTL
+
+
+def fingerprint_audio(audio_bytes: bytes) -> str:
+    """
+    Compute a fingerprint of audio data based on its decoded PCM samples.
+
+    The same recording wrapped in a different container (or with different header
+    metadata) decodes to the same samples, so it produces the same fingerprint.
+    If the data cannot be decoded (e.g. a format libsndfile does not support),
+    the raw bytes are hashed instead.
+
+    Args:
+        audio_bytes: encoded audio data.
+
+    Returns:
+        str: hex digest identifying the audio content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        samples, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype="int16", always_2d=True)
+    except Exception:
+        digest.update(b"raw:")
+        digest.update(audio_bytes)
+        return digest.hexdigest()
+
+    digest.update(f"pcm:{sample_rate}:{samples.shape[1]}:".encode())
+    digest.update(samples.tobytes())
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Bounded LRU cache of transcripts with time-to-live expiry.
+
+    Attributes:
+        max_entries: maximum number of transcripts kept in memory.
+        ttl: number of seconds after which an entry is considered stale.
+    """
+
+    def __init__(self, max_entries: int = TRANSCRIPT_CACHE_SIZE, ttl: float = TRANSCRIPT_CACHE_TTL):
+        """
+        Constructor of TranscriptCache class.
+
+        Args:
+            max_entries: maximum number of transcripts kept in memory.
+            ttl: number of seconds after which an entry is considered stale.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # fingerprint -> (result, timestamp)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """
+        Get a cached transcript.
+
+        Args:
+            key: audio fingerprint.
+
+        Returns:
+            dict with the transcript or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            result, timestamp = entry
+            if time.monotonic() - timestamp >= self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        Store a transcript, evicting the least recently used entries if needed.
+
+        Args:
+            key: audio fingerprint.
+            result: transcription result (dict with "transcript" key).
+        """
+        with self._lock:
+            self._entries[key] = (dict(result), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset hit/miss counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def transcribe_with_cache(stt, audio_bytes: bytes, cache: TranscriptCache, name: str = "audio.wav"):
+    """
+    Transcribe audio, reusing a cached transcript for audio that was already seen.
+
+    Args:
+        stt: STT instance used on cache miss.
+        audio_bytes: encoded audio data.
+        cache: TranscriptCache instance.
+        name: file name passed to the API (the extension tells it the container format).
+
+    Returns:
+        (dict, bool): transcription result and whether it came from the cache.
+    """
+    key = fingerprint_audio(audio_bytes)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    buffer = io.BytesIO(audio_bytes)
+    buffer.name = name
+    result = stt.transcribe_bytes(buffer)
+    if result.get("transcript"):
+        cache.put(key, result)
+    return result, False
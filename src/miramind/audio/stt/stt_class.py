@@ -2,10 +2,21 @@ import io
 import logging
 import os
 
-import sounddevice as sd
-import soundfile as sf
+import openai
 
 from miramind.audio.stt.consts import DURATION, SAMPLE_RATE
+from miramind.shared.circuit_breaker import get_breaker
+from miramind.shared.tracing import span
+
+# Only outages open the breaker; a bad upload (400, undecodable audio) fails on its own
+stt_breaker = get_breaker(
+    "stt",
+    failure_exceptions=(
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    ),
+)
 
 
 class STT:
@@ -36,12 +47,17 @@ class STT:
 
         Returns:
             dict[str: str]: dict containing transcript (with key "transcript")
+
+        Raises:
+            CircuitOpenError: if transcription keeps failing (the breaker is open).
         """
-        transcript = self.client.audio.transcriptions.create(
-            model=os.environ.get("STT_DEPLOYMENT", "whisper-1"),
-            file=bytes,
-            response_format="json",
-        )
+        with span("stt.transcribe"):
+            transcript = stt_breaker.call(
+                self.client.audio.transcriptions.create,
+                model=os.environ.get("STT_DEPLOYMENT", "whisper-1"),
+                file=bytes,
+                response_format="json",
+            )
         self.logger.info(f"Transcript: {transcript.text}")
         return {"transcript": transcript.text}
 
@@ -76,6 +92,10 @@ class LinearListeningSTT(STT):
             chunk_duration: duration (in seconds) of listening before transcribing recorded sound.
             sample_rate: recording's sample rate (default 44100).
         """
+        # Imported here so transcription-only users (the API) don't load PortAudio
+        import sounddevice as sd
+        import soundfile as sf
+
         audio = sd.rec(int(chunk_duration * sample_rate), samplerate=sample_rate, channels=1)
         sd.wait()
         buffer = io.BytesIO()
@@ -4,9 +4,6 @@ import threading
 import time
 from queue import Empty, Queue
 
-import sounddevice as sd
-import soundfile as sf
-
 from miramind.audio.stt.consts import DURATION, SAMPLE_RATE
 from miramind.audio.stt.stt_class import STT
 
@@ -59,6 +56,9 @@ class ListeningThread(threading.Thread):
         return self.return_queue
 
     def run(self):
+        # Imported here so importing this module doesn't load PortAudio
+        import sounddevice as sd
+
         index = 0
         while not self.flag.is_set():
             index += 1
@@ -127,6 +127,8 @@ class TranscribingBytesThread(threading.Thread):
         return self.target_queue
 
     def run(self):
+        import soundfile as sf
+
         index = 0
         while not self.flag.is_set():
             index += 1
@@ -0,0 +1,121 @@
+"""
+Encodings the TTS can return, and choosing one from an HTTP Accept header.
+
+Speech is mostly silence and a narrow band of frequencies, so compressed
+formats are a fraction of the size of RIFF PCM: a few seconds of reply are
+~200 KB as WAV but ~15-25 KB as Ogg Opus or low-bitrate MP3.
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+WAV = "wav"
+OGG_OPUS = "ogg_opus"
+MP3 = "mp3"
+
+
+class AudioFormat(NamedTuple):
+    """
+    One TTS output encoding.
+
+    Attributes:
+        name: format name used in TTS requests and settings.
+        media_type: Content-Type it is served with.
+        sdk_format: name of the speechsdk.SpeechSynthesisOutputFormat member, or None for
+            the SDK default (RIFF PCM).
+        aliases: other media types clients use for it in Accept headers.
+    """
+
+    name: str
+    media_type: str
+    sdk_format: Optional[str]
+    aliases: tuple = ()
+
+
+AUDIO_FORMATS = {
+    WAV: AudioFormat(WAV, "audio/wav", None, ("audio/wave", "audio/x-wav")),
+    OGG_OPUS: AudioFormat(OGG_OPUS, "audio/ogg", "Ogg24Khz16BitMonoOpus", ("audio/opus",)),
+    MP3: AudioFormat(MP3, "audio/mpeg", "Audio24Khz48KBitRateMonoMp3", ("audio/mp3",)),
+}
+
+
+def get_audio_format(name: str) -> AudioFormat:
+    """
+    Raises:
+        ValueError: if the format is not supported.
+    """
+    if name not in AUDIO_FORMATS:
+        available = ", ".join(AUDIO_FORMATS)
+        raise ValueError(f"Unsupported audio format: '{name}'. Available: {available}")
+    return AUDIO_FORMATS[name]
+
+
+def _media_ranges(accept: str):
+    """(media range, q) of an Accept header, in header order."""
+    for part in accept.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        yield media_range.lower(), q
+
+
+def _best_match(media_ranges, available: list) -> Optional[str]:
+    best, best_rank = None, (0.0, 0)
+    for media_range, q in media_ranges:
+        if q <= 0:
+            continue
+        if media_range in ("*/*", "audio/*"):
+            match, specificity = available[0], 0
+        else:
+            match = next(
+                (
+                    name
+                    for name in available
+                    if media_range in (AUDIO_FORMATS[name].media_type, *AUDIO_FORMATS[name].aliases)
+                ),
+                None,
+            )
+            specificity = 1
+        if match is not None and (q, specificity) > best_rank:
+            best, best_rank = match, (q, specificity)
+    return best
+
+
+def negotiate_audio_format(accept: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """
+    The format of `available` the client prefers, or None if it accepts none of them.
+
+    Formats named explicitly win over wildcards (audio/*, */*) at the same q;
+    a wildcard picks the first of `available`, so put the preferred one first.
+    A missing Accept header accepts anything.
+    """
+    available = list(available)
+    if not available:
+        return None
+    if not accept:
+        return available[0]
+    return _best_match(_media_ranges(accept), available)
+
+
+def requested_audio_format(accept: Optional[str]) -> Optional[str]:
+    """
+    The audio format an Accept header names explicitly, or None if it names none.
+
+    For requests whose response is not audio itself (e.g. a chat reply with an
+    audio_url), where `Accept: application/json, audio/ogg` asks for Ogg audio.
+    """
+    if not accept:
+        return None
+    named = [
+        (media_range, q)
+        for media_range, q in _media_ranges(accept)
+        if media_range.startswith("audio/") and media_range != "audio/*"
+    ]
+    return _best_match(named, list(AUDIO_FORMATS))
@@ -0,0 +1,205 @@
+"""
+Pre-synthesized audio of fixed phrases, spliced into synthesized speech.
+
+Some utterances never change: the sad flow's follow-up question, the canned
+replies and common greetings and goodbyes. The bank synthesizes them once per
+voice and emotion style (or loads them from disk), so a reply like
+"<LLM text> Would you like to tell me more...?" only needs the LLM text
+synthesized; the two WAV segments are joined at the sample level.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import wave
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...shared.logger import logger
+from .audio_formats import WAV
+
+DEFAULT_GAP = 0.15  # Seconds of silence between spliced segments, like a pause between sentences
+
+
+def concat_wav(segments: List[bytes], gap: float = 0.0) -> bytes:
+    """
+    Join WAV files into one, with `gap` seconds of silence between them.
+
+    Raises:
+        ValueError: if a segment is not a WAV file or their sample formats differ.
+    """
+    params, frames = None, []
+    for segment in segments:
+        try:
+            with wave.open(io.BytesIO(segment)) as reader:
+                segment_params = reader.getparams()
+                frames.append(reader.readframes(reader.getnframes()))
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Not a WAV file: {e}") from e
+        if params is None:
+            params = segment_params
+        elif segment_params[:3] != params[:3]:  # nchannels, sampwidth, framerate
+            raise ValueError(f"WAV formats differ: {segment_params[:3]} and {params[:3]}")
+    if params is None:
+        raise ValueError("No WAV segments to join")
+
+    # 8-bit PCM is unsigned, so its silence is 0x80
+    silent_sample = b"\x80" if params.sampwidth == 1 else b"\x00" * params.sampwidth
+    silence = silent_sample * params.nchannels * int(params.framerate * gap)
+    output = io.BytesIO()
+    with wave.open(output, "wb") as writer:
+        writer.setnchannels(params.nchannels)
+        writer.setsampwidth(params.sampwidth)
+        writer.setframerate(params.framerate)
+        writer.writeframes(silence.join(frames))
+    return output.getvalue()
+
+
+def _is_wav(audio) -> bool:
+    try:
+        concat_wav([audio])
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+class PhraseBank:
+    """
+    WAV audio of fixed phrases by emotion style, for one TTS provider's voice.
+
+    Attributes:
+        voice: voice the phrases are spoken in (part of the file names on disk).
+        cache_dir: directory the phrases are loaded from and saved to (None: memory only).
+        gap: seconds of silence between spliced segments.
+        hits: utterances served (partly) from the bank.
+        characters_saved: characters not sent to the TTS thanks to the bank.
+    """
+
+    def __init__(self, provider, cache_dir: Optional[str] = None, gap: float = DEFAULT_GAP):
+        self.provider = provider
+        self.voice = getattr(provider, "voice_name", "") or ""
+        self.cache_dir = cache_dir
+        self.gap = gap
+        self.hits = 0
+        self.characters_saved = 0
+        self._phrases: Dict[str, Dict[str, bytes]] = {}  # emotion -> text -> audio
+        self._lock = threading.Lock()
+
+    def add(self, text: str, emotion: str, audio: bytes):
+        with self._lock:
+            self._phrases.setdefault(emotion, {})[text] = audio
+
+    def get(self, text: str, emotion: str) -> Optional[bytes]:
+        with self._lock:
+            return self._phrases.get(emotion, {}).get(text)
+
+    def load(self, phrases: Iterable[Tuple[str, str]], interval: float = 0.0):
+        """
+        Fill the bank with (text, emotion) phrases, from disk or else from the TTS.
+
+        Blocking; stops at the first TTS failure (e.g. no credentials), leaving the
+        phrases loaded so far. Phrases not in the bank are simply synthesized with
+        the rest of their reply. `interval` seconds pass between TTS requests, so
+        filling the bank does not compete with live replies for the TTS quota.
+        """
+        synthesized = False
+        for text, emotion in phrases:
+            if self.get(text, emotion) is not None:
+                continue
+            audio = self._read(text, emotion)
+            if audio is None:
+                if synthesized:
+                    time.sleep(interval)
+                synthesized = True
+                try:
+                    audio = self.provider.synthesize(
+                        json.dumps({"text": text, "emotion": emotion, "format": WAV})
+                    )
+                except Exception as e:
+                    logger.warning(f"Phrase bank not filled, TTS failed: {e}")
+                    return
+                if not _is_wav(audio):
+                    logger.warning("Phrase bank not filled, the TTS did not return WAV audio")
+                    return
+                self._write(text, emotion, audio)
+            self.add(text, emotion, audio)
+        logger.info(f"Phrase bank ready: {len(self)} phrases for voice '{self.voice}'")
+
+    def load_in_background(
+        self, phrases: Iterable[Tuple[str, str]], interval: float = 0.0
+    ) -> threading.Thread:
+        """load() in a daemon thread, so startup does not wait for the TTS."""
+        thread = threading.Thread(
+            target=self.load, args=(list(phrases), interval), name="phrase-bank", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def split(self, text: str, emotion: str) -> Tuple[Optional[bytes], str, Optional[bytes]]:
+        """
+        Split an utterance into banked audio and the text left to synthesize.
+
+        Returns:
+            (prefix audio, remaining text, suffix audio): the longest banked phrase
+            the text starts with and the longest it ends with, at word boundaries.
+            The whole text being one phrase gives (audio, "", None).
+        """
+        with self._lock:
+            phrases = dict(self._phrases.get(emotion, {}))
+        rest = text.strip()
+        if rest in phrases:
+            return phrases[rest], "", None
+
+        prefix = max((p for p in phrases if rest.startswith(p + " ")), key=len, default=None)
+        if prefix is not None:
+            rest = rest[len(prefix) :].lstrip()
+        suffix = max(
+            (p for p in phrases if rest.endswith(" " + p) or rest == p), key=len, default=None
+        )
+        if suffix is not None:
+            rest = rest[: -len(suffix)].rstrip()
+        return phrases.get(prefix), rest, phrases.get(suffix)
+
+    def record_hit(self, characters: int):
+        with self._lock:
+            self.hits += 1
+            self.characters_saved += characters
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "phrases": sum(len(texts) for texts in self._phrases.values()),
+                "hits": self.hits,
+                "characters_saved": self.characters_saved,
+            }
+
+    def __len__(self) -> int:
+        return self.get_stats()["phrases"]
+
+    def _path(self, text: str, emotion: str) -> str:
+        digest = hashlib.sha1(f"{self.voice}|{emotion}|{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def _read(self, text: str, emotion: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(text, emotion), "rb") as f:
+                audio = f.read()
+        except OSError:
+            return None
+        return audio if _is_wav(audio) else None
+
+    def _write(self, text: str, emotion: str, audio: bytes):
+        if not self.cache_dir:
+            return
+        path = self._path(text, emotion)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(audio)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"Could not save phrase audio to {path}: {e}")
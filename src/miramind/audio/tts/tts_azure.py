@@ -3,8 +3,29 @@ import json
 
 import azure.cognitiveservices.speech as speechsdk
 
+from ...shared.circuit_breaker import get_breaker
 from ...shared.logger import logger
+from ...shared.tracing import span
+from .audio_formats import WAV, get_audio_format
 from .tts_base import TTSProvider
+from .tts_loop import run_on_tts_loop
+
+
+class TTSServiceError(RuntimeError):
+    """Synthesis failed on Azure's side (connection, timeout, throttling or service error)."""
+
+
+# Cancellations worth retrying later; the others (bad key, bad SSML) are not outages
+TRANSIENT_ERROR_CODES = {
+    speechsdk.CancellationErrorCode.ConnectionFailure,
+    speechsdk.CancellationErrorCode.ServiceTimeout,
+    speechsdk.CancellationErrorCode.ServiceError,
+    speechsdk.CancellationErrorCode.TooManyRequests,
+    speechsdk.CancellationErrorCode.ServiceUnavailable,
+}
+
+# Only outages open the breaker; a request Azure rejects fails on its own
+tts_breaker = get_breaker("azure_tts", failure_exceptions=(TTSServiceError,))
 
 
 class AzureTTSProvider(TTSProvider):
@@ -24,17 +45,30 @@ class AzureTTSProvider(TTSProvider):
 
         text = data['text']
         emotion = data.get('emotion', 'neutral')
+        audio_format = get_audio_format(data.get('format', self.output_format))
 
         logger.debug(
             f"Synthesizing speech for text: '{text[:30]}...' with emotion: '{emotion}' (async)"
         )
 
+        formatted_text = self.set_emotion(text, emotion)
+        # Fails fast while Azure is down; invalid input above never counts against the breaker
+        with span("tts.azure", emotion=emotion, characters=len(text)):
+            return await tts_breaker.call_async(
+                self._speak, formatted_text, audio_format.sdk_format
+            )
+
+    async def _speak(self, formatted_text: str, sdk_format: str = None) -> bytes:
         # Create speech config and synthesizer for this call (stateless, like in sync)
         if self.endpoint and self.subscription_key:
             speech_config = speechsdk.SpeechConfig(
                 subscription=self.subscription_key, endpoint=self.endpoint
             )
             speech_config.speech_synthesis_voice_name = self.voice_name
+            if sdk_format:
+                speech_config.set_speech_synthesis_output_format(
+                    getattr(speechsdk.SpeechSynthesisOutputFormat, sdk_format)
+                )
             synthesizer = speechsdk.SpeechSynthesizer(
                 speech_config=speech_config, audio_config=None
             )
@@ -42,8 +76,7 @@ class AzureTTSProvider(TTSProvider):
             logger.error("SpeechSynthesizer is not initialized.")
             raise RuntimeError("SpeechSynthesizer is not initialized.")
 
-        formatted_text = self.set_emotion(text, emotion)
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         result = await loop.run_in_executor(
             None, lambda: synthesizer.speak_ssml_async(formatted_text).get()
         )
@@ -59,6 +92,8 @@ class AzureTTSProvider(TTSProvider):
                 error_msg += f" | ErrorDetails: {cancellation_details.error_details}"
                 error_msg += "  | Check if speech resource key and endpoint are correct"
             logger.error(error_msg)
+            if cancellation_details.error_code in TRANSIENT_ERROR_CODES:
+                raise TTSServiceError(error_msg)
             raise RuntimeError(error_msg)
         else:
             logger.error(f"Speech synthesis failed: {result.reason}")
@@ -73,6 +108,7 @@ class AzureTTSProvider(TTSProvider):
         subscription_key: str,
         endpoint: str,
         voice_name: str = "en-US-JennyNeural",
+        output_format: str = WAV,
     ):
         """
         Initialize Azure TTS provider.
@@ -81,10 +117,12 @@ class AzureTTSProvider(TTSProvider):
             subscription_key (str, optional): Azure Cognitive Services subscription key
             endpoint (str, optional): Azure Speech service endpoint URL
             voice_name (str): Voice to use (default: en-US-JennyNeural - supports 14+ emotion styles as of Feb 2025)
+            output_format (str): Audio encoding when a request names none, e.g. "ogg_opus" or "mp3" (default: wav)
         """
         self.subscription_key = subscription_key
         self.endpoint = endpoint
         self.voice_name = voice_name
+        self.output_format = get_audio_format(output_format).name
 
         # Define emotion styles mapping
         self.emotion_styles = {
@@ -109,9 +147,9 @@ class AzureTTSProvider(TTSProvider):
     def synthesize(self, input_json: str) -> bytes:
         """
         Convert input text and emotion data into synthesized speech audio.
-        Now always uses the async implementation for performance, but keeps the sync interface.
+        Runs the async implementation on the shared TTS event loop, so no loop is created per call.
         """
-        return asyncio.run(self.synthesize_async(input_json))
+        return run_on_tts_loop(self.synthesize_async(input_json))
 
     def set_emotion(self, text: str, emotion: str) -> str:
         """
@@ -14,6 +14,7 @@ class TTSProvider(ABC):
         Args:
             input_json (str): JSON string containing text and optional emotion data.
                                Expected format: {"text": "speech text", "emotion": "emotion_name"}
+                               and optionally "format": "wav", "ogg_opus" or "mp3" (see audio_formats)
 
         Returns:
             bytes: Audio data in bytes format (typically MP3 or WAV)
@@ -1,13 +1,23 @@
 import os
 from typing import Callable, Dict
 
-from dotenv import load_dotenv
-
+from ...shared.env import load_env
 from ...shared.logger import logger
-from .tts_azure import AzureTTSProvider
 from .tts_base import TTSProvider
 
 
+def _azure_provider() -> TTSProvider:
+    # Imported on first use: the Speech SDK is slow to import
+    from .tts_azure import AzureTTSProvider
+
+    return AzureTTSProvider(
+        # Using environment variables from .env file
+        endpoint=os.getenv("AZURE_SPEECH_ENDPOINT"),
+        subscription_key=os.getenv("AZURE_SPEECH_KEY"),
+        voice_name=os.getenv("AZURE_SPEECH_VOICE_NAME", "en-US-JennyNeural"),
+    )
+
+
 def get_tts_provider(name: str = "azure") -> TTSProvider:
     """
     Create and return a TTS provider instance based on the specified name.
@@ -32,17 +42,12 @@ def get_tts_provider(name: str = "azure") -> TTSProvider:
         >>> audio = provider.synthesize(json_input)
     """
 
-    # Load environment variables
-    load_dotenv()
+    # Load environment variables (read once per process)
+    load_env()
     logger.debug("Environment variables loaded for TTS provider factory.")
 
     provider_registry: Dict[str, Callable[[], TTSProvider]] = {
-        "azure": lambda: AzureTTSProvider(
-            # Using environment variables from .env file
-            endpoint=os.getenv("AZURE_SPEECH_ENDPOINT"),
-            subscription_key=os.getenv("AZURE_SPEECH_KEY"),
-            voice_name=os.getenv("AZURE_SPEECH_VOICE_NAME", "en-US-JennyNeural"),
-        )
+        "azure": _azure_provider,
     }
 
     if name not in provider_registry:
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from typing import Awaitable, TypeVar
+
+from ...shared.logger import logger
+
+T = TypeVar("T")
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+
+
+def get_tts_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the long-lived event loop used for TTS from synchronous code.
+
+    The loop runs on one daemon thread started on first use, so synchronous
+    callers share it instead of creating an event loop per request.
+    """
+    global _loop, _thread
+    if _loop is not None:
+        return _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=loop.run_forever, name="tts-loop", daemon=True)
+            _thread.start()
+            _loop = loop
+            logger.info("Started TTS event loop thread")
+    return _loop
+
+
+def run_on_tts_loop(coro: Awaitable[T], timeout: float = None) -> T:
+    """
+    Run a coroutine on the TTS loop and wait for its result.
+
+    Args:
+        coro: coroutine to run.
+        timeout: seconds to wait (None waits indefinitely).
+
+    Returns:
+        result of the coroutine.
+
+    Raises:
+        RuntimeError: if called from the TTS loop thread itself (it would deadlock).
+    """
+    loop = get_tts_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_on_tts_loop cannot be called from the TTS loop thread")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
@@ -1,44 +1,67 @@
 # --- Imports ---
+import concurrent.futures
 import json
 import os
-import re
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional
 
-from dotenv import load_dotenv
 from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 from openai import OpenAI
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel
 
+from miramind.audio.tts.phrase_bank import PhraseBank
 from miramind.audio.tts.tts_factory import get_tts_provider
-from miramind.llm.langgraph.subgraphs import (
-    build_angry_flow,
-    build_excited_flow,
-    build_gentle_flow,
-    build_neutral_flow,
-    build_sad_flow,
+from miramind.llm.langgraph.emotion_batcher import EmotionBatcher
+from miramind.llm.langgraph.emotion_classifier import LocalEmotionClassifier
+from miramind.llm.langgraph.emotion_parser import EMOTION_RESPONSE_FORMAT, parse_emotion
+from miramind.llm.langgraph.hedging import remaining
+from miramind.llm.langgraph.memory_summarizer import MemorySummarizer
+from miramind.llm.langgraph.performance_config import (
+    EMOTION_BATCH_MAX_SIZE,
+    EMOTION_BATCH_MAX_WAIT_MS,
+    ENABLE_EMOTION_BATCHING,
+    ENABLE_LOCAL_EMOTION_CLASSIFIER,
+    ENABLE_MEMORY_SUMMARY,
+    ENABLE_PHRASE_BANK,
+    LOCAL_EMOTION_CONFIDENCE_THRESHOLD,
+    PHRASE_BANK_DIR,
+    PHRASE_BANK_SYNTHESIS_INTERVAL,
 )
-from miramind.llm.langgraph.utils import EmotionLogger, call_openai
+from miramind.llm.langgraph.performance_monitor import get_performance_monitor
+from miramind.llm.langgraph.state import ChatState
+from miramind.llm.langgraph.subgraphs import EMOTION_ROUTES, add_flow_nodes, fixed_phrases
+from miramind.llm.langgraph.utils import EmotionLogger, call_openai, text_to_speech
+from miramind.shared.env import load_env
 from miramind.shared.logger import logger
 
 logger.info("Logger is working inside chatbot.py")
 
+perf_monitor = get_performance_monitor()
+
 
 # --- Config ---
 DEFAULT_MODEL = "gpt-4o-mini"  # Faster and cheaper model for emotion detection
 RESPONSE_MODEL = "gpt-4o-mini"  # Use faster model for responses too
-LOG_FILE = "emotion_log.json"
+LOG_FILE = "emotion_log.jsonl"
+LEGACY_LOG_FILE = "emotion_log.json"  # JSON-array log written before the JSONL log
 VALID_EMOTIONS = {"happy", "sad", "angry", "scared", "excited", "embarrassed", "anxious", "neutral"}
 EMOTION_PROMPT = (
     "Classify emotion as: happy, sad, angry, scared, excited, embarrassed, anxious, or neutral. "
-    "Respond in JSON: {\"emotion\": \"happy\", \"confidence\": 0.92} "
-    "Be concise."  # Shortened prompt for faster processing
+    "Respond in JSON: {\"emotion\": \"happy\", \"confidence\": 0.92}"
+)
+MAX_TOKENS_EMOTION_LABEL = 16  # The structured reply is ~12 tokens
+# Resolved from the package, so the saved phrases do not depend on the working directory
+PHRASE_BANK_PATH = (
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", PHRASE_BANK_DIR))
+    if PHRASE_BANK_DIR
+    else None
 )
 
 
 # --- Initialization Function ---
 def initialize_clients():
-    load_dotenv()
+    load_env()
     openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     tts = get_tts_provider("azure")
     logger_instance = EmotionLogger(LOG_FILE)
@@ -49,6 +72,10 @@ def initialize_clients():
 client = None
 tts_provider = None
 emotion_logger = None
+local_classifier = None
+emotion_batcher = None
+memory_summarizer = None
+phrase_bank = None
 
 
 # --- Models ---
@@ -58,37 +85,98 @@ class EmotionResult(BaseModel):
 
 
 # --- Core Nodes ---
-def detect_emotion(state: Dict[str, Any]) -> Dict[str, Any]:
+def detect_emotion(state: ChatState) -> ChatState:
     logger.info("detect_emotion was called")
+    with perf_monitor.track_operation("emotion_detection"):
+        return _detect_emotion(state)
+
+
+def _detect_emotion(state: ChatState) -> ChatState:
     user_input = state["user_input"]
 
+    # Fast path: skip the LLM round trip when the local classifier is confident
+    local_emotion = None
+    if local_classifier is not None:
+        local_emotion, local_confidence = local_classifier.predict(user_input)
+        if local_confidence >= LOCAL_EMOTION_CONFIDENCE_THRESHOLD:
+            local_classifier.metrics.record_local_answer()
+            logger.info(f"Local emotion classifier: {local_emotion} ({local_confidence:.2f})")
+            return _with_emotion(state, local_emotion, local_confidence, source="local")
+
+    deadline = state.get("deadline")
+    if emotion_batcher is not None:
+        # Share one API request with other sessions classifying at the same time
+        try:
+            emotion, confidence = emotion_batcher.classify(user_input, timeout=remaining(deadline))
+        except concurrent.futures.TimeoutError:  # Not the builtin TimeoutError before 3.11
+            logger.error("Batched emotion classification missed the request deadline")
+            emotion, confidence = "neutral", 0.0
+    else:
+        emotion, confidence = _classify_with_llm(user_input, deadline)
+
+    if local_emotion is not None and confidence > 0.0:
+        local_classifier.metrics.record_llm_answer(local_emotion, emotion)
+
+    return _with_emotion(state, emotion, confidence)
+
+
+def _classify_with_llm(user_input: str, deadline: Optional[float] = None):
     messages = [
         {"role": "system", "content": EMOTION_PROMPT},
         {"role": "user", "content": user_input},
     ]
 
-    # Use faster model for emotion detection with reduced token limit
-    raw = call_openai(client, messages, model=DEFAULT_MODEL, max_tokens=30)
-    emotion, confidence = "neutral", 0.0
+    # Structured output: the reply is just {"emotion": ..., "confidence": ...}
+    raw = call_openai(
+        client,
+        messages,
+        model=DEFAULT_MODEL,
+        max_tokens=MAX_TOKENS_EMOTION_LABEL,
+        temperature=0.0,
+        response_format=EMOTION_RESPONSE_FORMAT,
+        deadline=deadline,
+        label="emotion",
+    )
+    parsed = parse_emotion(raw)
+    if parsed is None:
+        logger.error(f"Emotion parsing error: {raw[:100]!r}")
+        return "neutral", 0.0
+    return parsed
 
-    try:
-        match = re.search(r'{.*}', raw, re.DOTALL)
-        if match:
-            parsed = EmotionResult.parse_raw(match.group(0))
-            if parsed.emotion in VALID_EMOTIONS:
-                emotion = parsed.emotion
-                confidence = parsed.confidence
-    except ValidationError as e:
-        logger.error(f"Emotion parsing error: {e}")
 
+def _with_emotion(
+    state: ChatState, emotion: str, confidence: float, source: str = "llm"
+) -> ChatState:
+    # Only the delta: chat_history is extended by its reducer
     return {
-        **state,
         "emotion": emotion,
         "emotion_confidence": confidence,
-        "chat_history": state.get("chat_history", []) + [{"role": "user", "content": user_input}],
+        "emotion_source": source,
+        "chat_history": [{"role": "user", "content": state["user_input"]}],
     }
 
 
+def get_emotion_classifier_stats() -> Dict[str, Any]:
+    """
+    Returns agreement-rate and LLM-calls-avoided metrics of the local emotion classifier.
+    """
+    if local_classifier is None:
+        return {}
+    return local_classifier.metrics.get_stats()
+
+
+def route_emotion(state: ChatState) -> str:
+    return state.get("emotion", "neutral")
+
+
+def route_tts(state: ChatState) -> str:
+    """
+    Skip the TTS node when the caller synthesizes audio after replying (defer_tts)
+    or when there is no reply to speak (the LLM call failed or missed its deadline).
+    """
+    return "skip" if state.get("defer_tts") or not state.get("response") else "synthesize"
+
+
 # --- Graph Construction Function ---
 def get_graph():
     """
@@ -97,42 +185,25 @@ def get_graph():
     Returns:
         StateGraph: Compiled LangGraph ready for execution
     """
-    main_graph = StateGraph(dict)
+    main_graph = StateGraph(ChatState)
 
     # Add emotion detection
     main_graph.add_node("detect_emotion", RunnableLambda(detect_emotion))
 
-    # Add subgraphs for each emotional path
-    main_graph.add_node("sad_flow", build_sad_flow(client, tts_provider, emotion_logger).compile())
-    main_graph.add_node(
-        "angry_flow", build_angry_flow(client, tts_provider, emotion_logger).compile()
-    )
-    main_graph.add_node(
-        "excited_flow", build_excited_flow(client, tts_provider, emotion_logger).compile()
-    )
-    main_graph.add_node(
-        "gentle_flow", build_gentle_flow(client, tts_provider, emotion_logger).compile()
-    )
-    main_graph.add_node(
-        "neutral_flow", build_neutral_flow(client, tts_provider, emotion_logger).compile()
-    )
+    # Flows are direct nodes: no nested graph invocation per turn
+    flow_exits = add_flow_nodes(main_graph, client, emotion_logger)
+
+    # Speech is synthesized once, after whichever flow produced the response
+    main_graph.add_node("text_to_speech", text_to_speech(tts_provider, phrase_bank))
+    for exit_node in flow_exits.values():
+        main_graph.add_conditional_edges(
+            exit_node, route_tts, {"synthesize": "text_to_speech", "skip": END}
+        )
+    main_graph.add_edge("text_to_speech", END)
 
     # Set entry and conditional routing
     main_graph.set_entry_point("detect_emotion")
-    main_graph.add_conditional_edges(
-        "detect_emotion",
-        lambda state: state.get("emotion", "neutral"),
-        {
-            "sad": "sad_flow",
-            "angry": "angry_flow",
-            "happy": "excited_flow",
-            "excited": "excited_flow",
-            "anxious": "gentle_flow",
-            "embarrassed": "gentle_flow",
-            "scared": "gentle_flow",
-            "neutral": "neutral_flow",
-        },
-    )
+    main_graph.add_conditional_edges("detect_emotion", route_emotion, EMOTION_ROUTES)
 
     return main_graph.compile()
 
@@ -141,18 +212,32 @@ def main():
     """
     Main function to initialize clients and set up the chatbot.
     """
-    global client, tts_provider, emotion_logger
+    global client, tts_provider, emotion_logger, local_classifier, emotion_batcher
+    global memory_summarizer, phrase_bank
 
     # Initialize clients and environment
     client, tts_provider, emotion_logger = initialize_clients()
+    if ENABLE_LOCAL_EMOTION_CLASSIFIER:
+        local_classifier = LocalEmotionClassifier.from_log(LEGACY_LOG_FILE, LOG_FILE)
+    if ENABLE_EMOTION_BATCHING:
+        emotion_batcher = EmotionBatcher(
+            client, max_batch_size=EMOTION_BATCH_MAX_SIZE, max_wait_ms=EMOTION_BATCH_MAX_WAIT_MS
+        )
+    if ENABLE_MEMORY_SUMMARY:
+        memory_summarizer = MemorySummarizer(client)
+    if ENABLE_PHRASE_BANK:
+        # Filled in the background; until then replies are synthesized whole
+        phrase_bank = PhraseBank(tts_provider, cache_dir=PHRASE_BANK_PATH)
+        phrase_bank.load_in_background(fixed_phrases(), interval=PHRASE_BANK_SYNTHESIS_INTERVAL)
 
     # Create and return the chatbot
     return get_graph()
 
 
 # --- Final Compiled Graph ---
-# Initialize the chatbot when the module is imported
-chatbot = None
+# Created on first use, so importing this module does not create clients or compile the graph
+_chatbot = None
+_chatbot_lock = threading.Lock()
 
 
 def get_chatbot():
@@ -160,15 +245,45 @@ def get_chatbot():
     Returns the initialized chatbot, creating it if necessary.
     This ensures the chatbot is properly initialized regardless of how the module is used.
     """
-    global chatbot
-    if chatbot is None:
-        chatbot = main()
-    return chatbot
+    global _chatbot
+    if _chatbot is None:
+        # Concurrent first calls (e.g. from executor threads) must not each run main()
+        with _chatbot_lock:
+            if _chatbot is None:
+                _chatbot = main()
+    return _chatbot
+
+
+def get_speech_provider():
+    """
+    Returns the TTS provider used by the chatbot.
+    """
+    get_chatbot()
+    return tts_provider
+
+
+def get_phrase_bank():
+    """
+    Returns the bank of pre-synthesized fixed phrases, or None if it is disabled.
+    """
+    get_chatbot()
+    return phrase_bank
+
+
+def get_memory_summarizer():
+    """
+    Returns the rolling memory summarizer, or None if memory summarization is disabled.
+    """
+    get_chatbot()
+    return memory_summarizer
+
 
+def __getattr__(name: str):
+    # Backward compatibility: `chatbot.chatbot` still returns the compiled graph, built lazily
+    if name == "chatbot":
+        return get_chatbot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize immediately for backward compatibility
-chatbot = get_chatbot()
 
 if __name__ == "__main__":
-    # When run directly, chatbot is already initialized
-    pass
+    get_chatbot()
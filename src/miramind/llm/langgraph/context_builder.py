@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from miramind.llm.langgraph.performance_config import CONTEXT_TOKEN_BUDGET, MAX_CHAT_HISTORY
+from miramind.shared.logger import logger
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators added by the chat format
+TOKEN_CACHE_SIZE = 4096
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if tiktoken (or its data) is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.info(f"tiktoken unavailable, approximating token counts: {e}")
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text with tiktoken, or approximate (~4 characters per token)
+    when tiktoken is not installed.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _normalize(message: Dict) -> Dict[str, str]:
+    """Convert a history entry to {"role", "content"} (the frontend may send "type")."""
+    role = message.get("role") or message.get("type") or "user"
+    return {"role": role, "content": message.get("content", "")}
+
+
+class ContextBuilder:
+    """
+    Builds chat completion messages that fit a token budget: the system prompt,
+    the per-turn instructions (with memory) and the current user message always,
+    then as many of the most recent history turns as fit (at most max_history).
+
+    The static system prompt comes first and everything that varies per flow
+    or turn comes last, so consecutive requests share the longest possible
+    prefix and hit the provider's prompt cache.
+
+    Token counts are cached per message, so each turn only counts messages that
+    were not seen before.
+
+    Attributes:
+        token_budget: maximum prompt tokens for system prompt, memory, history and input.
+        max_history: maximum history messages, however short they are.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        cache_size: int = TOKEN_CACHE_SIZE,
+        max_history: int = MAX_CHAT_HISTORY,
+    ):
+        self.token_budget = token_budget
+        self.max_history = max_history
+        self.cache_size = cache_size
+        self._token_cache = OrderedDict()  # (role, content) -> token count
+        self._lock = threading.Lock()
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        """Token count of one message including chat-format overhead (cached)."""
+        key = (message["role"], message["content"])
+        with self._lock:
+            count = self._token_cache.get(key)
+            if count is not None:
+                self._token_cache.move_to_end(key)
+                return count
+        count = count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._token_cache[key] = count
+            while len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return count
+
+    def fit_history(self, history: List[Dict], budget: int) -> List[Dict[str, str]]:
+        """
+        Select the most recent history messages (at most max_history) whose total
+        token count fits budget.
+
+        Args:
+            history: chat history, oldest first.
+            budget: available tokens.
+
+        Returns:
+            list of normalized messages, oldest first.
+        """
+        window = []
+        remaining = budget
+        for message in reversed(history):
+            if len(window) >= self.max_history:
+                break
+            normalized = _normalize(message)
+            if not normalized["content"]:
+                continue
+            tokens = self.message_tokens(normalized)
+            if tokens > remaining:
+                break
+            remaining -= tokens
+            window.append(normalized)
+        window.reverse()
+        return window
+
+    def build(
+        self,
+        system_prompt: str,
+        history: List[Dict],
+        user_input: str,
+        memory: str = "",
+        instructions: str = "",
+    ) -> List[Dict[str, str]]:
+        """
+        Build the message list for a chat completion.
+
+        Args:
+            system_prompt: static instructions, identical across flows and turns.
+            history: chat history, oldest first. A trailing copy of user_input is ignored.
+            user_input: current user message.
+            memory: summary of earlier conversation, added to the turn instructions.
+            instructions: per-flow or per-turn instructions (e.g. the response style).
+
+        Returns:
+            list of messages: system, recent history, turn instructions (if any), user input.
+        """
+        system = {"role": "system", "content": system_prompt}
+        user = {"role": "user", "content": user_input}
+        if memory:
+            instructions = "\n".join(
+                filter(None, [instructions, f"What you remember from earlier: {memory}"])
+            )
+        turn = [{"role": "system", "content": instructions}] if instructions else []
+
+        if history and _normalize(history[-1]) == user:
+            history = history[:-1]
+
+        budget = self.token_budget - sum(self.message_tokens(m) for m in [system, user] + turn)
+        return [system] + self.fit_history(history, max(budget, 0)) + turn + [user]
+
+
+context_builder = ContextBuilder()
+
+
+def trim_history(history: List[Dict], token_budget: int = None) -> List[Dict[str, str]]:
+    """
+    Keep the most recent history messages (at most MAX_CHAT_HISTORY) that fit
+    token_budget (default CONTEXT_TOKEN_BUDGET).
+    """
+    budget = context_builder.token_budget if token_budget is None else token_budget
+    return context_builder.fit_history(history, budget)
@@ -0,0 +1,139 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from miramind.llm.langgraph.emotion_parser import (
+    BATCH_EMOTION_RESPONSE_FORMAT,
+    parse_emotion_batch,
+)
+from miramind.llm.langgraph.utils import DEFAULT_MODEL, call_openai
+from miramind.shared.logger import logger
+
+BATCH_EMOTION_PROMPT = (
+    "Classify the emotion of each message as: happy, sad, angry, scared, excited, embarrassed, "
+    "anxious, or neutral. Input is a JSON array of {\"id\", \"text\"}. "
+    "Respond in JSON: {\"results\": [{\"id\": 0, \"emotion\": \"happy\", \"confidence\": 0.92}]}"
+)
+FALLBACK_RESULT = ("neutral", 0.0)
+
+
+class EmotionBatcher:
+    """
+    Collects emotion classification requests from concurrent callers for a few
+    milliseconds and classifies them with one multi-item LLM request.
+
+    Callers block in classify() until the batch containing their message is answered.
+
+    Attributes:
+        client: OpenAI client used for batch requests.
+        max_batch_size: maximum number of messages sent in one request.
+        max_wait: seconds the first message of a batch waits for companions.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 15.0,
+        model: str = DEFAULT_MODEL,
+        max_concurrent_batches: int = 4,
+    ):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.model = model
+        self._queue = queue.Queue()
+        self._dispatcher = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="emotion-batch"
+        )
+        self._collector = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches_sent = 0
+        self.items_classified = 0
+
+    def classify(self, text: str, timeout: float = None) -> Tuple[str, float]:
+        """
+        Classify one message, sharing the API request with concurrent callers.
+
+        Args:
+            text: user message.
+            timeout: seconds to wait for the result (None waits indefinitely).
+
+        Returns:
+            (emotion, confidence); ("neutral", 0.0) if the batch request failed.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future))
+        return future.result(timeout=timeout)
+
+    def get_stats(self) -> Dict:
+        """Get batching statistics."""
+        with self._stats_lock:
+            return {
+                "batches_sent": self.batches_sent,
+                "items_classified": self.items_classified,
+                "avg_batch_size": (
+                    self.items_classified / self.batches_sent if self.batches_sent else 0.0
+                ),
+            }
+
+    def _ensure_started(self):
+        if self._collector is not None:
+            return
+        with self._start_lock:
+            if self._collector is None:
+                self._collector = threading.Thread(
+                    target=self._collect, name="emotion-batch-collector", daemon=True
+                )
+                self._collector.start()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatcher.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Future]]):
+        try:
+            results = self._classify_batch([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Batched emotion classification failed: {e}")
+            results = {}
+
+        with self._stats_lock:
+            self.batches_sent += 1
+            self.items_classified += len(batch)
+
+        for index, (_, future) in enumerate(batch):
+            future.set_result(results.get(index, FALLBACK_RESULT))
+
+    def _classify_batch(self, texts: List[str]) -> Dict[int, Tuple[str, float]]:
+        items = [{"id": index, "text": text} for index, text in enumerate(texts)]
+        messages = [
+            {"role": "system", "content": BATCH_EMOTION_PROMPT},
+            {"role": "user", "content": json.dumps(items, ensure_ascii=False)},
+        ]
+        raw = call_openai(
+            self.client,
+            messages,
+            model=self.model,
+            max_tokens=16 * len(texts) + 8,
+            temperature=0.0,
+            response_format=BATCH_EMOTION_RESPONSE_FORMAT,
+            label="emotion_batch",
+        )
+        logger.info(f"Classified emotion batch of {len(texts)} messages")
+        return parse_emotion_batch(raw)
@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+from miramind.llm.langgraph.emotion_log import read_emotion_log
+from miramind.shared.logger import logger
+
+EMOTIONS = ("happy", "sad", "angry", "scared", "excited", "embarrassed", "anxious", "neutral")
+
+# Keywords (and short phrases) that are strong evidence for an emotion on their own.
+EMOTION_LEXICON = {
+    "happy": {"happy", "glad", "great", "good", "love", "nice", "thank", "thanks", "yay", "fun"},
+    "sad": {
+        "sad",
+        "cry",
+        "crying",
+        "cried",
+        "lonely",
+        "alone",
+        "unhappy",
+        "upset",
+        "miss",
+        "hurt",
+        "mean to me",
+        "no friends",
+    },
+    "angry": {"angry", "mad", "hate", "furious", "annoyed", "unfair", "stupid", "shut up"},
+    "scared": {"scared", "afraid", "frightened", "terrified", "monster", "nightmare", "hide"},
+    "excited": {"excited", "awesome", "amazing", "can't wait", "cant wait", "wow", "best"},
+    "embarrassed": {"embarrassed", "ashamed", "awkward", "laughed at", "everyone saw"},
+    "anxious": {"worried", "worry", "nervous", "anxious", "stressed", "run away", "what if"},
+    "neutral": set(),
+}
+NEGATIONS = {"not", "no", "never", "dont", "don't", "isnt", "isn't", "wasnt", "wasn't"}
+LEXICON_WEIGHT = 3.0
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ClassifierMetrics:
+    """
+    Counters describing how often the local classifier replaced the LLM call
+    and how often it agreed with the LLM when the LLM was consulted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.local_answers = 0
+        self.llm_calls = 0
+        self.agreements = 0
+
+    def record_local_answer(self):
+        with self.lock:
+            self.local_answers += 1
+
+    def record_llm_answer(self, local_emotion: str, llm_emotion: str):
+        with self.lock:
+            self.llm_calls += 1
+            if local_emotion == llm_emotion:
+                self.agreements += 1
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            total = self.local_answers + self.llm_calls
+            return {
+                "llm_calls_avoided": self.local_answers,
+                "llm_calls": self.llm_calls,
+                "avoided_ratio": self.local_answers / total if total else 0.0,
+                "agreement_rate": self.agreements / self.llm_calls if self.llm_calls else 0.0,
+            }
+
+
+class LocalEmotionClassifier:
+    """
+    In-process emotion classifier: a keyword lexicon combined with a linear model
+    over hashed unigram/bigram features.
+
+    Attributes:
+        n_features: size of the hashed feature space.
+        weights: emotion -> {feature index: weight}.
+        bias: emotion -> bias term.
+        metrics: ClassifierMetrics shared with the caller deciding whether to use the LLM.
+    """
+
+    def __init__(self, n_features: int = 2**14):
+        self.n_features = n_features
+        self.weights = {emotion: {} for emotion in EMOTIONS}
+        self.bias = {emotion: 0.0 for emotion in EMOTIONS}
+        self.metrics = ClassifierMetrics()
+
+    def _features(self, tokens: List[str]) -> List[int]:
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode()) % self.n_features for gram in grams]
+
+    @staticmethod
+    def _lexicon_hits(tokens: List[str]) -> Dict[str, int]:
+        hits = {}
+        padded = " " + " ".join(tokens) + " "
+        for emotion, words in EMOTION_LEXICON.items():
+            for word in words:
+                # Every occurrence counts ("sad, so sad" is more evidence than "sad")
+                start = padded.find(f" {word} ")
+                while start >= 0:
+                    preceding = padded[:start].split()[-1:]
+                    if not (preceding and preceding[0] in NEGATIONS):
+                        hits[emotion] = hits.get(emotion, 0) + 1
+                    start = padded.find(f" {word} ", start + 1)
+        return hits
+
+    def _scores(self, tokens: List[str]) -> Dict[str, float]:
+        features = self._features(tokens)
+        hits = self._lexicon_hits(tokens)
+        scores = {}
+        for emotion in EMOTIONS:
+            w = self.weights[emotion]
+            scores[emotion] = (
+                self.bias[emotion]
+                + sum(w.get(f, 0.0) for f in features)
+                + LEXICON_WEIGHT * hits.get(emotion, 0)
+            )
+        return scores
+
+    @staticmethod
+    def _softmax(scores: Dict[str, float]) -> Dict[str, float]:
+        top = max(scores.values())
+        exp = {emotion: math.exp(score - top) for emotion, score in scores.items()}
+        total = sum(exp.values())
+        return {emotion: value / total for emotion, value in exp.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Classify text.
+
+        Args:
+            text: user message.
+
+        Returns:
+            (emotion, confidence) where confidence is the softmax probability of the top label.
+        """
+        probabilities = self._softmax(self._scores(_tokenize(text)))
+        emotion = max(probabilities, key=probabilities.get)
+        return emotion, probabilities[emotion]
+
+    def fit(self, examples: Iterable[Tuple[str, str]], epochs: int = 20, lr: float = 0.5):
+        """
+        Train the linear model with softmax-regression SGD.
+
+        Args:
+            examples: (text, emotion) pairs; unknown emotions are skipped.
+            epochs: passes over the data.
+            lr: learning rate.
+        """
+        data = [(_tokenize(text), label) for text, label in examples if label in self.weights]
+        for _ in range(epochs):
+            for tokens, label in data:
+                features = self._features(tokens)
+                probabilities = self._softmax(self._scores(tokens))
+                for emotion in EMOTIONS:
+                    gradient = probabilities[emotion] - (1.0 if emotion == label else 0.0)
+                    if abs(gradient) < 1e-6:
+                        continue
+                    w = self.weights[emotion]
+                    for f in features:
+                        w[f] = w.get(f, 0.0) - lr * gradient
+                    self.bias[emotion] -= lr * gradient * 0.1
+        return self
+
+    @classmethod
+    def from_log(cls, *filepaths: str, min_confidence: float = 0.5):
+        """
+        Build a classifier trained on labelled entries of emotion logs.
+
+        Only entries labelled by the LLM (source "llm") are used: training on the
+        classifier's own answers would reinforce its mistakes. Entries of the
+        legacy JSON-array log have no source but were all labelled by the LLM, so
+        they are used; JSONL entries without a source are skipped. Entries below
+        min_confidence are skipped: a confidence of 0.0 means the LLM reply could
+        not be parsed and the label is just the neutral fallback.
+
+        Args:
+            filepaths: emotion logs (JSONL or legacy JSON array).
+            min_confidence: minimum LLM confidence for an entry to be used as a label.
+
+        Returns:
+            LocalEmotionClassifier (lexicon-only if the logs are missing or unreadable).
+        """
+        classifier = cls()
+        # Only the LLM labelled emotions when the legacy log was written
+        entries = read_emotion_log(*filepaths, legacy_source="llm")
+        if not entries:
+            return classifier
+
+        examples = [
+            (entry["input"], entry["emotion"])
+            for entry in entries
+            if entry.get("input")
+            and entry.get("source") == "llm"
+            and entry.get("confidence", 0.0) >= min_confidence
+        ]
+        logger.info(f"Training local emotion classifier on {len(examples)} examples")
+        return classifier.fit(examples)
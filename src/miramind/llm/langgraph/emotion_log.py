@@ -0,0 +1,205 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from miramind.llm.langgraph.performance_config import (
+    EMOTION_LOG_BACKUP_COUNT,
+    EMOTION_LOG_MAX_BATCH,
+    EMOTION_LOG_MAX_BYTES,
+    EMOTION_LOG_QUEUE_SIZE,
+)
+from miramind.shared.logger import logger
+
+_STOP = object()
+
+
+class EmotionLogger:
+    """
+    Append-only JSONL emotion log written by a single background thread.
+
+    log() only enqueues the entry, so callers never touch the file. The writer
+    drains everything queued since its last write, appends it and fsyncs once
+    per batch, and rotates the file when it grows past max_bytes
+    (emotion_log.jsonl -> emotion_log.jsonl.1 -> ...).
+
+    Attributes:
+        filepath: path of the JSONL log.
+        max_bytes: size at which the log is rotated (0 disables rotation).
+        backup_count: number of rotated files kept.
+        dropped: entries dropped because the queue was full.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        max_queue_size: int = EMOTION_LOG_QUEUE_SIZE,
+        max_bytes: int = EMOTION_LOG_MAX_BYTES,
+        backup_count: int = EMOTION_LOG_BACKUP_COUNT,
+        max_batch: int = EMOTION_LOG_MAX_BATCH,
+    ):
+        self.filepath = filepath
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._writer = None
+        self._start_lock = threading.Lock()
+
+    def log(
+        self,
+        input_text: str,
+        emotion: str,
+        confidence: float,
+        response_text: str = "",
+        source: str = "llm",
+    ):
+        """
+        Queue one entry. source is what labelled the emotion: "llm", or "local" for
+        the local classifier (whose labels must not be used to train it).
+        """
+        entry = {
+            "input": input_text,
+            "emotion": emotion,
+            "confidence": round(confidence, 2),
+            "response": response_text,
+            "source": source,
+        }
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+            logger.warning(f"Emotion log queue full, dropped {self.dropped} entries")
+
+    def flush(self):
+        """Block until every entry logged so far is written and synced."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write pending entries and stop the writer thread."""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+
+    def _ensure_started(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="emotion-log-writer", daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            entries = [entry for entry in batch if entry is not _STOP]
+            stopping = len(entries) < len(batch)
+            try:
+                if entries:
+                    self._write(entries)
+            except Exception as e:
+                logger.error(f"Emotion logging failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, entries: List[Dict]):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes and os.path.exists(self.filepath):
+            if os.path.getsize(self.filepath) >= self.max_bytes:
+                self._rotate()
+
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with open(self.filepath, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.filepath)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.filepath}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.filepath}.{index + 1}")
+        os.replace(self.filepath, f"{self.filepath}.1")
+
+
+def _read_file(filepath: str, legacy_source: Optional[str] = None) -> List[Dict]:
+    with open(filepath, "r", encoding="utf-8") as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        # Legacy format: one JSON array rewritten on every entry
+        entries = json.loads(content)
+        if legacy_source is not None:
+            entries = [{"source": legacy_source, **entry} for entry in entries]
+        return entries
+
+    entries = []
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # A torn last line after a crash
+            continue
+    return entries
+
+
+def read_emotion_log(
+    *filepaths: str, include_rotated: bool = True, legacy_source: Optional[str] = None
+) -> List[Dict]:
+    """
+    Read emotion log entries, oldest first.
+
+    Accepts both the JSONL log and the legacy JSON-array log. Missing or
+    unreadable files are skipped.
+
+    Args:
+        filepaths: log files, in chronological order.
+        include_rotated: also read rotated backups (filepath.N ... filepath.1).
+        legacy_source: source given to entries of legacy JSON-array logs that have none.
+
+    Returns:
+        list of log entries.
+    """
+    entries = []
+    for filepath in filepaths:
+        paths = []
+        if include_rotated:
+            index = 1
+            while os.path.exists(f"{filepath}.{index}"):
+                paths.insert(0, f"{filepath}.{index}")
+                index += 1
+        paths.append(filepath)
+
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                entries.extend(_read_file(path, legacy_source))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read emotion log {path}: {e}")
+    return entries
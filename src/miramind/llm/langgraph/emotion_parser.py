@@ -0,0 +1,190 @@
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from miramind.llm.langgraph.emotion_classifier import EMOTIONS
+
+_decoder = json.JSONDecoder()
+
+# Structured-output schemas: the model can only emit a valid label, so replies are
+# a handful of tokens and never contain prose around the JSON.
+_EMOTION_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "emotion": {"type": "string", "enum": list(EMOTIONS)},
+        "confidence": {"type": "number"},
+    },
+    "required": ["emotion", "confidence"],
+    "additionalProperties": False,
+}
+EMOTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "emotion", "strict": True, "schema": _EMOTION_ITEM_SCHEMA},
+}
+BATCH_EMOTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "emotions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            **_EMOTION_ITEM_SCHEMA["properties"],
+                        },
+                        "required": ["id", "emotion", "confidence"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class ParseStats:
+    """
+    Counters of parsed emotion replies and of parse failures by reason.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.parsed = 0
+        self.failures = {}
+
+    def record_success(self):
+        with self.lock:
+            self.parsed += 1
+
+    def record_failure(self, reason: str):
+        with self.lock:
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            failed = sum(self.failures.values())
+            total = self.parsed + failed
+            return {
+                "parsed": self.parsed,
+                "failed": failed,
+                "failure_rate": failed / total if total else 0.0,
+                "failures_by_reason": dict(self.failures),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.parsed = 0
+            self.failures = {}
+
+
+parse_stats = ParseStats()
+
+
+def _decode_json(raw: str, opening: str) -> Any:
+    """
+    Decode the first JSON value starting with `opening` in raw.
+
+    The common case (the whole reply is the JSON value) is a single json.loads;
+    otherwise decoding starts at the first opening bracket and stops at the end of
+    that value, so trailing prose is never scanned.
+    """
+    text = raw.strip()
+    if text.startswith(opening):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    start = text.find(opening)
+    if start < 0:
+        raise LookupError("no JSON value in reply")
+    value, _ = _decoder.raw_decode(text, start)
+    return value
+
+
+def _to_result(item: Dict) -> Optional[Tuple[str, float]]:
+    emotion = item.get("emotion")
+    if emotion not in EMOTIONS:
+        return None
+    try:
+        return emotion, float(item.get("confidence", 0.0))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_emotion(raw: str) -> Optional[Tuple[str, float]]:
+    """
+    Parse a single emotion classification reply.
+
+    Args:
+        raw: model reply, ideally {"emotion": ..., "confidence": ...}.
+
+    Returns:
+        (emotion, confidence) or None if the reply cannot be used.
+    """
+    if not raw:
+        parse_stats.record_failure("empty")
+        return None
+    try:
+        value = _decode_json(raw, "{")
+    except LookupError:
+        parse_stats.record_failure("no_json")
+        return None
+    except ValueError:
+        parse_stats.record_failure("invalid_json")
+        return None
+
+    result = _to_result(value) if isinstance(value, dict) else None
+    if result is None:
+        parse_stats.record_failure("invalid_label")
+        return None
+    parse_stats.record_success()
+    return result
+
+
+def parse_emotion_batch(raw: str) -> Dict[int, Tuple[str, float]]:
+    """
+    Parse a batch classification reply into id -> (emotion, confidence).
+
+    Accepts either {"results": [...]} (structured output) or a bare JSON array.
+    Malformed items are skipped and counted as failures.
+    """
+    if not raw:
+        parse_stats.record_failure("empty")
+        return {}
+    array_start, object_start = raw.find("["), raw.find("{")
+    opening = "[" if 0 <= array_start and (object_start < 0 or array_start < object_start) else "{"
+    try:
+        value = _decode_json(raw, opening)
+    except LookupError:
+        parse_stats.record_failure("no_json")
+        return {}
+    except ValueError:
+        parse_stats.record_failure("invalid_json")
+        return {}
+
+    items = value.get("results", []) if isinstance(value, dict) else value
+    if not isinstance(items, list):
+        parse_stats.record_failure("invalid_json")
+        return {}
+
+    results = {}
+    for item in items:
+        result = _to_result(item) if isinstance(item, dict) else None
+        if result is None or not isinstance(item.get("id"), int):
+            parse_stats.record_failure("invalid_label")
+            continue
+        parse_stats.record_success()
+        results[item["id"]] = result
+    return results
+
+
+def get_parse_stats() -> Dict:
+    """Get emotion reply parsing statistics."""
+    return parse_stats.get_stats()
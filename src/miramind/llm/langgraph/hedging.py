@@ -0,0 +1,337 @@
+"""
+Deadline-aware, hedged execution of blocking API requests.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from miramind.shared.logger import logger
+from miramind.shared.tracing import in_context, span
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before a result arrived."""
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until deadline (a time.monotonic() value), or None without a deadline."""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent latencies of successful requests.
+
+    Attributes:
+        window: number of latencies kept.
+        min_samples: latencies needed before percentile() answers.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q (0-1), or None while there are too few samples."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = list(self._samples)
+        return _percentile(samples, q)
+
+
+class HedgeMetrics:
+    """
+    Counters and latencies of hedged calls.
+
+    Besides the latency callers observed, the latency of each call's first
+    attempt is kept (recorded even when a hedge won), which is what callers
+    would have seen without hedging.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.failures = 0
+        self._observed = deque(maxlen=window)
+        self._unhedged = deque(maxlen=window)
+
+    def record(self, name: str, count: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def record_observed(self, seconds: float):
+        with self._lock:
+            self._observed.append(seconds)
+
+    def record_unhedged(self, seconds: float):
+        with self._lock:
+            self._unhedged.append(seconds)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            observed, unhedged = list(self._observed), list(self._unhedged)
+            stats = {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "retries": self.retries,
+                "deadline_exceeded": self.deadline_exceeded,
+                "failures": self.failures,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0,
+            }
+        for q, label in ((0.5, "p50"), (0.95, "p95"), (0.99, "p99")):
+            observed_q, unhedged_q = _percentile(observed, q), _percentile(unhedged, q)
+            stats[f"latency_{label}_ms"] = observed_q * 1000 if observed_q is not None else None
+            stats[f"unhedged_{label}_ms"] = unhedged_q * 1000 if unhedged_q is not None else None
+        if stats["latency_p99_ms"] is not None and stats["unhedged_p99_ms"] is not None:
+            stats["p99_improvement_ms"] = stats["unhedged_p99_ms"] - stats["latency_p99_ms"]
+        return stats
+
+
+class HedgedCaller:
+    """
+    Runs a blocking request within a deadline, hedging slow attempts and
+    retrying transient errors.
+
+    When an attempt is slower than the hedge percentile of recent latencies of
+    the same kind of request (its `key`, e.g. the flow or model), a duplicate is
+    sent and the first successful result wins. The loser is cancelled if it has
+    not started; a request already in flight cannot be interrupted, so its
+    result is discarded instead (its timeout never exceeds the deadline).
+
+    An attempt is timed from when a worker starts it, so waiting for a free
+    worker neither triggers a hedge nor shortens its timeout. Retries use
+    full-jitter exponential backoff and only happen while the deadline leaves
+    time for another typical attempt.
+
+    Attributes:
+        hedge_percentile: latency quantile after which a hedge is sent (None disables hedging).
+        max_retries: retries of errors accepted by `retryable`.
+        backoff_base: seconds; the n-th retry sleeps uniform(0, base * 2**n).
+        backoff_max: upper bound of one backoff sleep.
+    """
+
+    def __init__(
+        self,
+        hedge_percentile: Optional[float] = 0.95,
+        min_samples: int = 20,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        retryable: Tuple[Type[BaseException], ...] = (),
+        max_workers: int = 16,
+    ):
+        self.hedge_percentile = hedge_percentile
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retryable = retryable
+        self.min_samples = min_samples
+        self.latency = LatencyTracker(min_samples=min_samples)  # Of calls without a key
+        self.metrics = HedgeMetrics()
+        self._latencies: Dict[str, LatencyTracker] = {"": self.latency}
+        self._latencies_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._queued = 0  # Attempts submitted to the pool that no worker started yet
+        self._queued_lock = threading.Lock()
+
+    def call(
+        self,
+        attempt: Callable[[float], T],
+        deadline: Optional[float] = None,
+        timeout: float = 10.0,
+        key: str = "",
+    ) -> T:
+        """
+        Run attempt(timeout) until it succeeds, the retries are spent or the deadline passes.
+
+        Args:
+            attempt: performs one request with the given per-attempt timeout (seconds).
+            deadline: time.monotonic() by which a result is needed (None: no deadline).
+            timeout: per-attempt timeout when the deadline is further away.
+            key: kind of request; hedge delays follow the latencies of calls with the same key.
+
+        Returns:
+            result of the first successful attempt.
+
+        Raises:
+            DeadlineExceeded: if the deadline passed first.
+            Exception: the last attempt's error if it is not retryable or retries are spent.
+        """
+        self.metrics.record("requests")
+        start = time.monotonic()
+        retries = 0
+        while True:
+            try:
+                result = self._attempt(attempt, deadline, timeout, key)
+                self.metrics.record_observed(time.monotonic() - start)
+                return result
+            except DeadlineExceeded:
+                self.metrics.record("deadline_exceeded")
+                raise
+            except self.retryable as e:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**retries))
+                if retries >= self.max_retries or not self._has_budget(deadline, delay, key):
+                    self.metrics.record("failures")
+                    raise
+                retries += 1
+                self.metrics.record("retries")
+                logger.warning(f"Retrying after {e!r} (attempt {retries}, backoff {delay:.2f}s)")
+                time.sleep(delay)
+            except Exception:
+                self.metrics.record("failures")
+                raise
+
+    def latency_for(self, key: str = "") -> LatencyTracker:
+        """Recent attempt latencies of calls with the given key."""
+        with self._latencies_lock:
+            if key not in self._latencies:
+                self._latencies[key] = LatencyTracker(min_samples=self.min_samples)
+            return self._latencies[key]
+
+    def get_stats(self) -> Dict:
+        """
+        Metrics of all calls; hedge_delay_ms is that of calls without a key and
+        hedge_delay_ms_by_key that of each key. queue_depth is the number of
+        attempts waiting for a free worker.
+        """
+        stats = self.metrics.get_stats()
+        with self._queued_lock:
+            stats["queue_depth"] = self._queued
+        with self._latencies_lock:
+            keys = list(self._latencies)
+        delays = {key: self._hedge_delay(key) for key in keys}
+        delays_ms = {
+            key: delay * 1000 if delay is not None else None for key, delay in delays.items()
+        }
+        stats["hedge_delay_ms"] = delays_ms[""]
+        stats["hedge_delay_ms_by_key"] = {key: ms for key, ms in delays_ms.items() if key}
+        return stats
+
+    def _hedge_delay(self, key: str = "") -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        return self.latency_for(key).percentile(self.hedge_percentile)
+
+    def _has_budget(self, deadline: Optional[float], delay: float, key: str = "") -> bool:
+        """Whether sleeping `delay` still leaves time for a typical (p50) attempt."""
+        left = remaining(deadline)
+        return left is None or left > delay + (self.latency_for(key).percentile(0.5) or 0.0)
+
+    def _attempt_timeout(self, deadline: Optional[float], timeout: float) -> float:
+        left = remaining(deadline)
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("Deadline passed before the request was sent")
+        return timeout if left is None else min(timeout, left)
+
+    def _run(
+        self,
+        attempt: Callable[[float], T],
+        deadline: Optional[float],
+        timeout: float,
+        key: str,
+        primary: bool,
+        started: Optional[threading.Event] = None,
+    ) -> T:
+        # The clock starts here, not at submission: time spent queued for a worker
+        # is not the request's latency, and must not eat into its timeout
+        start = time.monotonic()
+        if started is not None:
+            started.set()
+        attempt_timeout = self._attempt_timeout(deadline, timeout)
+        with span("attempt", hedge=not primary):
+            result = attempt(attempt_timeout)
+        elapsed = time.monotonic() - start
+        self.latency_for(key).record(elapsed)
+        if primary:
+            self.metrics.record_unhedged(elapsed)
+        return result
+
+    def _submit(
+        self,
+        attempt: Callable[[float], T],
+        deadline: Optional[float],
+        timeout: float,
+        key: str,
+        primary: bool,
+        started: Optional[threading.Event] = None,
+    ) -> Future:
+        def run() -> T:
+            with self._queued_lock:
+                self._queued -= 1
+            return self._run(attempt, deadline, timeout, key, primary, started)
+
+        def dequeue_cancelled(future: Future):
+            if future.cancelled():  # Never ran, so run() did not count it out
+                with self._queued_lock:
+                    self._queued -= 1
+
+        with self._queued_lock:
+            self._queued += 1
+        # in_context: the pool's threads record their spans in the caller's trace
+        future = self._pool.submit(in_context(run))
+        future.add_done_callback(dequeue_cancelled)
+        return future
+
+    def _attempt(
+        self, attempt: Callable[[float], T], deadline: Optional[float], timeout: float, key: str
+    ):
+        hedge_delay = self._hedge_delay(key)
+        if hedge_delay is None:
+            # Nothing to race: run in the caller's thread, bounded by the per-attempt timeout
+            return self._run(attempt, deadline, timeout, key, primary=True)
+
+        self._attempt_timeout(deadline, timeout)  # Nothing is sent once the deadline passed
+        started = threading.Event()
+        primary = self._submit(attempt, deadline, timeout, key, True, started)
+        pending = {primary}
+        # The hedge delay counts from when a worker picks the primary up
+        started.wait(timeout=remaining(deadline))
+        left = remaining(deadline)
+        done, _ = wait(
+            pending, timeout=hedge_delay if left is None else max(0, min(hedge_delay, left))
+        )
+        if not done and (left is None or remaining(deadline) > 0):
+            self.metrics.record("hedged")
+            pending.add(self._submit(attempt, deadline, timeout, key, False))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise DeadlineExceeded("Deadline passed while waiting for the request")
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is not primary:
+                        self.metrics.record("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from miramind.llm.langgraph.performance_config import (
+    MEMORY_MAX_SESSIONS,
+    MEMORY_SUMMARY_EVERY_N_TURNS,
+    MEMORY_SUMMARY_MAX_CHARS,
+)
+from miramind.llm.langgraph.utils import DEFAULT_MODEL, call_openai
+from miramind.shared.logger import logger
+
+SUMMARY_PROMPT = (
+    "You keep the memory of a conversation between a child and a supportive companion. "
+    "Merge the current memory with the new turns. Keep the child's name, likes, worries, "
+    "feelings and important events; drop small talk. Reply with at most {max_words} words."
+)
+
+
+class _SessionMemory:
+    def __init__(self, memory: str = ""):
+        self.memory = memory
+        self.pending_turns = []  # turns not yet folded into memory
+        self.in_flight = False
+
+
+class MemorySummarizer:
+    """
+    Maintains a compact rolling memory per conversation session.
+
+    Every `every_n_turns` turns the pending turns and the current memory are summarized
+    into a new memory on a background thread, so no request waits for the summary.
+    The memory is capped at `max_chars`, which keeps the prompt bounded for any session length.
+
+    Attributes:
+        client: OpenAI client used for summarization.
+        every_n_turns: number of turns collected before a summary is scheduled.
+        max_chars: maximum length of the stored memory.
+        max_sessions: number of sessions kept (least recently used are dropped).
+    """
+
+    def __init__(
+        self,
+        client,
+        every_n_turns: int = MEMORY_SUMMARY_EVERY_N_TURNS,
+        max_chars: int = MEMORY_SUMMARY_MAX_CHARS,
+        max_sessions: int = MEMORY_MAX_SESSIONS,
+        executor=None,
+    ):
+        self.client = client
+        self.every_n_turns = every_n_turns
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="memory-summarizer"
+        )
+        self._sessions = OrderedDict()  # session_id -> _SessionMemory
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str, memory: str = "") -> _SessionMemory:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionMemory(memory[: self.max_chars])
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get_memory(self, session_id: str, memory: str = "") -> str:
+        """
+        Get the current memory of a session.
+
+        Args:
+            session_id: conversation session id.
+            memory: memory sent by the client, used to seed a session seen for the first time.
+
+        Returns:
+            str: memory to inject into the system prompt.
+        """
+        with self._lock:
+            return self._session(session_id, memory).memory
+
+    def record_turn(self, session_id: str, user_input: str, reply: str) -> None:
+        """
+        Record a finished turn and schedule a background summary every N turns.
+
+        Args:
+            session_id: conversation session id.
+            user_input: child's message.
+            reply: assistant's reply.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            session.pending_turns.append((user_input, reply))
+            # Bound pending turns in case summaries keep failing
+            del session.pending_turns[: -2 * self.every_n_turns]
+            if session.in_flight or len(session.pending_turns) < self.every_n_turns:
+                return
+            turns, session.pending_turns = session.pending_turns, []
+            session.in_flight = True
+            memory = session.memory
+
+        self._executor.submit(self._summarize, session_id, memory, turns)
+
+    def _summarize(self, session_id: str, memory: str, turns: List[tuple]) -> None:
+        new_memory = ""
+        try:
+            new_memory = self.summarize(memory, turns)
+        except Exception as e:
+            logger.error(f"Memory summarization failed: {e}")
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.in_flight = False
+            if new_memory:
+                session.memory = new_memory
+                logger.info(f"Updated memory for session {session_id}")
+            else:
+                # Retry with these turns on the next schedule
+                session.pending_turns = turns + session.pending_turns
+
+    def summarize(self, memory: str, turns: List[tuple]) -> str:
+        """
+        Summarize the current memory and new turns into an updated memory.
+
+        Returns:
+            str: new memory (at most max_chars), empty if the API call failed.
+        """
+        transcript = "\n".join(f"Child: {user}\nCompanion: {reply}" for user, reply in turns)
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": SUMMARY_PROMPT.format(max_words=self.max_chars // 6)},
+            {
+                "role": "user",
+                "content": f"Current memory: {memory or '(empty)'}\n\nNew turns:\n{transcript}",
+            },
+        ]
+        summary = call_openai(
+            self.client,
+            messages,
+            model=DEFAULT_MODEL,
+            max_tokens=self.max_chars // 3,
+            temperature=0.2,
+            label="memory_summary",
+        )
+        return summary[: self.max_chars]
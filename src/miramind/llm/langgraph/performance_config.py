@@ -8,24 +8,63 @@ MAX_TOKENS_RESPONSE = 150  # Limit tokens for response generation
 API_TIMEOUT = 10.0  # API timeout in seconds
 TEMPERATURE = 0.7  # Response creativity level
 
+# Deadlines, Hedging and Retries (OpenAI requests)
+ENABLE_HEDGED_REQUESTS = True  # Send a duplicate request when the first is unusually slow
+HEDGE_LATENCY_PERCENTILE = 0.95  # Hedge once an attempt is slower than this latency quantile
+HEDGE_MIN_SAMPLES = 20  # Recent latencies needed before hedging starts
+MAX_RETRIES = 2  # Retries of transient errors, only while the deadline leaves time
+RETRY_BACKOFF_BASE = 0.2  # Seconds; the n-th retry sleeps up to base * 2**n (full jitter)
+RETRY_BACKOFF_MAX = 2.0  # Upper bound of one backoff sleep
+
+# Upstream Budget (all OpenAI chat requests, including hedges and retries)
+UPSTREAM_REQUESTS_PER_SECOND = 20.0  # Under the provider's limit (for all workers, with Redis)
+UPSTREAM_BURST = 40  # Requests sent at once before smoothing starts
+UPSTREAM_MAX_WAIT = 5.0  # Seconds a request may wait for the budget when it has no deadline
+
 # Context Management
-MAX_CHAT_HISTORY = 4  # Number of previous messages to include
+MAX_CHAT_HISTORY = 12  # Most previous messages included; fewer if they exceed the token budget
+CONTEXT_TOKEN_BUDGET = 1000  # Prompt tokens for system prompt, memory, history and input
 ENABLE_CACHING = True  # Enable response caching
 MAX_CACHE_SIZE = 50  # Maximum number of cached responses
 
+# Rolling Conversation Memory (summarized in the background, off the request path)
+ENABLE_MEMORY_SUMMARY = True  # Keep a compact per-session memory for long conversations
+MEMORY_SUMMARY_EVERY_N_TURNS = 4  # Fold new turns into the memory every N turns
+MEMORY_SUMMARY_MAX_CHARS = 600  # Upper bound on the memory injected into the prompt
+MEMORY_MAX_SESSIONS = 1000  # Sessions whose memory is kept (least recently used dropped)
+
 # Performance Features
 ENABLE_ASYNC_TTS = True  # Use async TTS when available
 ENABLE_ASYNC_LOGGING = True  # Use threaded logging
 ENABLE_PARALLEL_PROCESSING = True  # Enable parallel processing where possible
 
+# Local Emotion Classifier
+ENABLE_LOCAL_EMOTION_CLASSIFIER = True  # Answer confident cases without calling the LLM
+LOCAL_EMOTION_CONFIDENCE_THRESHOLD = 0.85  # Below this the LLM is asked instead
+
+# Emotion Classification Batching (trades a few ms of latency for fewer API requests)
+ENABLE_EMOTION_BATCHING = False  # Enable under load to share requests across sessions
+EMOTION_BATCH_MAX_SIZE = 8  # Maximum messages classified in one request
+EMOTION_BATCH_MAX_WAIT_MS = 15  # How long a request waits for others to join its batch
+
 # TTS Settings
 TTS_PROVIDER = "azure"  # TTS provider to use
 TTS_QUALITY = "standard"  # TTS quality level (standard/premium)
+# Pre-synthesized fixed phrases (sad follow-up etc.) spliced into replies. Off by default: the
+# first start synthesizes ~50 phrases, sharing the TTS quota and circuit breaker with replies
+ENABLE_PHRASE_BANK = False
+PHRASE_BANK_DIR = "phrase_bank"  # Relative to the miramind package (None: memory only)
+PHRASE_BANK_SYNTHESIS_INTERVAL = 1.0  # Seconds between TTS requests while filling the bank
 
 # File I/O
 AUDIO_SAVE_ASYNC = True  # Save audio files asynchronously
+EMOTION_LOG_QUEUE_SIZE = 1000  # Entries waiting for the log writer (more are dropped)
+EMOTION_LOG_MAX_BATCH = 256  # Entries written per fsync
+EMOTION_LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the emotion log at this size
+EMOTION_LOG_BACKUP_COUNT = 3  # Rotated emotion logs kept
 LOG_LEVEL = "INFO"  # Logging level
 
 # Memory Management
+TRACK_OPERATION_MEMORY = False  # Sample RSS before and after tracked operations (two syscalls each)
 MEMORY_CLEANUP_INTERVAL = 100  # Clean memory every N requests
 MAX_MEMORY_SIZE_MB = 100  # Maximum memory usage in MB
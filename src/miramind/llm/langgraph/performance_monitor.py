@@ -1,63 +1,163 @@
 import threading
 import time
-from collections import defaultdict
 from contextlib import contextmanager
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-import psutil
+from miramind.llm.langgraph.performance_config import TRACK_OPERATION_MEMORY
+from miramind.shared.histogram import LogHistogram
+from miramind.shared.tracing import span
 
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
 
-class PerformanceMonitor:
-    """Monitor and track performance metrics for the chatbot."""
+
+class _Samples:
+    """One thread's samples of one operation: a duration histogram and memory delta totals."""
+
+    __slots__ = ("durations", "memory_count", "memory_total", "memory_min", "memory_max")
+
+    def __init__(self):
+        self.durations = LogHistogram()  # Microseconds
+        self.memory_count = 0
+        self.memory_total = 0.0  # MB
+        self.memory_min: Optional[float] = None
+        self.memory_max: Optional[float] = None
+
+    def record_memory(self, delta_mb: float):
+        self.memory_count += 1
+        self.memory_total += delta_mb
+        if self.memory_min is None or delta_mb < self.memory_min:
+            self.memory_min = delta_mb
+        if self.memory_max is None or delta_mb > self.memory_max:
+            self.memory_max = delta_mb
+
+    def merge(self, other: "_Samples"):
+        self.durations.merge(other.durations)
+        if other.memory_count:
+            self.memory_count += other.memory_count
+            self.memory_total += other.memory_total
+            if self.memory_min is None or other.memory_min < self.memory_min:
+                self.memory_min = other.memory_min
+            if self.memory_max is None or other.memory_max > self.memory_max:
+                self.memory_max = other.memory_max
+
+
+class _Counter:
+    """One thread's count of an event."""
+
+    __slots__ = ("value",)
 
     def __init__(self):
-        self.metrics = defaultdict(list)
-        self.start_times = {}
+        self.value = 0
+
+
+class PerformanceMonitor:
+    """
+    Monitor and track performance metrics for the chatbot.
+
+    Every thread records into its own fixed-size histograms and counters, so
+    recording takes no lock and memory does not grow with the number of
+    samples; readers merge the threads' data. Memory deltas (RSS before and after the
+    operation) cost two syscalls per operation and are only sampled with
+    track_memory.
+    """
+
+    def __init__(self, track_memory: bool = TRACK_OPERATION_MEMORY):
+        self.track_memory = track_memory
         self.lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._samples: List[Tuple[str, _Samples]] = []  # Every thread's samples, by operation
+        self._counters: List[Tuple[str, _Counter]] = []  # Every thread's counters, by name
+        self._process = None
 
     @contextmanager
     def track_operation(self, operation_name: str):
-        """Context manager to track operation timing."""
-        start_time = time.time()
-        start_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
-
+        """
+        Context manager to track operation timing. Inside a request trace the
+        operation is also recorded as a span.
+        """
+        start_memory = self._rss_mb() if self.track_memory else None
+        start = time.perf_counter_ns()
         try:
-            yield
+            with span(operation_name):
+                yield
         finally:
-            end_time = time.time()
-            end_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+            duration_ns = time.perf_counter_ns() - start
+            samples = self._thread_samples(operation_name)
+            samples.durations.record(duration_ns // 1000)
+            if start_memory is not None:
+                samples.record_memory(self._rss_mb() - start_memory)
+
+    def record(self, operation_name: str, duration: float, memory_delta: float = None):
+        """Record one sample measured elsewhere (duration in seconds, memory delta in MB)."""
+        samples = self._thread_samples(operation_name)
+        samples.durations.record(int(duration * 1_000_000))
+        if memory_delta is not None:
+            samples.record_memory(memory_delta)
+
+    def increment(self, counter_name: str, amount: int = 1):
+        """Count an event (e.g. a cache hit)."""
+        self._thread_data(counter_name, _Counter).value += amount
+
+    def get_counters(self) -> Dict[str, int]:
+        """Totals of every counter."""
+        with self.lock:
+            counters = list(self._counters)
+        totals: Dict[str, int] = {}
+        for name, counter in counters:
+            totals[name] = totals.get(name, 0) + counter.value
+        return totals
+
+    def operations(self) -> List[str]:
+        """Names of the tracked operations."""
+        with self.lock:
+            return list(dict.fromkeys(name for name, _ in self._samples))
 
-            duration = end_time - start_time
-            memory_delta = end_memory - start_memory
+    def histogram(self, operation_name: str) -> LogHistogram:
+        """All threads' durations of an operation (microseconds) merged into one histogram."""
+        histogram = LogHistogram()
+        for samples in self._operation_samples(operation_name):
+            histogram.merge(samples.durations)
+        return histogram
 
-            with self.lock:
-                self.metrics[operation_name].append(
-                    {'duration': duration, 'memory_delta': memory_delta, 'timestamp': start_time}
-                )
+    def count(self, operation_name: str) -> int:
+        """Number of samples of an operation."""
+        return sum(samples.durations.count for samples in self._operation_samples(operation_name))
 
     def get_stats(self, operation_name: str = None) -> Dict:
-        """Get performance statistics."""
-        with self.lock:
-            if operation_name:
-                data = self.metrics.get(operation_name, [])
-                if not data:
-                    return {}
-
-                durations = [d['duration'] for d in data]
-                return {
-                    'operation': operation_name,
-                    'count': len(data),
-                    'avg_duration': sum(durations) / len(durations),
-                    'min_duration': min(durations),
-                    'max_duration': max(durations),
-                    'total_duration': sum(durations),
-                }
-            else:
-                # Return stats for all operations
-                stats = {}
-                for op_name in self.metrics:
-                    stats[op_name] = self.get_stats(op_name)
-                return stats
+        """
+        Get performance statistics: count, average, min, max, total and
+        p50/p90/p99/p999 durations in seconds (percentiles within ~3%), plus
+        average, min and max memory delta in MB when memory is tracked.
+        """
+        if operation_name is None:
+            stats = {}
+            for name in self.operations():
+                stats[name] = self.get_stats(name)
+            return stats
+
+        merged = _Samples()
+        for samples in self._operation_samples(operation_name):
+            merged.merge(samples)
+        durations = merged.durations
+        if not durations.count:
+            return {}
+
+        stats = {
+            'operation': operation_name,
+            'count': durations.count,
+            'avg_duration': durations.total / durations.count / 1e6,
+            'min_duration': durations.min / 1e6,
+            'max_duration': durations.max / 1e6,
+            'total_duration': durations.total / 1e6,
+        }
+        for name, value in durations.percentiles(PERCENTILES).items():
+            stats[f'{name}_duration'] = value / 1e6
+        if merged.memory_count:
+            stats['avg_memory_delta'] = merged.memory_total / merged.memory_count
+            stats['min_memory_delta'] = merged.memory_min
+            stats['max_memory_delta'] = merged.memory_max
+        return stats
 
     def print_stats(self):
         """Print performance statistics to console."""
@@ -73,12 +173,49 @@ class PerformanceMonitor:
                 print(f"  Avg Duration: {data['avg_duration']:.3f}s")
                 print(f"  Min Duration: {data['min_duration']:.3f}s")
                 print(f"  Max Duration: {data['max_duration']:.3f}s")
+                print(
+                    f"  p50/p90/p99/p999: {data['p50_duration']:.3f}s / {data['p90_duration']:.3f}s"
+                    f" / {data['p99_duration']:.3f}s / {data['p999_duration']:.3f}s"
+                )
                 print(f"  Total Duration: {data['total_duration']:.3f}s")
 
     def clear_stats(self):
         """Clear all performance statistics."""
         with self.lock:
-            self.metrics.clear()
+            # Threads notice the new generation and start over with empty samples
+            self._generation += 1
+            self._samples = []
+            self._counters = []
+
+    def _thread_samples(self, operation_name: str) -> _Samples:
+        return self._thread_data(operation_name, _Samples)
+
+    def _thread_data(self, name: str, factory):
+        local = self._local
+        generation = self._generation
+        if getattr(local, "generation", None) != generation:
+            local.generation = generation
+            local.data = {}
+        key = (factory, name)
+        data = local.data.get(key)
+        if data is None:
+            data = local.data[key] = factory()
+            with self.lock:
+                if self._generation == generation:
+                    registry = self._samples if factory is _Samples else self._counters
+                    registry.append((name, data))
+        return data
+
+    def _operation_samples(self, operation_name: str) -> List[_Samples]:
+        with self.lock:
+            return [samples for name, samples in self._samples if name == operation_name]
+
+    def _rss_mb(self) -> float:
+        if self._process is None:
+            import psutil
+
+            self._process = psutil.Process()
+        return self._process.memory_info().rss / 1024 / 1024
 
 
 # Global performance monitor instance
@@ -0,0 +1,62 @@
+"""
+Prompt-cache instrumentation: how much of each prompt the provider served from its cache.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+UNLABELED = "other"
+
+
+def usage_tokens(response) -> Optional[Tuple[int, int]]:
+    """
+    (prompt_tokens, cached_tokens) from a chat completion's usage, or None if it has no usage.
+
+    cached_tokens is 0 when usage.prompt_tokens_details is missing (older models or APIs).
+    """
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if not isinstance(prompt_tokens, int):
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    return prompt_tokens, cached_tokens if isinstance(cached_tokens, int) else 0
+
+
+class PromptCacheStats:
+    """
+    Cached prompt tokens per label (the flow or call site), read from
+    usage.prompt_tokens_details.cached_tokens of each response.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[str, Dict[str, int]] = {}
+
+    def record(self, label: Optional[str], response):
+        tokens = usage_tokens(response)
+        if tokens is None:
+            return
+        prompt_tokens, cached_tokens = tokens
+        with self._lock:
+            stats = self._labels.setdefault(
+                label or UNLABELED,
+                {"requests": 0, "cache_hits": 0, "prompt_tokens": 0, "cached_tokens": 0},
+            )
+            stats["requests"] += 1
+            stats["cache_hits"] += cached_tokens > 0
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached_tokens
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per label: request and token counts, and hit_ratio (cached / prompt tokens)."""
+        with self._lock:
+            labels = {label: dict(stats) for label, stats in self._labels.items()}
+        for stats in labels.values():
+            prompt_tokens = stats["prompt_tokens"]
+            stats["hit_ratio"] = stats["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        return labels
+
+    def reset(self):
+        with self._lock:
+            self._labels.clear()
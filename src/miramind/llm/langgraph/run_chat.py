@@ -7,9 +7,17 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from typing import Optional
 
-from miramind.llm.langgraph.chatbot import get_chatbot
+from miramind.llm.langgraph.chatbot import (
+    get_chatbot,
+    get_memory_summarizer,
+    get_phrase_bank,
+    get_speech_provider,
+)
 from miramind.llm.langgraph.performance_monitor import get_performance_monitor
+from miramind.llm.langgraph.utils import synthesize_speech
 from miramind.shared.logger import logger
+from miramind.shared.single_flight import get_single_flight
+from miramind.shared.tracing import in_context
 
 logger.info("Logger works inside run_chat.py")
 
@@ -19,10 +27,16 @@ perf_monitor = get_performance_monitor()
 # Thread pool for CPU-bound tasks - increased workers for better performance
 executor = ThreadPoolExecutor(max_workers=4)
 
+# Identical messages being processed at the same time share one chatbot run
+chat_flights = get_single_flight("chat")
+
 # Enhanced cache for repeated requests
 response_cache = {}
 MAX_CACHE_SIZE = 100  # Limit cache size
 
+# Reply when the LLM call failed or missed its deadline (the empty reply is not spoken or cached)
+FALLBACK_REPLY = "I'm sorry, I couldn't process that."
+
 
 def _hash_input(user_input: str, emotion: str = "neutral") -> str:
     """Create a hash key for caching responses."""
@@ -30,6 +44,12 @@ def _hash_input(user_input: str, emotion: str = "neutral") -> str:
     return hashlib.md5(content.encode()).hexdigest()
 
 
+def _conversation_digest(chat_history: list, memory: str) -> str:
+    """Hash of the per-session context a reply is built from."""
+    content = json.dumps([chat_history, memory], sort_keys=True, default=str)
+    return hashlib.md5(content.encode()).hexdigest()
+
+
 def _cleanup_cache():
     """Remove oldest entries if cache is too large"""
     if len(response_cache) > MAX_CACHE_SIZE:
@@ -40,6 +60,37 @@ def _cleanup_cache():
             del response_cache[key]
 
 
+def _session_memory(session_id: Optional[str], memory: str) -> str:
+    """Memory to use for this turn: the session's rolling memory if summarization is enabled."""
+    summarizer = get_memory_summarizer()
+    if summarizer is None or not session_id:
+        return memory
+    return summarizer.get_memory(session_id, memory)
+
+
+def _record_turn(session_id: Optional[str], user_input_text: str, result: dict) -> dict:
+    """Schedule the turn for background summarization and attach the session memory."""
+    summarizer = get_memory_summarizer()
+    if summarizer is None or not session_id:
+        return result
+    summarizer.record_turn(session_id, user_input_text, result.get("response_text") or "")
+    # Copy: cached results are shared between sessions
+    return {**result, "memory": summarizer.get_memory(session_id)}
+
+
+def _initial_state(
+    user_input_text: str, chat_history: list, memory: str, deadline: Optional[float]
+) -> dict:
+    state = {"chat_history": chat_history, "user_input": user_input_text, "memory": memory}
+    if deadline is not None:
+        state["deadline"] = deadline
+    return state
+
+
+def _fallback_result(memory: str) -> dict:
+    return {"response_text": FALLBACK_REPLY, "audio_file_path": None, "memory": memory}
+
+
 # Define the path where the output.wav should be saved inside frontend/public
 OUTPUT_AUDIO_PATH = os.path.join(
     os.path.dirname(__file__), "..", "..", "frontend", "public", "output.wav"
@@ -47,20 +98,31 @@ OUTPUT_AUDIO_PATH = os.path.join(
 OUTPUT_AUDIO_PATH = os.path.abspath(OUTPUT_AUDIO_PATH)
 
 
-def process_chat_message(user_input_text: str, chat_history: list = [], memory: str = ""):
+def process_chat_message(
+    user_input_text: str,
+    chat_history: list = [],
+    memory: str = "",
+    session_id: Optional[str] = None,
+    deadline: Optional[float] = None,
+):
     """
     Processes a single chat message using the chatbot and saves the response audio.
     Now with performance monitoring and enhanced caching.
+
+    With a session_id the session's rolling memory replaces the memory argument,
+    and the turn is summarized into it in the background. deadline is the
+    time.monotonic() by which the LLM calls must answer.
     """
     with perf_monitor.track_operation("total_chat_processing"):
-        state = {"chat_history": chat_history, "user_input": user_input_text, "memory": memory}
+        memory = _session_memory(session_id, memory)
+        state = _initial_state(user_input_text, chat_history, memory, deadline)
 
         # Check cache first
-        with perf_monitor.track_operation("cache_lookup"):
-            cache_key = _hash_input(user_input_text)
-            if cache_key in response_cache:
-                logger.info(f"Cache hit for key: {cache_key}")
-                return response_cache[cache_key]
+        cache_key = _hash_input(user_input_text)
+        cached = _cached_result(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for key: {cache_key}")
+            return _record_turn(session_id, user_input_text, cached)
 
         try:
             with perf_monitor.track_operation("chatbot_invoke"):
@@ -68,14 +130,13 @@ def process_chat_message(user_input_text: str, chat_history: list = [], memory:
                 state = chatbot_instance.invoke(state)
 
             response_text = state.get("response")
+            if not response_text:
+                return _fallback_result(memory)
             audio_data = state.get("response_audio")
             updated_memory = state.get("memory", "")
 
             if audio_data:
-                with perf_monitor.track_operation("audio_file_save"):
-                    os.makedirs(os.path.dirname(OUTPUT_AUDIO_PATH), exist_ok=True)
-                    with open(OUTPUT_AUDIO_PATH, "wb") as f:
-                        f.write(audio_data)
+                _save_audio_file(audio_data)
                 logger.info(f" Response audio saved to {OUTPUT_AUDIO_PATH}")
                 result = {
                     "response_text": response_text,
@@ -90,49 +151,75 @@ def process_chat_message(user_input_text: str, chat_history: list = [], memory:
                     "memory": updated_memory,
                 }
 
-            # Update cache with cleanup
-            with perf_monitor.track_operation("cache_update"):
-                _cleanup_cache()  # Clean cache before adding
-                response_cache[cache_key] = result
-                logger.info(f"Response cached with key: {cache_key}")
+            if state.get("degraded"):
+                # Canned reply while the LLM is unavailable: never cached
+                result["degraded"] = True
+            else:
+                # Update cache with cleanup
+                with perf_monitor.track_operation("cache_update"):
+                    _cleanup_cache()  # Clean cache before adding
+                    response_cache[cache_key] = result
+                    logger.info(f"Response cached with key: {cache_key}")
 
-            return result
+            return _record_turn(session_id, user_input_text, result)
         except Exception as e:
             logger.error(f"Error processing chat message: {e}")
-            return {
-                "response_text": "I'm sorry, I couldn't process that.",
-                "audio_file_path": None,
-                "memory": memory,
-            }
+            return _fallback_result(memory)
 
 
 async def process_chat_message_async(
-    user_input_text: str, chat_history: list = [], memory: str = ""
+    user_input_text: str,
+    chat_history: list = [],
+    memory: str = "",
+    session_id: Optional[str] = None,
+    defer_audio: bool = False,
+    deadline: Optional[float] = None,
 ):
     """
     Async version of process_chat_message for better performance.
+
+    With defer_audio the graph stops after the text reply (no TTS); the caller
+    synthesizes the audio later with synthesize_response_audio(response_text, emotion).
+
+    Concurrent calls with the same message, chat history and memory share one
+    chatbot run; calls from different conversations never do, since the reply
+    is built from the session's history and memory.
     """
-    state = {"chat_history": chat_history, "user_input": user_input_text, "memory": memory}
+    memory = _session_memory(session_id, memory)
+    state = _initial_state(user_input_text, chat_history, memory, deadline)
+    if defer_audio:
+        state["defer_tts"] = True
 
     # Check cache first (async)
     cache_key = _hash_input(user_input_text)
-    if cache_key in response_cache:
+    cached = _cached_result(cache_key)
+    if cached is not None:
         logger.info(f"Cache hit (async) for key: {cache_key}")
-        return response_cache[cache_key]
+        return _record_turn(session_id, user_input_text, cached)
+
+    flight_key = (cache_key, _conversation_digest(chat_history, memory), defer_audio)
+    result = await chat_flights.do(flight_key, lambda: _run_chatbot(state, cache_key, defer_audio))
+    return _record_turn(session_id, user_input_text, result)
 
+
+async def _run_chatbot(state: dict, cache_key: str, defer_audio: bool) -> dict:
+    memory = state["memory"]
     try:
-        # Run chatbot processing in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
+        # Blocking nodes run in worker threads; TTS is awaited on this event loop
+        loop = asyncio.get_running_loop()
         chatbot_instance = get_chatbot()
-        state = await loop.run_in_executor(executor, chatbot_instance.invoke, state)
+        with perf_monitor.track_operation("chatbot_invoke"):
+            state = await chatbot_instance.ainvoke(state)
 
         response_text = state.get("response")
+        if not response_text:
+            return _fallback_result(memory)
         audio_data = state.get("response_audio")
         updated_memory = state.get("memory", "")
 
         if audio_data:
             # Run file I/O in thread pool
-            await loop.run_in_executor(executor, _save_audio_file, audio_data)
+            await loop.run_in_executor(executor, in_context(_save_audio_file, audio_data))
             result = {
                 "response_text": response_text,
                 "audio_file_path": OUTPUT_AUDIO_PATH,
@@ -144,25 +231,48 @@ async def process_chat_message_async(
                 "audio_file_path": None,
                 "memory": updated_memory,
             }
+        result["emotion"] = state.get("emotion", "neutral")
+        if state.get("degraded"):
+            result["degraded"] = True
 
-        # Update cache asynchronously
-        await loop.run_in_executor(executor, _update_cache, cache_key, result)
+        # Update cache asynchronously (text-only replies would hide the audio from later callers,
+        # canned replies the real ones)
+        if not defer_audio and not result.get("degraded"):
+            await loop.run_in_executor(executor, in_context(_update_cache, cache_key, result))
 
         return result
     except Exception as e:
         logger.error(f"Error processing chat message (async): {e}")
-        return {
-            "response_text": "I'm sorry, I couldn't process that.",
-            "audio_file_path": None,
-            "memory": memory,
-        }
+        return _fallback_result(memory)
+
+
+async def synthesize_response_audio(
+    response_text: str, emotion: str = "neutral", audio_format: Optional[str] = None
+) -> bytes:
+    """
+    Synthesize a reply returned by process_chat_message_async(defer_audio=True).
+
+    audio_format picks the encoding (e.g. "ogg_opus"); the provider default otherwise.
+    """
+    return await synthesize_speech(
+        get_speech_provider(), response_text, emotion, audio_format, get_phrase_bank()
+    )
+
+
+def _cached_result(cache_key: str) -> Optional[dict]:
+    """Look up a cached response, counting hits and misses for /metrics."""
+    with perf_monitor.track_operation("cache_lookup"):
+        result = response_cache.get(cache_key)
+    perf_monitor.increment("response_cache.hits" if result is not None else "response_cache.misses")
+    return result
 
 
 def _save_audio_file(audio_data: bytes) -> None:
     """Helper function to save audio file."""
-    os.makedirs(os.path.dirname(OUTPUT_AUDIO_PATH), exist_ok=True)
-    with open(OUTPUT_AUDIO_PATH, "wb") as f:
-        f.write(audio_data)
+    with perf_monitor.track_operation("audio_file_save"):
+        os.makedirs(os.path.dirname(OUTPUT_AUDIO_PATH), exist_ok=True)
+        with open(OUTPUT_AUDIO_PATH, "wb") as f:
+            f.write(audio_data)
 
 
 def _update_cache(cache_key: str, result: dict) -> None:
@@ -204,7 +314,9 @@ def main():
                 perf_monitor.print_stats()
                 break
 
-            result = process_chat_message(user_input, current_chat_history, memory)
+            result = process_chat_message(
+                user_input, current_chat_history, memory, session_id="interactive"
+            )
             print("Chatbot:", result["response_text"])
 
             current_chat_history.append({"role": "user", "content": user_input})
@@ -216,7 +328,7 @@ def main():
                 print(f" Audio saved to {result['audio_file_path']}")
 
         # Show performance stats every 10 requests in interactive mode
-        request_count = len(perf_monitor.metrics.get("total_chat_processing", []))
+        request_count = perf_monitor.count("total_chat_processing")
         if request_count > 0 and request_count % 10 == 0:
             perf_monitor.print_stats()
 
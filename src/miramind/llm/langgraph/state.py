@@ -0,0 +1,25 @@
+import operator
+from typing import Annotated, Dict, List, Optional, TypedDict
+
+
+class ChatState(TypedDict, total=False):
+    """
+    State of one chatbot turn.
+
+    Nodes return only the keys they change and LangGraph merges them into the
+    state, so no node copies the whole state. chat_history is a reducer channel:
+    nodes return only the messages they add and they are appended to it
+    (operator.add builds a new list, the caller's history is never modified).
+    """
+
+    user_input: str
+    chat_history: Annotated[List[Dict[str, str]], operator.add]
+    memory: str
+    emotion: str
+    emotion_confidence: float
+    emotion_source: str  # "llm" or "local" (the local classifier answered)
+    response: str
+    response_audio: Optional[bytes]
+    defer_tts: bool  # Skip the TTS node; audio is synthesized after replying
+    deadline: float  # time.monotonic() by which LLM calls must answer (absent: no deadline)
+    degraded: bool  # The reply is canned because the LLM was unavailable
@@ -1,32 +1,109 @@
-from typing import Any, Dict
+from typing import Dict, List, Tuple
 
 from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 
-from miramind.llm.langgraph.utils import generate_response
+from miramind.llm.langgraph.state import ChatState
+from miramind.llm.langgraph.utils import (
+    CANNED_REPLIES,
+    TTS_EMOTION_MAPPING,
+    generate_response,
+)
 from miramind.shared.logger import logger
 
+SAD_FOLLOW_UP = "Would you like to tell me more about what's making you feel this way?"
+
+# Openers and closers frequent enough in replies to keep pre-synthesized
+GREETINGS = ["Hi there!", "Hello!", "Hi!", "Hey there!"]
+GOODBYES = ["Goodbye!", "Bye for now!", "See you next time!", "Talk to you soon!"]
+
+# flow node -> response style
+FLOW_STYLES = {
+    "sad_flow": "supportive and caring",
+    "angry_flow": "calm and soothing",
+    "excited_flow": "enthusiastic and cheerful",
+    "gentle_flow": "gentle and reassuring",
+    "neutral_flow": "neutral and friendly",
+}
+
+# detected emotion -> flow node
+EMOTION_ROUTES = {
+    "sad": "sad_flow",
+    "angry": "angry_flow",
+    "happy": "excited_flow",
+    "excited": "excited_flow",
+    "anxious": "gentle_flow",
+    "embarrassed": "gentle_flow",
+    "scared": "gentle_flow",
+    "neutral": "neutral_flow",
+}
+
+
+def fixed_phrases() -> List[Tuple[str, str]]:
+    """
+    (text, TTS emotion) of the utterances worth keeping in the phrase bank.
+
+    Each is banked in the voice style of the emotions that can speak it: the
+    sad follow-up for sad, a flow's canned reply for the emotions routed to
+    that flow, greetings and goodbyes for every style.
+    """
+    phrases = [(SAD_FOLLOW_UP, TTS_EMOTION_MAPPING["sad"])]
+    for emotion, flow in EMOTION_ROUTES.items():
+        phrases.append((CANNED_REPLIES[FLOW_STYLES[flow]], TTS_EMOTION_MAPPING[emotion]))
+    for tts_emotion in dict.fromkeys(TTS_EMOTION_MAPPING.values()):
+        phrases.extend((text, tts_emotion) for text in GREETINGS + GOODBYES)
+    return list(dict.fromkeys(phrases))
+
+
+def follow_up(state: ChatState) -> ChatState:
+    if state.get("degraded"):
+        # The canned reply already ends in a question; don't ask two in a row
+        return {}
+    logger.info(" SAD flow: adding follow-up message")
+    return {
+        "response": state["response"] + " " + SAD_FOLLOW_UP,
+        "chat_history": [{"role": "assistant", "content": SAD_FOLLOW_UP}],
+    }
+
+
+def _responder(flow: str, client, emotion_logger):
+    """Create the flow's generate_response closure once, when the graph is built."""
+    respond = generate_response(FLOW_STYLES[flow], client, emotion_logger, flow=flow)
+    label = flow.split("_")[0].upper()
+
+    def responder(state: ChatState) -> ChatState:
+        logger.info(f" Entered {label} flow")
+        return respond(state)
+
+    return responder
+
+
+def add_flow_nodes(graph: StateGraph, client, emotion_logger) -> Dict[str, str]:
+    """
+    Add every emotion flow to graph as direct nodes instead of nested subgraphs.
+
+    Each flow is entered through a node named after it (the targets of
+    EMOTION_ROUTES); the sad flow continues to a follow_up node.
+
+    Returns:
+        dict: flow node -> node producing the flow's final state.
+    """
+    exits = {}
+    for flow in FLOW_STYLES:
+        graph.add_node(flow, RunnableLambda(_responder(flow, client, emotion_logger)))
+        exits[flow] = flow
+    graph.add_node("follow_up", RunnableLambda(follow_up))
+    graph.add_edge("sad_flow", "follow_up")
+    exits["sad_flow"] = "follow_up"
+    return exits
 
-def build_sad_flow(client, tts_provider, emotion_logger):
-    graph = StateGraph(dict)
-
-    def supportive_responder(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info("Entered SAD flow")
-        return generate_response("supportive and caring", client, tts_provider, emotion_logger)(
-            state
-        )
-
-    def follow_up(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(" SAD flow: adding follow-up message")
-        followup = "Would you like to tell me more about what's making you feel this way?"
-        return {
-            **state,
-            "response": state["response"] + " " + followup,
-            "chat_history": state.get("chat_history", [])
-            + [{"role": "assistant", "content": followup}],
-        }
 
-    graph.add_node("supportive_response", RunnableLambda(supportive_responder))
+# --- Standalone flow graphs (one style in isolation) ---
+def build_sad_flow(client, emotion_logger):
+    graph = StateGraph(ChatState)
+    graph.add_node(
+        "supportive_response", RunnableLambda(_responder("sad_flow", client, emotion_logger))
+    )
     graph.add_node("follow_up", RunnableLambda(follow_up))
     graph.set_entry_point("supportive_response")
     graph.add_edge("supportive_response", "follow_up")
@@ -34,59 +111,25 @@ def build_sad_flow(client, tts_provider, emotion_logger):
     return graph
 
 
-def build_angry_flow(client, tts_provider, emotion_logger):
-    graph = StateGraph(dict)
-
-    def calm_responder(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(" Entered ANGRY flow")
-        return generate_response("calm and soothing", client, tts_provider, emotion_logger)(state)
-
-    graph.add_node("calm_response", RunnableLambda(calm_responder))
-    graph.set_entry_point("calm_response")
-    graph.add_edge("calm_response", END)
-    return graph
-
-
-def build_excited_flow(client, tts_provider, emotion_logger):
-    graph = StateGraph(dict)
-
-    def enthusiastic_responder(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(" Entered EXCITED flow")
-        return generate_response("enthusiastic and cheerful", client, tts_provider, emotion_logger)(
-            state
-        )
-
-    graph.add_node("enthusiastic_response", RunnableLambda(enthusiastic_responder))
-    graph.set_entry_point("enthusiastic_response")
-    graph.add_edge("enthusiastic_response", END)
+def _build_single_node_flow(flow: str, node: str, client, emotion_logger):
+    graph = StateGraph(ChatState)
+    graph.add_node(node, RunnableLambda(_responder(flow, client, emotion_logger)))
+    graph.set_entry_point(node)
+    graph.add_edge(node, END)
     return graph
 
 
-def build_gentle_flow(client, tts_provider, emotion_logger):
-    graph = StateGraph(dict)
+def build_angry_flow(client, emotion_logger):
+    return _build_single_node_flow("angry_flow", "calm_response", client, emotion_logger)
 
-    def gentle_responder(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(" Entered GENTLE flow")
-        return generate_response("gentle and reassuring", client, tts_provider, emotion_logger)(
-            state
-        )
 
-    graph.add_node("gentle_response", RunnableLambda(gentle_responder))
-    graph.set_entry_point("gentle_response")
-    graph.add_edge("gentle_response", END)
-    return graph
+def build_excited_flow(client, emotion_logger):
+    return _build_single_node_flow("excited_flow", "enthusiastic_response", client, emotion_logger)
 
 
-def build_neutral_flow(client, tts_provider, emotion_logger):
-    graph = StateGraph(dict)
+def build_gentle_flow(client, emotion_logger):
+    return _build_single_node_flow("gentle_flow", "gentle_response", client, emotion_logger)
 
-    def neutral_responder(state: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info(" Entered NEUTRAL flow")
-        return generate_response("neutral and friendly", client, tts_provider, emotion_logger)(
-            state
-        )
 
-    graph.add_node("neutral_response", RunnableLambda(neutral_responder))
-    graph.set_entry_point("neutral_response")
-    graph.add_edge("neutral_response", END)
-    return graph
+def build_neutral_flow(client, emotion_logger):
+    return _build_single_node_flow("neutral_flow", "neutral_response", client, emotion_logger)
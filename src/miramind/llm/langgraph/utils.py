@@ -1,50 +1,99 @@
 # utils.py
 
+import asyncio
 import json
 import os
-import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from dotenv import load_dotenv
+import openai
+from langchain_core.runnables import RunnableLambda
 from openai import OpenAI
 
+from miramind.audio.tts.audio_formats import WAV
+from miramind.audio.tts.phrase_bank import PhraseBank, concat_wav
 from miramind.audio.tts.tts_factory import get_tts_provider
+from miramind.audio.tts.tts_loop import run_on_tts_loop
+from miramind.llm.langgraph.context_builder import context_builder
+from miramind.llm.langgraph.emotion_log import EmotionLogger
+from miramind.llm.langgraph.hedging import DeadlineExceeded, HedgedCaller, remaining
+from miramind.llm.langgraph.performance_config import (
+    API_TIMEOUT,
+    ENABLE_HEDGED_REQUESTS,
+    HEDGE_LATENCY_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    MAX_RETRIES,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    UPSTREAM_BURST,
+    UPSTREAM_MAX_WAIT,
+    UPSTREAM_REQUESTS_PER_SECOND,
+)
+from miramind.llm.langgraph.performance_monitor import get_performance_monitor
+from miramind.llm.langgraph.prompt_cache import PromptCacheStats
+from miramind.llm.langgraph.state import ChatState
+from miramind.shared.circuit_breaker import CircuitOpenError, get_breaker
+from miramind.shared.env import load_env
 from miramind.shared.logger import logger
+from miramind.shared.rate_limit import RateLimitExceeded, acquire, get_rate_limiter
+from miramind.shared.single_flight import get_single_flight
+from miramind.shared.tracing import span
 
 # --- Load Environment ---
 os.environ.pop("SSL_CERT_FILE", None)
-load_dotenv()
 
 # --- Constants ---
 DEFAULT_MODEL = "gpt-4o-mini"  # Use faster model for better performance
 RESPONSE_MODEL = "gpt-4o-mini"  # Keep consistent for speed
-LOG_FILE = "emotion_log.json"
+LOG_FILE = "emotion_log.jsonl"
+UPSTREAM_LIMITER = "openai_upstream"
 
+# Shared by all OpenAI calls; the hedge delay follows the recent latency of each flow (label)
+openai_caller = HedgedCaller(
+    hedge_percentile=HEDGE_LATENCY_PERCENTILE if ENABLE_HEDGED_REQUESTS else None,
+    min_samples=HEDGE_MIN_SAMPLES,
+    max_retries=MAX_RETRIES,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX,
+    retryable=(openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError),
+)
 
-# --- Logger ---
-class EmotionLogger:
-    def __init__(self, filepath: str):
-        self.filepath = filepath
+# Opens after repeated outages or timeouts; then calls fail fast and replies are canned
+openai_breaker = get_breaker(
+    "openai",
+    failure_exceptions=(
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+        DeadlineExceeded,
+    ),
+)
 
-    def log(self, input_text: str, emotion: str, confidence: float, response_text: str = ""):
-        entry = {
-            "input": input_text,
-            "emotion": emotion,
-            "confidence": round(confidence, 2),
-            "response": response_text,
-        }
-        try:
-            if os.path.exists(self.filepath):
-                with open(self.filepath, "r+", encoding="utf-8") as f:
-                    data = json.load(f)
-                    data.append(entry)
-                    f.seek(0)
-                    json.dump(data, f, indent=2)
-            else:
-                with open(self.filepath, "w", encoding="utf-8") as f:
-                    json.dump([entry], f, indent=2)
-        except Exception as e:
-            print(f"Logging failed: {e}")
+# Replies by response style, used when the LLM gives no reply (outage or open circuit)
+CANNED_REPLIES = {
+    "supportive and caring": "I'm here with you. It's okay to feel this way. Do you want to tell me more?",
+    "calm and soothing": "Let's take a slow, deep breath together. I'm listening.",
+    "enthusiastic and cheerful": "That sounds exciting! Tell me more about it!",
+    "gentle and reassuring": "You're safe, and I'm right here with you. We can go slowly.",
+    "neutral and friendly": "I'm listening. Can you tell me a little more?",
+}
+DEFAULT_CANNED_REPLY = CANNED_REPLIES["neutral and friendly"]
+
+# Shared by every flow and turn. It must stay first and unchanged so that requests share
+# a prefix the provider can serve from its prompt cache; the style goes after the history.
+RESPONSE_SYSTEM_PROMPT = (
+    "You are a non-licensed therapist who helps neurodivergent children talk about their feelings. "
+    "Don't start every sentence by saying you're sorry or that you understand. "
+    "Keep responses concise and engaging. "
+    "Use short, simple sentences and concrete words; avoid idioms and sarcasm. "
+    "Ask at most one question at a time. "
+    "Never diagnose or give medical advice. If the child may be in danger, gently encourage "
+    "them to talk to a trusted adult."
+)
+STYLE_INSTRUCTIONS = "Respond in a {style} way."
+
+prompt_cache_stats = PromptCacheStats()
+perf_monitor = get_performance_monitor()
+tts_flights = get_single_flight("tts")  # Identical speech requests share one synthesis
 
 
 # --- API Helper ---
@@ -54,24 +103,83 @@ def call_openai(
     model: str = DEFAULT_MODEL,
     max_tokens: int = None,
     temperature: float = 0.7,
+    response_format: Dict[str, Any] = None,
+    deadline: Optional[float] = None,
+    label: Optional[str] = None,
 ) -> str:
     """
     Optimized OpenAI API call with better error handling and performance settings.
+
+    response_format is passed through to the API (JSON mode / structured outputs).
+    deadline is the time.monotonic() by which the reply is needed: attempts are
+    hedged after the recent p95 latency of the same label (or model without
+    one) and transient errors retried with jittered backoff, but only while
+    the deadline leaves time. Returns "" when
+    no reply arrives in time or the request fails, and immediately while the
+    OpenAI circuit breaker is open. Requests share an upstream budget of
+    UPSTREAM_REQUESTS_PER_SECOND (one token per call, taken before the first
+    attempt): over it they wait their turn, or fail if that would outlast the
+    deadline. Cached prompt tokens are reported under label
+    (e.g. the flow) in get_openai_stats().
     """
-    try:
-        # Add performance optimizations
+    extra = {"response_format": response_format} if response_format else {}
+
+    def attempt(timeout: float) -> str:
         response = client.chat.completions.create(
             model=model,
             messages=messages,
             max_tokens=max_tokens or 100,  # Default to shorter responses for speed
             temperature=temperature,
             stream=False,  # Disable streaming for faster single responses
-            timeout=8.0,  # Reduced timeout for faster fails
+            timeout=timeout,  # API_TIMEOUT, or less when the deadline is closer
+            **extra,
         )
+        prompt_cache_stats.record(label, response)
         return response.choices[0].message.content.strip()
-    except Exception as e:
-        logger.error(f"OpenAI API error: {e}")
+
+    left = remaining(deadline)
+    if left is not None and left <= 0:
+        # Not the dependency's fault: don't count it against the breaker
+        logger.error("OpenAI request skipped: deadline already passed")
         return ""
+    with span("openai", model=model, label=label or "") as request_span:
+        try:
+            # Wait for the upstream budget before the attempts are timed and hedged, so the
+            # wait is not taken for OpenAI latency and the attempt timeouts start after it
+            budget = get_rate_limiter(
+                UPSTREAM_LIMITER, UPSTREAM_REQUESTS_PER_SECOND, UPSTREAM_BURST
+            )
+            acquire(budget, max_wait=UPSTREAM_MAX_WAIT, deadline=deadline)
+            return openai_breaker.call(
+                openai_caller.call,
+                attempt,
+                deadline=deadline,
+                timeout=API_TIMEOUT,
+                key=label or model,
+            )
+        except RateLimitExceeded as e:
+            logger.warning(f"OpenAI request skipped: {e} (retry after {e.retry_after:.1f}s)")
+            if request_span is not None:
+                request_span.set_attribute("rate_limited", True)
+            return ""
+        except CircuitOpenError:
+            logger.warning("OpenAI request skipped: circuit open")
+            if request_span is not None:
+                request_span.set_attribute("circuit_open", True)
+            return ""
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e!r}")
+            if request_span is not None:
+                request_span.error = repr(e)
+            return ""
+
+
+def get_openai_stats() -> Dict[str, Any]:
+    """
+    Returns hedge rate, retries, deadline misses and tail latency (with and without hedging)
+    of OpenAI requests, and the prompt-cache hit ratio per flow.
+    """
+    return {**openai_caller.get_stats(), "prompt_cache": prompt_cache_stats.get_stats()}
 
 
 async def call_openai_async(
@@ -107,102 +215,175 @@ async def call_openai_async(
 
 
 # --- Response Generator ---
-def generate_response(style: str, client: OpenAI, tts_provider, emotion_logger: EmotionLogger):
-    def responder(state: Dict[str, Any]) -> Dict[str, Any]:
+def generate_response(
+    style: str, client: OpenAI, emotion_logger: EmotionLogger, flow: Optional[str] = None
+):
+    """
+    Create a graph node replying in the given style.
+
+    flow labels the node's requests in the prompt-cache stats (default: the style).
+    """
+    instructions = STYLE_INSTRUCTIONS.format(style=style)
+    label = flow or style
+
+    def responder(state: ChatState) -> ChatState:
         user_input = state["user_input"]
         chat_history = state.get("chat_history", [])
         logger.info(f"running response generator with style: {style}")
 
-        system_content = (
-            f"You are a {style} non-licensed therapist who helps neurodivergent children talk about their feelings. "
-            "Don't start every sentence by saying you're sorry or that you understand. "
-            "Keep responses concise and engaging."  # Added for faster processing
-        )
-
-        messages = (
-            [{"role": "system", "content": system_content}]
-            + chat_history[-2:]  # Reduced to last 2 messages for faster processing
-            + [{"role": "user", "content": user_input}]
+        # Static prompt, recent turns that fit the token budget, then style and memory
+        messages = context_builder.build(
+            RESPONSE_SYSTEM_PROMPT,
+            chat_history,
+            user_input,
+            memory=state.get("memory", ""),
+            instructions=instructions,
         )
-        reply = call_openai(client, messages, max_tokens=80, temperature=0.7)  # Reduced token limit
-
-        # Map emotions to TTS-supported emotions
-        emotion_mapping = {
-            "anxious": "scared",
-            "embarrassed": "neutral",
-            "excited": "excited",
-            "happy": "happy",
-            "sad": "sad",
-            "angry": "angry",
-            "scared": "scared",
-            "neutral": "neutral",
-        }
-
-        detected_emotion = state.get("emotion", "neutral")
-        tts_emotion = emotion_mapping.get(detected_emotion, "neutral")
+        with perf_monitor.track_operation("response_llm"):
+            reply = call_openai(
+                client,
+                messages,
+                max_tokens=80,  # Reduced token limit
+                temperature=0.7,
+                deadline=state.get("deadline"),
+                label=label,
+            )
 
-        try:
-            # Use async TTS if available
-            if hasattr(tts_provider, 'synthesize_async'):
-                import asyncio
-
-                try:
-                    loop = asyncio.get_event_loop()
-                    audio_bytes = loop.run_until_complete(
-                        tts_provider.synthesize_async(
-                            json.dumps({"text": reply, "emotion": tts_emotion})
-                        )
-                    )
-                except RuntimeError:
-                    # Fallback to sync if no event loop
-                    audio_bytes = tts_provider.synthesize(
-                        json.dumps({"text": reply, "emotion": tts_emotion})
-                    )
-            else:
-                audio_bytes = tts_provider.synthesize(
-                    json.dumps({"text": reply, "emotion": tts_emotion})
-                )
-        except Exception as e:
-            logger.error(f"TTS synthesis error: {e}")
-            audio_bytes = None
+        if not reply:
+            # Degraded: the LLM is failing or its circuit is open; answer in style without it
+            logger.warning(f"No LLM reply, using the canned '{style}' reply")
+            reply = CANNED_REPLIES.get(style, DEFAULT_CANNED_REPLY)
+            return {
+                "response": reply,
+                "chat_history": _turn_messages(chat_history, user_input, reply),
+                "degraded": True,
+            }
 
-        # Async logging to avoid blocking
-        try:
-            import threading
-
-            log_thread = threading.Thread(
-                target=emotion_logger.log,
-                args=(
-                    user_input,
-                    state.get("emotion", "neutral"),
-                    state.get("emotion_confidence", 0.0),
-                    reply,
-                ),
-            )
-            log_thread.daemon = True
-            log_thread.start()
-        except Exception as e:
-            logger.error(f"Logging error: {e}")
+        # Queued for the background log writer, never blocks
+        emotion_logger.log(
+            user_input,
+            state.get("emotion", "neutral"),
+            state.get("emotion_confidence", 0.0),
+            reply,
+            source=state.get("emotion_source", "llm"),
+        )
         logger.info(
             f"Response generated - Emotion: {state.get('emotion', 'neutral')}, "
             f"Confidence: {state.get('emotion_confidence', 0.0)}, "
             f"Input: {user_input[:50]}{'...' if len(user_input) > 50 else ''}"
         )
 
-        return {
-            **state,
-            "response": reply,
-            "response_audio": audio_bytes,
-            "chat_history": chat_history
-            + [{"role": "user", "content": user_input}, {"role": "assistant", "content": reply}],
-        }
+        return {"response": reply, "chat_history": _turn_messages(chat_history, user_input, reply)}
 
     return responder
 
 
+def _turn_messages(chat_history: List[Dict[str, str]], user_input: str, reply: str):
+    # Only the delta: chat_history is extended by its reducer
+    user_message = {"role": "user", "content": user_input}
+    new_messages = [] if chat_history and chat_history[-1] == user_message else [user_message]
+    new_messages.append({"role": "assistant", "content": reply})
+    return new_messages
+
+
+# --- Text-to-Speech Node ---
+# Map emotions to TTS-supported emotions
+TTS_EMOTION_MAPPING = {
+    "anxious": "scared",
+    "embarrassed": "neutral",
+    "excited": "excited",
+    "happy": "happy",
+    "sad": "sad",
+    "angry": "angry",
+    "scared": "scared",
+    "neutral": "neutral",
+}
+
+
+async def _synthesize(tts_provider, text: str, tts_emotion: str, audio_format: Optional[str]):
+    payload = {"text": text, "emotion": tts_emotion}
+    if audio_format:
+        payload["format"] = audio_format
+    request = json.dumps(payload)
+
+    async def synthesize() -> bytes:
+        with perf_monitor.track_operation("tts"):
+            if asyncio.iscoroutinefunction(getattr(tts_provider, "synthesize_async", None)):
+                return await tts_provider.synthesize_async(request)
+            return await asyncio.to_thread(tts_provider.synthesize, request)
+
+    return await tts_flights.do((id(tts_provider), request), synthesize)
+
+
+async def synthesize_speech(
+    tts_provider,
+    text: str,
+    emotion: str = "neutral",
+    audio_format: Optional[str] = None,
+    phrase_bank: Optional[PhraseBank] = None,
+) -> bytes:
+    """
+    Synthesize text with the TTS voice style matching the detected emotion.
+
+    audio_format (e.g. "ogg_opus", see audio_formats) overrides the provider's
+    default encoding. Async providers are awaited directly; sync ones run in a
+    worker thread. Concurrent requests for the same speech share one synthesis.
+
+    With a phrase_bank, fixed phrases the text starts or ends with are taken
+    from the bank and only the rest is synthesized (WAV output only).
+    """
+    tts_emotion = TTS_EMOTION_MAPPING.get(emotion, "neutral")
+    if phrase_bank is not None and audio_format in (None, WAV):
+        prefix, rest, suffix = phrase_bank.split(text, tts_emotion)
+        if prefix or suffix:
+            segments = [prefix] if prefix else []
+            if rest:
+                segments.append(await _synthesize(tts_provider, rest, tts_emotion, audio_format))
+            if suffix:
+                segments.append(suffix)
+            try:
+                audio = concat_wav(segments, phrase_bank.gap)
+            except ValueError as e:
+                logger.warning(f"Phrase bank audio not spliced, synthesizing it all: {e}")
+            else:
+                phrase_bank.record_hit(len(text) - len(rest))
+                perf_monitor.increment("phrase_bank.hits")
+                return audio
+    return await _synthesize(tts_provider, text, tts_emotion, audio_format)
+
+
+def text_to_speech(tts_provider, phrase_bank: Optional[PhraseBank] = None) -> RunnableLambda:
+    """
+    Build the graph node that synthesizes the response audio.
+
+    Under ainvoke the node awaits the provider on the caller's event loop; under
+    invoke it runs on the shared long-lived TTS loop thread. Either way no event
+    loop is created per request.
+    """
+
+    async def synthesize_async(state: ChatState) -> ChatState:
+        try:
+            audio_bytes = await synthesize_speech(
+                tts_provider,
+                state.get("response", ""),
+                state.get("emotion", "neutral"),
+                phrase_bank=phrase_bank,
+            )
+        except Exception as e:
+            logger.error(f"TTS synthesis error: {e}")
+            audio_bytes = None
+        return {"response_audio": audio_bytes}
+
+    def synthesize(state: ChatState) -> ChatState:
+        return run_on_tts_loop(synthesize_async(state))
+
+    return RunnableLambda(synthesize, afunc=synthesize_async)
+
+
 def main():
     """Initialize client, TTS provider, and emotion logger."""
     # --- Client Init ---
+    load_env()
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     tts_provider = get_tts_provider("azure")
     emotion_logger = EmotionLogger(LOG_FILE)
@@ -0,0 +1,193 @@
+"""
+Circuit breakers for external dependencies (OpenAI, speech-to-text, Azure TTS).
+
+While a dependency keeps failing, its breaker opens and calls fail immediately
+instead of waiting out their timeouts. After recovery_timeout the breaker is
+half-open: a limited number of probe calls go through, and the first result
+decides whether it closes again or stays open.
+"""
+
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Tuple, Type, TypeVar
+
+from miramind.shared.logger import logger
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5  # Consecutive failures that open the breaker
+DEFAULT_RECOVERY_TIMEOUT = 30.0  # Seconds open before probing the dependency again
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency's breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Attributes:
+        name: dependency name, used in logs and stats.
+        failure_threshold: consecutive failures that open the breaker.
+        recovery_timeout: seconds the breaker stays open before half-opening.
+        half_open_max_calls: probe calls allowed at once while half-open.
+        failure_exceptions: exceptions counted as dependency failures; others
+            (e.g. invalid input) pass through without affecting the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT,
+        half_open_max_calls: int = 1,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_exceptions = failure_exceptions
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are rejected (open and not yet due for a probe)."""
+        return self.state == OPEN
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through now; a half-open breaker admits a limited number of probes."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit breaker '{self.name}' closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            state = self._current_state()
+            self._failures += 1
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"Circuit breaker '{self.name}' opened after {self._failures} failures"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Call fn through the breaker.
+
+        Raises:
+            CircuitOpenError: if the breaker rejects the call.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        try:
+            result = fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Async version of call for coroutine functions."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        try:
+            result = await fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+    def _current_state(self) -> str:
+        # Called with the lock held
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _release_probe(self):
+        # A probe that ended with a non-dependency error proves nothing; let another probe through
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    Get the process-wide breaker of a dependency, creating it on first use.
+
+    kwargs are CircuitBreaker settings, used only when the breaker is created.
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def get_breaker_stats() -> Dict[str, Dict]:
+    """State and counters of every breaker, by dependency name."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.get_stats() for breaker in breakers}
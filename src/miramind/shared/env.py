@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """
+    Load the .env file into os.environ once per process.
+
+    The API, chatbot and TTS factory all need the environment; only the first
+    call reads the file, later calls return the cached result.
+
+    Returns:
+        bool: True if a .env file was found and loaded.
+    """
+    return load_dotenv()
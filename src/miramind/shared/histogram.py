@@ -0,0 +1,111 @@
+"""
+Fixed-size log-bucketed latency histogram (HDR-style).
+
+Values are integer microseconds. Values below 2**SUB_BUCKET_BITS each have
+their own bucket; above that, every power of two is split into
+2**(SUB_BUCKET_BITS - 1) equal buckets, so a reported percentile is within
+~3% of the true value. Memory does not grow with the number of samples.
+"""
+
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 6
+_HALF = 1 << (SUB_BUCKET_BITS - 1)
+MAX_VALUE_US = (1 << 27) - 1  # ~134 s; larger values are counted in the last bucket
+
+
+def bucket_index(value: int) -> int:
+    """Bucket of a non-negative value (values above MAX_VALUE_US share the last bucket)."""
+    value = min(max(value, 0), MAX_VALUE_US)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return shift * _HALF + (value >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Smallest and largest value counted in a bucket."""
+    if index < 2 * _HALF:
+        return index, index
+    shift = index // _HALF - 1
+    top = index - shift * _HALF
+    return top << shift, ((top + 1) << shift) - 1
+
+
+BUCKET_COUNT = bucket_index(MAX_VALUE_US) + 1
+
+
+class LogHistogram:
+    """
+    Counts of values (microseconds) in BUCKET_COUNT log-spaced buckets, plus
+    the exact count, sum, min and max.
+
+    Not thread-safe: PerformanceMonitor gives every thread its own histograms
+    and merges them when stats are read.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def record(self, value: int):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogHistogram"):
+        """Add other's samples to this histogram."""
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, q: float) -> Optional[int]:
+        """
+        Value at quantile q (0-1): the upper bound of the bucket holding it,
+        clamped to the exact min and max. None if the histogram is empty.
+        """
+        return self.percentiles({"q": q})["q"]
+
+    def buckets(self) -> Iterator[Tuple[int, int]]:
+        """(upper bound, count) of every non-empty bucket, in increasing order."""
+        for index, count in enumerate(self.counts):
+            if count:
+                yield bucket_bounds(index)[1], count
+
+    def percentiles(self, quantiles: Dict[str, float]) -> Dict[str, Optional[int]]:
+        """Several percentiles in one pass, e.g. {"p50": 0.5, "p99": 0.99}."""
+        results: Dict[str, Optional[int]] = {name: None for name in quantiles}
+        if not self.count:
+            return results
+        pending = sorted(
+            ((max(1, math.ceil(q * self.count)), name) for name, q in quantiles.items()),
+            reverse=True,
+        )
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while pending and seen >= pending[-1][0]:
+                _, name = pending.pop()
+                results[name] = min(max(bucket_bounds(index)[1], self.min), self.max)
+            if not pending:
+                break
+        return results
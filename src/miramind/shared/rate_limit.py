@@ -0,0 +1,343 @@
+"""
+Token-bucket rate limiting, in-process or shared between workers through Redis.
+
+A bucket holds up to `capacity` tokens and refills at `rate` tokens per
+second. Callers reserve the tokens a request costs: when the bucket is short,
+the reservation still succeeds if the tokens will have refilled within
+`max_wait`, and the caller sleeps until then. Bursts are smoothed into a
+steady rate, and only requests that would wait longer are rejected.
+
+Set MIRAMIND_RATE_LIMIT_REDIS_URL (e.g. redis://localhost:6379/0) to share
+the buckets of every limiter between workers; this needs the redis package.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from miramind.shared.logger import logger
+
+REDIS_URL_ENV = "MIRAMIND_RATE_LIMIT_REDIS_URL"
+DEFAULT_MAX_KEYS = 10000  # Buckets kept in memory (least recently used dropped)
+
+
+class RateLimitExceeded(RuntimeError):
+    """
+    The request would have to wait too long for its tokens; none were taken.
+
+    Attributes:
+        retry_after: seconds until the tokens are available.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    One token bucket; not thread-safe (InMemoryRateLimiter locks around it).
+
+    Tokens may go negative: a reservation that has to wait takes its tokens at
+    once, so later callers queue up behind it.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, cost: float, max_wait: float, now: float) -> Tuple[bool, float]:
+        """(taken, seconds until the tokens are there); nothing is taken past max_wait."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (cost - self.tokens) / self.rate)
+        if wait > max_wait:
+            return False, wait
+        self.tokens -= cost
+        return True, wait
+
+    def refund(self, cost: float, now: float):
+        """Give back tokens of a reservation whose request was not sent."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate + cost)
+        self.updated = now
+
+
+class _Stats:
+    def __init__(self):
+        self.allowed = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.total_delay = 0.0
+
+    def record(self, taken: bool, wait: float):
+        if not taken:
+            self.rejected += 1
+            return
+        self.allowed += 1
+        if wait > 0:
+            self.delayed += 1
+            self.total_delay += wait
+
+    def as_dict(self) -> Dict:
+        return {
+            "allowed": self.allowed,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "avg_delay": self.total_delay / self.delayed if self.delayed else 0.0,
+        }
+
+
+class InMemoryRateLimiter:
+    """
+    Token buckets by key (e.g. session id or client IP), local to this process.
+
+    Attributes:
+        name: limiter name, used in stats.
+        rate: tokens added per second.
+        capacity: bucket size, i.e. the largest burst let through without waiting.
+        max_keys: buckets kept; the least recently used are dropped (they were full anyway
+            unless used within the last capacity / rate seconds).
+    """
+
+    blocking = False  # reserve() never does I/O
+
+    def __init__(self, name: str, rate: float, capacity: float, max_keys: int = DEFAULT_MAX_KEYS):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def reserve(
+        self, key: str = "", cost: float = 1.0, max_wait: float = 0.0
+    ) -> Tuple[bool, float]:
+        """
+        Take cost tokens from key's bucket.
+
+        Returns:
+            (taken, wait): wait is how long the caller must sleep before sending
+            the request; when it is over max_wait nothing is taken.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            taken, wait = bucket.reserve(cost, max_wait, now)
+            self._stats.record(taken, wait)
+        return taken, wait
+
+    def refund(self, key: str = "", cost: float = 1.0):
+        """Give back cost tokens reserved from key's bucket for a request that was not sent."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:  # A dropped bucket was full anyway
+                bucket.refund(cost, now)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "keys": len(self._buckets),
+                **self._stats.as_dict(),
+            }
+
+
+# KEYS[1]: bucket; ARGV: rate, capacity, cost, max_wait. Returns {taken (0/1), wait}.
+# Numbers are returned as strings: Redis truncates Lua numbers to integers.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = math.max(0, (cost - tokens) / rate)
+if wait > max_wait then
+    return {0, tostring(wait)}
+end
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+-- A bucket that has refilled is the same as none
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return {1, tostring(wait)}
+"""
+
+# KEYS[1]: bucket; ARGV: rate, capacity, cost. A missing bucket has expired, i.e. is full.
+_REFUND_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+if not state[1] then
+    return 0
+end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = tonumber(state[1])
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate + cost)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return 1
+"""
+
+
+class RedisRateLimiter:
+    """
+    Token buckets shared by every worker through Redis (same interface as InMemoryRateLimiter).
+
+    Each reservation is one atomic script call that uses the Redis server's
+    clock, so workers on different hosts agree on the refill. When Redis is
+    unreachable requests are let through rather than failed.
+    """
+
+    blocking = True  # reserve() is a network round trip
+
+    def __init__(self, name: str, rate: float, capacity: float, url: str):
+        import redis  # Optional dependency, only needed for the shared backend
+
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(_RESERVE_SCRIPT)
+        self._refund_script = self._client.register_script(_REFUND_SCRIPT)
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        self.errors = 0
+
+    def reserve(
+        self, key: str = "", cost: float = 1.0, max_wait: float = 0.0
+    ) -> Tuple[bool, float]:
+        try:
+            taken, wait = self._script(
+                keys=[f"miramind:rate_limit:{self.name}:{key}"],
+                args=[self.rate, self.capacity, cost, max_wait],
+            )
+            taken, wait = bool(int(taken)), float(wait)
+        except Exception as e:
+            logger.warning(f"Rate limiter '{self.name}' unavailable, letting request through: {e}")
+            with self._lock:
+                self.errors += 1
+            taken, wait = True, 0.0
+        with self._lock:
+            self._stats.record(taken, wait)
+        return taken, wait
+
+    def refund(self, key: str = "", cost: float = 1.0):
+        try:
+            self._refund_script(
+                keys=[f"miramind:rate_limit:{self.name}:{key}"],
+                args=[self.rate, self.capacity, cost],
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter '{self.name}' unavailable, tokens not refunded: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "redis",
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "errors": self.errors,
+                **self._stats.as_dict(),
+            }
+
+
+def create_rate_limiter(name: str, rate: float, capacity: float):
+    """A Redis-backed limiter when MIRAMIND_RATE_LIMIT_REDIS_URL is set, else an in-memory one."""
+    url = os.environ.get(REDIS_URL_ENV)
+    if url:
+        try:
+            return RedisRateLimiter(name, rate, capacity, url)
+        except ImportError:
+            logger.warning(
+                f"{REDIS_URL_ENV} is set but redis is not installed; limiting per process"
+            )
+    return InMemoryRateLimiter(name, rate, capacity)
+
+
+def acquire(
+    limiter, key: str = "", cost: float = 1.0, max_wait: float = 0.0, deadline: float = None
+):
+    """
+    Reserve tokens and sleep until the request may go (blocking).
+
+    The wait is bounded by max_wait and, when given, by the time left until
+    deadline (a time.monotonic() value).
+
+    Raises:
+        RateLimitExceeded: if the tokens would come too late.
+    """
+    if deadline is not None:
+        max_wait = min(max_wait, deadline - time.monotonic())
+    taken, wait = limiter.reserve(key, cost, max(0.0, max_wait))
+    if not taken:
+        raise RateLimitExceeded(f"Rate limit '{limiter.name}' exceeded", wait)
+    if wait > 0:
+        time.sleep(wait)
+
+
+async def reserve_async(limiter, key: str = "", cost: float = 1.0, max_wait: float = 0.0):
+    """limiter.reserve without blocking the event loop on a shared backend."""
+    if limiter.blocking:
+        return await asyncio.to_thread(limiter.reserve, key, cost, max_wait)
+    return limiter.reserve(key, cost, max_wait)
+
+
+async def refund_async(limiter, key: str = "", cost: float = 1.0):
+    """limiter.refund without blocking the event loop on a shared backend."""
+    if limiter.blocking:
+        return await asyncio.to_thread(limiter.refund, key, cost)
+    return limiter.refund(key, cost)
+
+
+_limiters: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: float):
+    """
+    Get the process-wide limiter of this name, creating it on first use.
+
+    rate and capacity are only used when the limiter is created.
+    """
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = create_rate_limiter(name, rate, capacity)
+        return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Dict]:
+    """Allowed, delayed and rejected requests of every limiter, by name."""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
+
+
+def reset_rate_limiters():
+    """Forget every limiter and its buckets; they are created again on next use."""
+    with _registry_lock:
+        _limiters.clear()
@@ -0,0 +1,86 @@
+"""
+Single-flight execution: concurrent calls with the same key share one run.
+
+Caches only help once the first request has finished. When identical requests
+arrive together (the same greeting from a whole class at once), each would
+otherwise miss the cache and do its own LLM and TTS work. With single-flight
+the first caller starts the work and the others await its result.
+"""
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key.
+
+    The work runs in its own task, so a caller that is cancelled (e.g. its
+    client disconnected) does not cancel it for the others. Results and
+    exceptions are only shared while the call is in flight, never stored.
+    Calls on different event loops never share a run.
+
+    Attributes:
+        name: used in stats.
+        executed: calls that ran the work.
+        coalesced: calls that awaited another call's run instead.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return fn()'s result, sharing the run with concurrent calls of the same key."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            task = self._flights.get(flight_key)
+            if task is None:
+                task = self._flights[flight_key] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._forget(flight_key, task))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+
+    def _forget(self, flight_key, task):
+        with self._lock:
+            if self._flights.get(flight_key) is task:
+                del self._flights[flight_key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here, so a failure nobody awaited is not logged as lost
+
+
+_flights: Dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get the process-wide SingleFlight of this name, creating it on first use."""
+    with _registry_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
+
+
+def get_single_flight_stats() -> Dict[str, Dict]:
+    """Executed and coalesced calls of every SingleFlight, by name."""
+    with _registry_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.get_stats() for flight in flights}
@@ -0,0 +1,374 @@
+"""
+Lightweight request tracing.
+
+A trace is started per request (the API's TracingMiddleware) and kept in a
+context variable, so spans opened anywhere below it, in graph nodes, OpenAI
+calls, STT or TTS, attach to the right request without passing it around.
+asyncio tasks and asyncio.to_thread copy the context automatically; work
+handed to a ThreadPoolExecutor must be wrapped with in_context().
+
+Finished traces are handed to a background thread that exports them, as
+OTLP JSON (to a file or a collector) or as Chrome trace events. Without a
+trace, span() only reads one context variable.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from miramind.shared.logger import logger
+
+SERVICE_NAME = "miramind"
+
+# Exporters chosen with MIRAMIND_TRACE_EXPORTER (comma-separated)
+OTLP = "otlp"
+CHROME = "chrome"
+DEFAULT_OTLP_FILE = "traces.otlp.jsonl"
+DEFAULT_CHROME_FILE = "traces.chrome.json"
+EXPORT_QUEUE_SIZE = 1000  # Finished traces waiting for export (more are dropped)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "miramind_trace", default=None
+)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "miramind_span", default=None
+)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation of a trace."""
+
+    __slots__ = (
+        "trace",
+        "name",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "thread_id",
+    )
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread_id = threading.get_ident()
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        """Finish the span; later calls are ignored."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.add(self)
+
+
+class Trace:
+    """Finished spans of one request."""
+
+    def __init__(self):
+        self.trace_id = _new_id(128)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Span]:
+    """
+    Trace a request: yields its root span, and exports the trace when the block exits.
+
+    Spans opened inside the block (in this context or copies of it) belong to the trace.
+    """
+    trace = Trace()
+    root = Span(trace, name, None, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        root.end()
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span; yields None outside a trace.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def in_context(fn: Callable, *args, **kwargs) -> Callable[[], Any]:
+    """
+    Bind fn to a copy of the current context, for work submitted to a thread pool:
+    executor.submit(in_context(fn, arg)) keeps its spans in the caller's trace.
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args, **kwargs)
+
+
+# --- Server-Timing ---
+_TOKEN_CHARS = re.compile(r"[^A-Za-z0-9_\-.]")
+
+
+def server_timing(trace: Trace, exclude: Optional[Span] = None) -> str:
+    """
+    Server-Timing header value: total milliseconds per span name of the finished spans.
+    """
+    totals: Dict[str, float] = {}
+    for finished in trace.finished_spans():
+        if finished is not exclude:
+            name = _TOKEN_CHARS.sub("_", finished.name)
+            totals[name] = totals.get(name, 0.0) + finished.duration_ms
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in totals.items())
+
+
+# --- Exporters ---
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest of the spans."""
+    otlp_spans = []
+    for finished in spans:
+        otlp_span = {
+            "traceId": finished.trace.trace_id,
+            "spanId": finished.span_id,
+            "name": finished.name,
+            "kind": 2 if finished.parent_id is None else 1,  # SERVER for the root, else INTERNAL
+            "startTimeUnixNano": str(finished.start_ns),
+            "endTimeUnixNano": str(finished.end_ns),
+            "attributes": _otlp_attributes(finished.attributes),
+            "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+        }
+        if finished.parent_id is not None:
+            otlp_span["parentSpanId"] = finished.parent_id
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def to_chrome_events(spans: List[Span]) -> List[Dict[str, Any]]:
+    """Chrome trace events ("X" complete events), viewable in Perfetto or chrome://tracing."""
+    pid = os.getpid()
+    return [
+        {
+            "name": finished.name,
+            "cat": SERVICE_NAME,
+            "ph": "X",
+            "ts": finished.start_ns / 1000,
+            "dur": (finished.end_ns - finished.start_ns) / 1000,
+            "pid": pid,
+            "tid": finished.thread_id,
+            "args": {
+                **finished.attributes,
+                "trace_id": finished.trace.trace_id,
+                **({"error": finished.error} if finished.error else {}),
+            },
+        }
+        for finished in spans
+    ]
+
+
+class OTLPFileExporter:
+    """Appends one OTLP/JSON request per trace to a JSON-lines file."""
+
+    def __init__(self, path: str = DEFAULT_OTLP_FILE):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(to_otlp(spans), default=str) + "\n")
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(to_otlp(spans), default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class ChromeTraceExporter:
+    """
+    Appends trace events to a JSON array file. The array is never closed,
+    which the trace-event format allows, so events can be appended forever.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHROME_FILE):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write("[\n")
+            for event in to_chrome_events(spans):
+                f.write(json.dumps(event, default=str) + ",\n")
+
+
+class _ExportWorker:
+    """Background thread exporting finished traces, so requests never wait on I/O."""
+
+    def __init__(self, exporters: List, max_queue_size: int = EXPORT_QUEUE_SIZE):
+        self.exporters = exporters
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                spans = trace.finished_spans()
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(spans)
+                    except Exception as e:
+                        logger.warning(f"Trace export with {type(exporter).__name__} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_worker: Optional[_ExportWorker] = None
+
+
+def set_exporters(exporters: List):
+    """Export finished traces with these exporters (an empty list disables exporting)."""
+    global _worker
+    _worker = _ExportWorker(exporters) if exporters else None
+
+
+def flush():
+    """Block until every finished trace is exported."""
+    if _worker is not None:
+        _worker.flush()
+
+
+def _export(trace: Trace):
+    if _worker is not None:
+        _worker.submit(trace)
+
+
+def configure_from_env():
+    """
+    Set the exporters from the environment:
+
+    MIRAMIND_TRACE_EXPORTER: comma-separated "otlp" and/or "chrome" (unset: no export).
+    OTEL_EXPORTER_OTLP_ENDPOINT: collector URL for "otlp"; without it OTLP JSON
+        is appended to MIRAMIND_TRACE_OTLP_FILE.
+    MIRAMIND_TRACE_CHROME_FILE: trace-event file for "chrome".
+    """
+    names = {name.strip() for name in os.getenv("MIRAMIND_TRACE_EXPORTER", "").split(",")}
+    exporters = []
+    if OTLP in names:
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+        if endpoint:
+            exporters.append(OTLPHttpExporter(endpoint))
+        else:
+            exporters.append(
+                OTLPFileExporter(os.getenv("MIRAMIND_TRACE_OTLP_FILE", DEFAULT_OTLP_FILE))
+            )
+    if CHROME in names:
+        exporters.append(
+            ChromeTraceExporter(os.getenv("MIRAMIND_TRACE_CHROME_FILE", DEFAULT_CHROME_FILE))
+        )
+    set_exporters(exporters)
+    if exporters:
+        logger.info(f"Exporting traces with {', '.join(type(e).__name__ for e in exporters)}")
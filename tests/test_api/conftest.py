@@ -60,16 +60,27 @@ def mock_logger():
 @pytest.fixture(autouse=True)
 def mock_global_state():
     """Reset global state before each test."""
-    from miramind.api.main import api_response_cache, voice_recordings
+    from miramind.api.main import (
+        api_response_cache,
+        audio_jobs,
+        transcript_cache,
+        voice_recordings,
+    )
+    from miramind.shared.rate_limit import reset_rate_limiters
 
     # Clear caches
     api_response_cache.clear()
+    transcript_cache.clear()
+    audio_jobs.clear()
     voice_recordings.clear()
+    reset_rate_limiters()
 
     yield
 
     # Clean up after test
     api_response_cache.clear()
+    transcript_cache.clear()
+    audio_jobs.clear()
     voice_recordings.clear()
 
 
@@ -0,0 +1,157 @@
+"""
+Tests for admission control of chat requests.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from miramind.api.admission import AdmissionController, ClientDisconnected
+from miramind.api.main import app
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _connected():
+    return False
+
+
+class TestAdmissionController:
+    """Test suite for AdmissionController."""
+
+    def test_admits_up_to_limit_then_queues_in_order(self):
+        """Test that waiters get freed slots first come, first served."""
+        admission = AdmissionController(max_in_flight=1, max_queue=2, poll_interval=0.01)
+        order = []
+
+        async def chat(name, hold):
+            async with admission.admit():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            first = asyncio.create_task(chat("first", 0.05))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(chat("second", 0))
+            await asyncio.sleep(0)
+            third = asyncio.create_task(chat("third", 0))
+            await asyncio.sleep(0.01)
+            assert (admission.in_flight, admission.queued) == (1, 2)
+            await asyncio.gather(first, second, third)
+
+        _run(scenario())
+
+        assert order == ["first", "second", "third"]
+        assert (admission.in_flight, admission.queued) == (0, 0)
+        stats = admission.get_stats()
+        assert stats["admitted"] == 3
+        assert stats["p99_queue_wait"] > 0.03
+
+    def test_rejects_when_queue_full(self):
+        """Test that requests beyond the queue get 503 with Retry-After at once."""
+        admission = AdmissionController(max_in_flight=1, max_queue=0, retry_after=3)
+
+        async def scenario():
+            async with admission.admit():
+                with pytest.raises(HTTPException) as excinfo:
+                    async with admission.admit():
+                        pass
+            return excinfo.value
+
+        error = _run(scenario())
+
+        assert error.status_code == 503
+        assert error.headers == {"Retry-After": "3"}
+        assert admission.get_stats()["rejected_queue_full"] == 1
+        assert admission.in_flight == 0
+
+    def test_rejects_after_max_queue_wait(self):
+        """Test that a request waiting too long for a slot gets 503."""
+        admission = AdmissionController(
+            max_in_flight=1, max_queue=1, max_queue_wait=0.02, poll_interval=0.01
+        )
+
+        async def scenario():
+            async with admission.admit():
+                with pytest.raises(HTTPException):
+                    async with admission.admit(_connected):
+                        pass
+                assert admission.queued == 0
+
+        _run(scenario())
+
+        assert admission.get_stats()["rejected_queue_timeout"] == 1
+        assert admission.in_flight == 0
+
+    def test_drops_disconnected_client(self):
+        """Test that a queued request whose client left never runs."""
+        admission = AdmissionController(max_in_flight=1, max_queue=1, poll_interval=0.01)
+        ran = []
+
+        async def disconnected():
+            return True
+
+        async def scenario():
+            async with admission.admit():
+                with pytest.raises(ClientDisconnected):
+                    async with admission.admit(disconnected):
+                        ran.append("queued")
+            # The slot is free again
+            async with admission.admit(_connected):
+                ran.append("next")
+
+        _run(scenario())
+
+        assert ran == ["next"]
+        assert admission.get_stats()["abandoned"] == 1
+        assert admission.in_flight == 0
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled queued request gives up its place."""
+        admission = AdmissionController(max_in_flight=1, max_queue=1, poll_interval=0.01)
+
+        async def waiting():
+            async with admission.admit():
+                pass
+
+        async def scenario():
+            async with admission.admit():
+                task = asyncio.create_task(waiting())
+                await asyncio.sleep(0.02)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                assert admission.queued == 0
+
+        _run(scenario())
+        assert admission.in_flight == 0
+
+
+class TestAdmissionEndpoints:
+    """Test admission control on the chat endpoints."""
+
+    def test_chat_rejected_when_full(self):
+        """Test that a full server answers 503 with Retry-After without calling the chatbot."""
+        full = AdmissionController(max_in_flight=0, max_queue=0, retry_after=5)
+        with (
+            patch("miramind.api.main.chat_admission", full),
+            patch("miramind.api.main.process_chat_message_async") as mock_process_chat,
+        ):
+            response = TestClient(app).post("/api/chat/message", json={"userInput": "Hello"})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+        mock_process_chat.assert_not_called()
+
+    def test_debug_admission(self):
+        """Test the admission debug endpoint."""
+        response = TestClient(app).get("/api/debug/admission")
+        assert response.status_code == 200
+        assert {"in_flight", "queued", "rejected_queue_full", "p99_queue_wait"} <= set(
+            response.json()
+        )
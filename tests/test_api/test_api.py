@@ -169,6 +169,105 @@ class TestChatEndpoints:
             data = response.json()
             assert data["response_text"] == "Fallback response"
 
+    @patch("miramind.api.main.process_chat_message_async")
+    def test_chat_message_skips_subprocess_when_openai_circuit_open(
+        self, mock_process_chat, client, sample_chat_input
+    ):
+        """Test that an open OpenAI breaker answers with a canned reply instead of the subprocess."""
+        mock_process_chat.side_effect = Exception("Async processing failed")
+
+        with (
+            patch("miramind.api.main.openai_breaker") as mock_breaker,
+            patch("asyncio.create_subprocess_exec") as mock_subprocess,
+        ):
+            mock_breaker.is_open = True
+            response = client.post("/api/chat/message", json=sample_chat_input)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["degraded"] is True
+        assert data["response_text"]
+        mock_subprocess.assert_not_called()
+
+    @patch("miramind.api.main.process_chat_message_async")
+    def test_chat_message_degraded_not_cached(self, mock_process_chat, client, sample_chat_input):
+        """Test that canned replies are not served from the API cache later."""
+        mock_process_chat.return_value = {
+            "response_text": "I'm listening.",
+            "audio_file_path": None,
+            "memory": "",
+            "degraded": True,
+        }
+
+        first = client.post("/api/chat/message", json=sample_chat_input).json()
+        client.post("/api/chat/message", json=sample_chat_input)
+
+        assert first["degraded"] is True
+        assert mock_process_chat.call_count == 2
+
+    @patch("miramind.api.main.synthesize_response_audio", new_callable=AsyncMock)
+    @patch("miramind.api.main.process_chat_message_async")
+    def test_chat_message_deferred_audio(
+        self, mock_process_chat, mock_synthesize, client, sample_chat_input
+    ):
+        """Test text-first replies with audio synthesized in the background."""
+        mock_process_chat.return_value = {
+            "response_text": "Text first",
+            "audio_file_path": None,
+            "memory": "",
+            "emotion": "happy",
+        }
+        mock_synthesize.return_value = b"RIFF audio"
+
+        response = client.post("/api/chat/message", json={**sample_chat_input, "deferAudio": True})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["response_text"] == "Text first"
+        assert data["audio_url"] == f"/api/audio/jobs/{data['audio_job_id']}"
+        assert mock_process_chat.call_args.kwargs["defer_audio"] is True
+        mock_synthesize.assert_awaited_once_with("Text first", "happy", audio_format="wav")
+
+        # TestClient runs background tasks before returning, so the audio is ready
+        audio = client.get(data["audio_url"])
+        assert audio.status_code == 200
+        assert audio.content == b"RIFF audio"
+        assert audio.headers["content-type"] == "audio/wav"
+
+    @patch("miramind.api.main.synthesize_response_audio", new_callable=AsyncMock)
+    @patch("miramind.api.main.process_chat_message_async")
+    def test_chat_message_deferred_audio_negotiated(
+        self, mock_process_chat, mock_synthesize, client, sample_chat_input
+    ):
+        """Test that the Accept header picks the encoding of text-first audio."""
+        mock_process_chat.return_value = {
+            "response_text": "Text first",
+            "audio_file_path": None,
+            "memory": "",
+            "emotion": "happy",
+        }
+        mock_synthesize.side_effect = lambda text, emotion, audio_format: audio_format.encode()
+
+        data = client.post(
+            "/api/chat/message",
+            json={**sample_chat_input, "deferAudio": True},
+            headers={"Accept": "application/json, audio/ogg"},
+        ).json()
+        mock_synthesize.assert_awaited_once_with("Text first", "happy", audio_format="ogg_opus")
+
+        ogg = client.get(data["audio_url"], headers={"Accept": "audio/ogg, */*;q=0.1"})
+        assert ogg.content == b"ogg_opus"
+        assert ogg.headers["content-type"] == "audio/ogg"
+        assert "Accept" in ogg.headers["vary"]
+
+        # An encoding the job lacks is synthesized once, then kept
+        for _ in range(2):
+            wav = client.get(data["audio_url"], headers={"Accept": "audio/wav"})
+            assert wav.content == b"wav"
+            assert wav.headers["content-type"] == "audio/wav"
+        assert mock_synthesize.await_count == 2
+
+        assert client.get(data["audio_url"], headers={"Accept": "audio/flac"}).status_code == 406
+
 
 class TestTranscriptEndpoints:
     """Test transcript and session-related endpoints."""
@@ -221,6 +320,20 @@ class TestAudioEndpoints:
             data = response.json()
             assert data["error"] == "Audio file not found"
 
+    def test_get_audio_job_unknown(self, client):
+        """Test polling an unknown audio job."""
+        response = client.get("/api/audio/jobs/missing")
+        assert response.status_code == 404
+
+    def test_get_audio_job_pending(self, client):
+        """Test polling an audio job that is still being synthesized."""
+        from miramind.api.main import audio_jobs
+
+        job_id = audio_jobs.create()
+        response = client.get(f"/api/audio/jobs/{job_id}")
+        assert response.status_code == 202
+        assert response.json() == {"status": "pending"}
+
     def test_get_audio_file_simple_endpoint(self, client):
         """Test the simple audio file endpoint."""
         with patch("os.path.exists", return_value=False):
@@ -265,6 +378,41 @@ class TestVoiceEndpoints:
         data = response.json()
         assert data["transcript"] == "Hello, this is a test"
         assert data["success"] is True
+        assert data["cached"] is False
+
+    @patch("miramind.api.main.openai_client")
+    @patch("miramind.api.main.STT")
+    def test_upload_voice_stt_circuit_open(self, mock_stt_class, mock_openai_client, client):
+        """Test that an open speech-to-text breaker fails fast with 503."""
+        from miramind.shared.circuit_breaker import CircuitOpenError
+
+        mock_stt = MagicMock()
+        mock_stt.transcribe_bytes.side_effect = CircuitOpenError("stt is unavailable")
+        mock_stt_class.return_value = mock_stt
+
+        response = client.post(
+            "/api/voice/upload", files={"file": ("test.wav", b"fake audio data", "audio/wav")}
+        )
+        assert response.status_code == 503
+
+    @patch("miramind.api.main.openai_client")
+    @patch("miramind.api.main.STT")
+    def test_upload_voice_retry_uses_transcript_cache(
+        self, mock_stt_class, mock_openai_client, client
+    ):
+        """Test that re-uploading the same audio does not call STT again."""
+        mock_stt = MagicMock()
+        mock_stt.transcribe_bytes.return_value = {"transcript": "Hello, this is a test"}
+        mock_stt_class.return_value = mock_stt
+
+        files = {"file": ("test.wav", b"fake audio data", "audio/wav")}
+        first = client.post("/api/voice/upload", files=files).json()
+        second = client.post("/api/voice/upload", files=files).json()
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["transcript"] == "Hello, this is a test"
+        mock_stt.transcribe_bytes.assert_called_once()
 
     def test_start_voice_recording_no_openai(self, client, sample_voice_input):
         """Test starting voice recording without OpenAI client."""
@@ -388,6 +536,24 @@ class TestDebugEndpoints:
             assert "output_wav_info" in data
 
 
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics endpoint."""
+
+    def test_metrics_endpoint(self, client):
+        """Test that /metrics reports request latencies by route in the text format."""
+        client.get("/api/test")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'miramind_http_request_duration_seconds_count{method="GET",route="/api/test"}' in (
+            response.text
+        )
+        assert "miramind_http_requests_in_flight" in response.text
+        assert 'miramind_cache_requests_total{cache="transcript",result="hit"}' in response.text
+        assert 'miramind_executor_queue_depth{executor="default"}' in response.text
+
+
 class TestBackgroundTasks:
     """Test background task functionality."""
 
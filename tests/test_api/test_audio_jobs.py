@@ -0,0 +1,104 @@
+"""
+Tests for the background audio job store used by text-first chat replies.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from miramind.api.audio_jobs import DONE, FAILED, PENDING, AudioJobStore, run_audio_job
+
+
+class TestAudioJobStore:
+    """Test suite for AudioJobStore."""
+
+    def test_job_lifecycle(self):
+        """Test that a job goes from pending to done with its audio."""
+        store = AudioJobStore()
+        job_id = store.create()
+        assert store.get(job_id).status == PENDING
+
+        store.complete(job_id, b"audio")
+
+        job = store.get(job_id)
+        assert job.status == DONE
+        assert job.audio == b"audio"
+
+    def test_encodings_kept_per_format(self):
+        """Test that a job keeps every encoding added and a failed one leaves it done."""
+        store = AudioJobStore()
+        job_id = store.create("Hello", "happy")
+
+        store.complete(job_id, b"ogg", "ogg_opus")
+        store.complete(job_id, b"wav", "wav")
+        store.complete(job_id, None, "mp3")
+
+        job = store.get(job_id)
+        assert job.status == DONE
+        assert job.encodings == {"ogg_opus": b"ogg", "wav": b"wav"}
+        assert job.audio == b"ogg"
+        assert (job.text, job.emotion) == ("Hello", "happy")
+
+    def test_empty_audio_fails_job(self):
+        """Test that a synthesis without audio marks the job failed."""
+        store = AudioJobStore()
+        job_id = store.create()
+
+        store.complete(job_id, None)
+
+        assert store.get(job_id).status == FAILED
+
+    def test_expired_jobs_are_dropped(self):
+        """Test that jobs older than ttl are no longer returned."""
+        store = AudioJobStore(ttl=10)
+        with patch("miramind.api.audio_jobs.time.monotonic", return_value=100.0):
+            job_id = store.create()
+        with patch("miramind.api.audio_jobs.time.monotonic", return_value=111.0):
+            assert store.get(job_id) is None
+
+    def test_store_is_bounded(self):
+        """Test that the oldest jobs are dropped beyond max_entries."""
+        store = AudioJobStore(max_entries=2)
+        first = store.create()
+        store.create()
+        store.create()
+
+        assert len(store) == 2
+        assert store.get(first) is None
+
+
+class TestRunAudioJob:
+    """Test suite for run_audio_job."""
+
+    def test_stores_audio(self):
+        """Test that the synthesized audio is stored under the job id."""
+        store = AudioJobStore()
+        job_id = store.create()
+        synthesize = AsyncMock(return_value=b"audio")
+
+        asyncio.run(run_audio_job(store, job_id, synthesize, "Hello", "happy"))
+
+        synthesize.assert_awaited_once_with("Hello", "happy", audio_format="wav")
+        assert store.get(job_id).audio == b"audio"
+
+    def test_stores_audio_format(self):
+        """Test that the audio is stored under the requested encoding."""
+        store = AudioJobStore()
+        job_id = store.create()
+        synthesize = AsyncMock(return_value=b"ogg")
+
+        asyncio.run(run_audio_job(store, job_id, synthesize, "Hello", audio_format="ogg_opus"))
+
+        synthesize.assert_awaited_once_with("Hello", audio_format="ogg_opus")
+        assert store.get(job_id).encodings == {"ogg_opus": b"ogg"}
+
+    def test_error_marks_job_failed(self):
+        """Test that a synthesis error is recorded on the job."""
+        store = AudioJobStore()
+        job_id = store.create()
+        synthesize = AsyncMock(side_effect=RuntimeError("TTS down"))
+
+        asyncio.run(run_audio_job(store, job_id, synthesize, "Hello"))
+
+        job = store.get(job_id)
+        assert job.status == FAILED
+        assert job.error == "TTS down"
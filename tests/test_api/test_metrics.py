@@ -0,0 +1,103 @@
+"""
+Tests for the Prometheus /metrics exporter.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from miramind.api.metrics import (
+    CONTENT_TYPE,
+    UNMATCHED_ROUTE,
+    MetricsMiddleware,
+    RequestMetrics,
+    render_metrics,
+)
+from miramind.llm.langgraph.performance_monitor import PerformanceMonitor
+
+
+def _samples(text: str, name: str):
+    return [line for line in text.splitlines() if line.startswith(f"miramind_{name}")]
+
+
+def _app(metrics: RequestMetrics) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"item_id": item_id}
+
+    return app
+
+
+class TestMetricsMiddleware:
+    """Test suite for MetricsMiddleware."""
+
+    def test_latency_recorded_per_route_template(self):
+        """Test that requests are grouped by route template, not by concrete path."""
+        metrics = RequestMetrics()
+        client = TestClient(_app(metrics))
+
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+        assert metrics.monitor.count("GET /items/{item_id}") == 2
+        assert metrics.monitor.count(f"GET {UNMATCHED_ROUTE}") == 1
+        assert metrics.monitor.get_counters()["GET /items/{item_id} 200"] == 2
+        assert metrics.in_flight == 0
+
+
+class TestRenderMetrics:
+    """Test suite for render_metrics."""
+
+    def test_histogram_buckets_cumulative(self):
+        """Test that log buckets fold into cumulative Prometheus buckets."""
+        monitor = PerformanceMonitor()
+        for seconds in (0.003, 0.04, 0.04, 2.0):
+            monitor.record("tts", seconds)
+
+        text = render_metrics(requests=RequestMetrics(), monitor=monitor)
+        buckets = {
+            line.split('le="')[1].split('"')[0]: int(line.rsplit(" ", 1)[1])
+            for line in _samples(text, 'stage_duration_seconds_bucket{stage="tts"')
+        }
+
+        assert buckets["0.005"] == 1
+        assert buckets["0.05"] == 3
+        assert buckets["1.0"] == 3
+        assert buckets["2.5"] == buckets["+Inf"] == 4
+        assert 'miramind_stage_duration_seconds_count{stage="tts"} 4' in text
+
+    def test_cache_hit_ratio(self):
+        """Test cache counters from the monitor and from other caches."""
+        monitor = PerformanceMonitor()
+        monitor.increment("response_cache.hits", 3)
+        monitor.increment("response_cache.misses")
+
+        text = render_metrics(
+            caches={"transcript": (0, 2)}, requests=RequestMetrics(), monitor=monitor
+        )
+
+        assert 'miramind_cache_requests_total{cache="response_cache",result="hit"} 3' in text
+        assert 'miramind_cache_hit_ratio{cache="response_cache"} 0.75' in text
+        assert 'miramind_cache_hit_ratio{cache="transcript"} 0.0' in text
+
+    def test_text_format(self):
+        """Test that every metric has HELP and TYPE lines and executors are reported."""
+        text = render_metrics(requests=RequestMetrics(), monitor=PerformanceMonitor())
+
+        assert "# TYPE miramind_http_requests_in_flight gauge" in text
+        assert "# TYPE miramind_http_request_duration_seconds histogram" in text
+        assert 'miramind_executor_queue_depth{executor="chat_io"} 0' in text
+        assert 'miramind_executor_queue_depth{executor="openai"} 0' in text
+        assert CONTENT_TYPE.startswith("text/plain; version=0.0.4")
+
+    def test_executor_without_queue_omitted(self):
+        """Test that an executor whose queue cannot be read is not reported as empty."""
+        text = render_metrics(
+            executors={"custom": object()}, requests=RequestMetrics(), monitor=PerformanceMonitor()
+        )
+
+        assert 'executor="custom"' not in text
+        assert 'miramind_executor_queue_depth{executor="openai"} 0' in text
@@ -0,0 +1,101 @@
+"""
+Tests for per-client rate limiting of chat requests.
+"""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from miramind.api.main import app
+from miramind.shared.rate_limit import InMemoryRateLimiter
+
+
+def _reply():
+    return {"response_text": "Hi!", "audio_file_path": None, "memory": ""}
+
+
+class TestChatRateLimit:
+    """Test rate limiting on the chat endpoint."""
+
+    def test_session_over_rate_gets_429(self):
+        """Test that a session over its rate is turned away with Retry-After."""
+        session = InMemoryRateLimiter("session", rate=0.1, capacity=3)
+        client_ip = InMemoryRateLimiter("client_ip", rate=100.0, capacity=100)
+        with (
+            patch("miramind.api.rate_limit._limiters", return_value=(client_ip, session)),
+            patch("miramind.api.main.process_chat_message_async", return_value=_reply()),
+        ):
+            client = TestClient(app)
+            first = client.post("/api/chat/message", json={"userInput": "a", "sessionId": "s1"})
+            second = client.post("/api/chat/message", json={"userInput": "b", "sessionId": "s1"})
+            other = client.post("/api/chat/message", json={"userInput": "c", "sessionId": "s2"})
+
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert int(second.headers["retry-after"]) == 30
+        assert other.status_code == 200
+
+    def test_rejected_session_does_not_charge_ip(self):
+        """Test that a session's 429 leaves the shared IP bucket untouched."""
+        session = InMemoryRateLimiter("session", rate=0.1, capacity=3)
+        client_ip = InMemoryRateLimiter("client_ip", rate=0.1, capacity=6)
+        with (
+            patch("miramind.api.rate_limit._limiters", return_value=(client_ip, session)),
+            patch("miramind.api.main.process_chat_message_async", return_value=_reply()),
+        ):
+            client = TestClient(app)
+            statuses = [
+                client.post(
+                    "/api/chat/message", json={"userInput": f"m{i}", "sessionId": "s1"}
+                ).status_code
+                for i in range(3)
+            ]
+            other = client.post("/api/chat/message", json={"userInput": "c", "sessionId": "s2"})
+
+        assert statuses == [200, 429, 429]
+        assert other.status_code == 200
+
+    def test_rejected_ip_does_not_charge_session(self):
+        """Test that a session turned away because of its shared IP keeps its tokens."""
+        session = InMemoryRateLimiter("session", rate=0.1, capacity=6)
+        client_ip = InMemoryRateLimiter("client_ip", rate=0.1, capacity=3)
+        with (
+            patch("miramind.api.rate_limit._limiters", return_value=(client_ip, session)),
+            patch("miramind.api.main.process_chat_message_async", return_value=_reply()),
+        ):
+            client = TestClient(app)
+            first = client.post("/api/chat/message", json={"userInput": "a", "sessionId": "s1"})
+            second = client.post("/api/chat/message", json={"userInput": "b", "sessionId": "s1"})
+
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert session.reserve("s1", 3) == (True, 0.0)  # Only the first turn was charged
+
+    def test_short_bursts_smoothed(self):
+        """Test that a client slightly over its rate is delayed rather than rejected."""
+        session = InMemoryRateLimiter("session", rate=100.0, capacity=3)
+        client_ip = InMemoryRateLimiter("client_ip", rate=100.0, capacity=100)
+        with (
+            patch("miramind.api.rate_limit._limiters", return_value=(client_ip, session)),
+            patch("miramind.api.main.process_chat_message_async", return_value=_reply()),
+        ):
+            client = TestClient(app)
+            statuses = [
+                client.post(
+                    "/api/chat/message", json={"userInput": f"m{i}", "sessionId": "s1"}
+                ).status_code
+                for i in range(3)
+            ]
+
+        assert statuses == [200, 200, 200]
+        assert session.get_stats()["delayed"] == 2
+
+    def test_debug_rate_limits(self):
+        """Test the rate limit debug endpoint."""
+        client = TestClient(app)
+        with patch("miramind.api.main.process_chat_message_async", return_value=_reply()):
+            client.post("/api/chat/message", json={"userInput": "hello"})
+
+        response = client.get("/api/debug/rate-limits")
+        assert response.status_code == 200
+        assert response.json()["client_ip"]["allowed"] >= 1
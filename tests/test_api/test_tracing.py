@@ -0,0 +1,70 @@
+"""
+Tests for per-request tracing and the Server-Timing header.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from miramind.api.tracing import TracingMiddleware
+from miramind.shared import tracing
+from miramind.shared.tracing import span
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, spans):
+        self.exported.append(spans)
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with span("emotion_detection"):
+            pass
+        return {"item_id": item_id}
+
+    @app.get("/sync")
+    def get_sync():
+        # Sync endpoints run in a worker thread with a copy of the request's context
+        with span("sync_stage"):
+            pass
+        return {}
+
+    return app
+
+
+class TestTracingMiddleware:
+    """Test suite for TracingMiddleware."""
+
+    def test_server_timing_header(self):
+        """Test that the response lists the stages of the request."""
+        response = TestClient(_app()).get("/items/1")
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("emotion_detection;dur=")
+
+    def test_sync_endpoint_traced(self):
+        """Test that spans of sync endpoints belong to the request's trace."""
+        response = TestClient(_app()).get("/sync")
+        assert "sync_stage;dur=" in response.headers["server-timing"]
+
+    def test_trace_exported_with_route(self):
+        """Test that the exported root span is named after the route template."""
+        exporter = CollectingExporter()
+        tracing.set_exporters([exporter])
+        try:
+            TestClient(_app()).get("/items/1")
+            tracing.flush()
+        finally:
+            tracing.set_exporters([])
+
+        (spans,) = exporter.exported
+        root = spans[-1]
+        assert root.name == "GET /items/{item_id}"
+        assert root.attributes["http.status_code"] == 200
+        assert spans[0].parent_id == root.span_id
@@ -1,6 +1,9 @@
+import concurrent.futures
 import json
 import os
+import subprocess
 import sys
+import time
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
@@ -16,8 +19,10 @@ from src.miramind.llm.langgraph.chatbot import (
     EmotionResult,
     detect_emotion,
     get_chatbot,
+    get_emotion_classifier_stats,
     get_graph,
     initialize_clients,
+    route_tts,
 )
 
 
@@ -33,6 +38,14 @@ class TestChatbot:
         # Mock state for testing
         self.test_state = {"user_input": "I am feeling sad today", "chat_history": [], "memory": ""}
 
+        # Exercise the LLM path unless a test installs a local classifier itself
+        self.classifier_patcher = patch('src.miramind.llm.langgraph.chatbot.local_classifier', None)
+        self.classifier_patcher.start()
+
+    def teardown_method(self):
+        """Restore the local emotion classifier."""
+        self.classifier_patcher.stop()
+
     def test_emotion_result_model_validation(self):
         """Test EmotionResult pydantic model validation."""
         # Valid emotion result
@@ -60,7 +73,6 @@ class TestChatbot:
 
         assert result["emotion"] == "sad"
         assert result["emotion_confidence"] == 0.92
-        assert result["user_input"] == "I am feeling sad today"
         assert len(result["chat_history"]) == 1
         assert result["chat_history"][0]["role"] == "user"
         assert result["chat_history"][0]["content"] == "I am feeling sad today"
@@ -110,56 +122,54 @@ class TestChatbot:
         assert result["emotion"] == "neutral"
         assert result["emotion_confidence"] == 0.0
 
-    @patch('src.miramind.llm.langgraph.chatbot.initialize_clients')
-    @patch('src.miramind.llm.langgraph.subgraphs.build_sad_flow')
-    @patch('src.miramind.llm.langgraph.subgraphs.build_angry_flow')
-    @patch('src.miramind.llm.langgraph.subgraphs.build_excited_flow')
-    @patch('src.miramind.llm.langgraph.subgraphs.build_gentle_flow')
-    @patch('src.miramind.llm.langgraph.subgraphs.build_neutral_flow')
-    def test_get_graph_structure(
-        self, mock_neutral, mock_gentle, mock_excited, mock_angry, mock_sad, mock_init
-    ):
-        """Test that get_graph creates proper graph structure."""
-        # Setup mocks
-        mock_init.return_value = (
-            self.mock_client,
-            self.mock_tts_provider,
-            self.mock_emotion_logger,
-        )
-
-        # Mock subgraph builders to return mock compiled graphs
-        mock_compiled_graph = Mock()
-        mock_sad.return_value.compile.return_value = mock_compiled_graph
-        mock_angry.return_value.compile.return_value = mock_compiled_graph
-        mock_excited.return_value.compile.return_value = mock_compiled_graph
-        mock_gentle.return_value.compile.return_value = mock_compiled_graph
-        mock_neutral.return_value.compile.return_value = mock_compiled_graph
-
-        # Mock the global variables
+    def test_get_graph_structure(self):
+        """Test that get_graph builds flows as direct nodes of one graph."""
         with (
             patch('src.miramind.llm.langgraph.chatbot.client', self.mock_client),
             patch('src.miramind.llm.langgraph.chatbot.tts_provider', self.mock_tts_provider),
             patch('src.miramind.llm.langgraph.chatbot.emotion_logger', self.mock_emotion_logger),
         ):
-
             graph = get_graph()
 
-            # Verify graph was created
-            assert graph is not None
+        nodes = set(graph.nodes)
+        assert {
+            "detect_emotion",
+            "sad_flow",
+            "follow_up",
+            "angry_flow",
+            "excited_flow",
+            "gentle_flow",
+            "neutral_flow",
+            "text_to_speech",
+        } <= nodes
+
+    @patch('miramind.llm.langgraph.utils.call_openai')
+    def test_graph_routes_sad_through_follow_up(self, mock_reply):
+        """Test that a sad message gets the follow-up and the spoken reply."""
+        mock_reply.return_value = "I'm here for you."
+        tts = Mock(spec=["synthesize"])
+        tts.synthesize.return_value = b"audio"
+        classifier = Mock()
+        classifier.predict.return_value = ("sad", 0.99)
+
+        with (
+            patch('src.miramind.llm.langgraph.chatbot.client', self.mock_client),
+            patch('src.miramind.llm.langgraph.chatbot.tts_provider', tts),
+            patch('src.miramind.llm.langgraph.chatbot.emotion_logger', self.mock_emotion_logger),
+            patch('src.miramind.llm.langgraph.chatbot.local_classifier', classifier),
+        ):
+            result = get_graph().invoke(self.test_state)
 
-            # Verify subgraph builders were called
-            mock_sad.assert_called_once()
-            mock_angry.assert_called_once()
-            mock_excited.assert_called_once()
-            mock_gentle.assert_called_once()
-            mock_neutral.assert_called_once()
+        assert result["response"].startswith("I'm here for you. Would you like to tell me more")
+        assert result["response_audio"] == b"audio"
+        assert json.loads(tts.synthesize.call_args[0][0])["text"] == result["response"]
 
     @patch('src.miramind.llm.langgraph.chatbot.get_tts_provider')
     @patch('src.miramind.llm.langgraph.chatbot.OpenAI')
     @patch('src.miramind.llm.langgraph.chatbot.EmotionLogger')
-    @patch('src.miramind.llm.langgraph.chatbot.load_dotenv')
+    @patch('src.miramind.llm.langgraph.chatbot.load_env')
     def test_initialize_clients(
-        self, mock_load_dotenv, mock_emotion_logger, mock_openai, mock_get_tts
+        self, mock_load_env, mock_emotion_logger, mock_openai, mock_get_tts
     ):
         """Test client initialization."""
         # Setup mocks
@@ -175,7 +185,7 @@ class TestChatbot:
             client, tts, logger = initialize_clients()
 
             # Verify initialization
-            mock_load_dotenv.assert_called_once()
+            mock_load_env.assert_called_once()
             mock_openai.assert_called_once()
             mock_get_tts.assert_called_once_with("azure")
             mock_emotion_logger.assert_called_once()
@@ -191,7 +201,7 @@ class TestChatbot:
         mock_main.return_value = mock_chatbot
 
         # Clear any existing chatbot instance
-        with patch('src.miramind.llm.langgraph.chatbot.chatbot', None):
+        with patch('src.miramind.llm.langgraph.chatbot._chatbot', None):
             chatbot1 = get_chatbot()
             chatbot2 = get_chatbot()
 
@@ -200,6 +210,43 @@ class TestChatbot:
             assert chatbot1 == mock_chatbot
             assert chatbot2 == mock_chatbot
 
+            # The legacy module attribute is built lazily through get_chatbot
+            from src.miramind.llm.langgraph import chatbot as chatbot_module
+
+            assert chatbot_module.chatbot == mock_chatbot
+            mock_main.assert_called_once()
+
+    @patch('src.miramind.llm.langgraph.chatbot.main')
+    def test_get_chatbot_concurrent_first_calls(self, mock_main):
+        """Test that concurrent first calls build the chatbot only once."""
+
+        def slow_main():
+            time.sleep(0.05)  # Long enough for the other threads to arrive
+            return Mock()
+
+        mock_main.side_effect = slow_main
+
+        with patch('src.miramind.llm.langgraph.chatbot._chatbot', None):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+                chatbots = list(pool.map(lambda _: get_chatbot(), range(8)))
+
+        mock_main.assert_called_once()
+        assert all(chatbot is chatbots[0] for chatbot in chatbots)
+
+    def test_import_does_not_initialize_chatbot(self):
+        """Test that importing the module creates no clients and compiles no graph."""
+        code = (
+            "import sys; sys.path.insert(0, 'src');"
+            "import miramind.llm.langgraph.chatbot as c;"
+            "assert c._chatbot is None and c.client is None;"
+            "assert 'sounddevice' not in sys.modules"
+        )
+        root = os.path.join(os.path.dirname(__file__), "..", "..")
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=root, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+
     def test_emotion_prompt_contains_required_elements(self):
         """Test that emotion prompt contains all required elements."""
         assert "neurodivergent children" in EMOTION_PROMPT
@@ -233,51 +280,114 @@ class TestChatbot:
         assert VALID_EMOTIONS == expected_emotions
 
     @patch('src.miramind.llm.langgraph.chatbot.call_openai')
-    def test_detect_emotion_preserves_state(self, mock_call_openai):
-        """Test that detect_emotion preserves and extends state properly."""
+    def test_detect_emotion_returns_delta(self, mock_call_openai):
+        """Test that detect_emotion returns only the keys it changes."""
         mock_call_openai.return_value = '{"emotion": "happy", "confidence": 0.8}'
 
         initial_state = {
             "user_input": "I love this!",
             "chat_history": [{"role": "assistant", "content": "Hello"}],
             "memory": "previous context",
-            "custom_field": "should be preserved",
         }
 
         result = detect_emotion(initial_state)
 
-        # Check that original state is preserved
-        assert result["memory"] == "previous context"
-        assert result["custom_field"] == "should be preserved"
-
-        # Check that new fields are added
+        assert set(result) == {"emotion", "emotion_confidence", "emotion_source", "chat_history"}
         assert result["emotion"] == "happy"
         assert result["emotion_confidence"] == 0.8
+        assert result["emotion_source"] == "llm"
+
+        # Only the new message; the chat_history reducer appends it
+        assert result["chat_history"] == [{"role": "user", "content": "I love this!"}]
+        assert initial_state["chat_history"] == [{"role": "assistant", "content": "Hello"}]
+
+    @patch('miramind.llm.langgraph.utils.call_openai')
+    def test_graph_extends_chat_history(self, mock_reply):
+        """Test that the graph appends this turn's messages to the caller's history."""
+        mock_reply.return_value = "Wow!"
+        classifier = Mock()
+        classifier.predict.return_value = ("excited", 0.99)
+        history = [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi there!"},
+        ]
+        state = {"user_input": "This is amazing!", "chat_history": history, "defer_tts": True}
+
+        with (
+            patch('src.miramind.llm.langgraph.chatbot.client', self.mock_client),
+            patch('src.miramind.llm.langgraph.chatbot.emotion_logger', self.mock_emotion_logger),
+            patch('src.miramind.llm.langgraph.chatbot.local_classifier', classifier),
+        ):
+            result = get_graph().invoke(state)
 
-        # Check that chat history is extended
-        assert len(result["chat_history"]) == 2
-        assert result["chat_history"][0]["role"] == "assistant"
-        assert result["chat_history"][1]["role"] == "user"
-        assert result["chat_history"][1]["content"] == "I love this!"
+        assert result["chat_history"] == history + [
+            {"role": "user", "content": "This is amazing!"},
+            {"role": "assistant", "content": "Wow!"},
+        ]
+        # The caller's list is not modified
+        assert len(history) == 2
 
     @patch('src.miramind.llm.langgraph.chatbot.call_openai')
-    def test_detect_emotion_with_existing_chat_history(self, mock_call_openai):
-        """Test emotion detection with existing chat history."""
-        mock_call_openai.return_value = '{"emotion": "excited", "confidence": 0.9}'
-
-        state_with_history = {
-            "user_input": "This is amazing!",
-            "chat_history": [
-                {"role": "user", "content": "Hello"},
-                {"role": "assistant", "content": "Hi there!"},
-            ],
-        }
+    def test_detect_emotion_local_fast_path(self, mock_call_openai):
+        """Test that a confident local prediction skips the LLM call."""
+        classifier = Mock()
+        classifier.predict.return_value = ("sad", 0.97)
+
+        with patch('src.miramind.llm.langgraph.chatbot.local_classifier', classifier):
+            result = detect_emotion(self.test_state)
+
+        mock_call_openai.assert_not_called()
+        classifier.metrics.record_local_answer.assert_called_once()
+        assert result["emotion"] == "sad"
+        assert result["emotion_confidence"] == 0.97
+        assert result["emotion_source"] == "local"
+        assert result["chat_history"][-1]["content"] == "I am feeling sad today"
+
+    @patch('src.miramind.llm.langgraph.chatbot.call_openai')
+    def test_detect_emotion_low_local_confidence_uses_llm(self, mock_call_openai):
+        """Test that an unsure local prediction falls back to the LLM and records agreement."""
+        mock_call_openai.return_value = '{"emotion": "sad", "confidence": 0.9}'
+        classifier = Mock()
+        classifier.predict.return_value = ("anxious", 0.4)
+
+        with patch('src.miramind.llm.langgraph.chatbot.local_classifier', classifier):
+            result = detect_emotion(self.test_state)
+
+        mock_call_openai.assert_called_once()
+        classifier.metrics.record_llm_answer.assert_called_once_with("anxious", "sad")
+        assert result["emotion"] == "sad"
+
+    def test_detect_emotion_uses_batcher(self):
+        """Test that detect_emotion goes through the batcher when batching is enabled."""
+        batcher = Mock()
+        batcher.classify.return_value = ("angry", 0.88)
+
+        with patch('src.miramind.llm.langgraph.chatbot.emotion_batcher', batcher):
+            result = detect_emotion(self.test_state)
 
-        result = detect_emotion(state_with_history)
+        batcher.classify.assert_called_once_with("I am feeling sad today", timeout=None)
+        assert result["emotion"] == "angry"
+        assert result["emotion_confidence"] == 0.88
 
-        # Should preserve existing history and add new message
-        assert len(result["chat_history"]) == 3
-        assert result["chat_history"][0]["content"] == "Hello"
-        assert result["chat_history"][1]["content"] == "Hi there!"
-        assert result["chat_history"][2]["content"] == "This is amazing!"
-        assert result["chat_history"][2]["role"] == "user"
+    def test_get_emotion_classifier_stats_without_classifier(self):
+        """Test that stats are empty when the local classifier is disabled."""
+        assert get_emotion_classifier_stats() == {}
+
+    def test_route_tts(self):
+        """Test that TTS is skipped for text-first (defer_tts) requests and empty replies."""
+        state = {**self.test_state, "response": "Hello!"}
+        assert route_tts(state) == "synthesize"
+        assert route_tts({**state, "defer_tts": True}) == "skip"
+        assert route_tts({**state, "response": ""}) == "skip"
+
+    def test_detect_emotion_batcher_deadline(self):
+        """Test that a batched classification missing the deadline falls back to neutral."""
+        batcher = Mock()
+        batcher.classify.side_effect = concurrent.futures.TimeoutError
+
+        with patch('src.miramind.llm.langgraph.chatbot.emotion_batcher', batcher):
+            result = detect_emotion({**self.test_state, "deadline": time.monotonic() + 0.5})
+
+        assert 0 < batcher.classify.call_args.kwargs["timeout"] <= 0.5
+        assert result["emotion"] == "neutral"
+        assert result["emotion_confidence"] == 0.0
@@ -0,0 +1,143 @@
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.context_builder import (
+    ContextBuilder,
+    context_builder,
+    count_tokens,
+    trim_history,
+)
+
+
+def _history(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message number {i}"}
+        for i in range(n)
+    ]
+
+
+class TestContextBuilder:
+    """Test suite for ContextBuilder."""
+
+    def test_count_tokens_positive(self):
+        """Test that token counts grow with text length."""
+        assert count_tokens("hi") >= 1
+        assert count_tokens("hello " * 50) > count_tokens("hello")
+
+    def test_all_history_fits_large_budget(self):
+        """Test that the whole history is kept when it fits."""
+        builder = ContextBuilder(token_budget=10_000)
+
+        messages = builder.build("system", _history(6), "current")
+
+        assert messages[0] == {"role": "system", "content": "system"}
+        assert messages[1:-1] == _history(6)
+        assert messages[-1] == {"role": "user", "content": "current"}
+
+    def test_budget_keeps_most_recent_turns(self):
+        """Test that only the newest messages fitting the budget are kept."""
+        builder = ContextBuilder()
+        history = _history(10)
+        fixed = builder.message_tokens({"role": "system", "content": "system"}) + (
+            builder.message_tokens({"role": "user", "content": "current"})
+        )
+        builder.token_budget = fixed + sum(builder.message_tokens(m) for m in history[-3:])
+
+        messages = builder.build("system", history, "current")
+
+        assert messages[1:-1] == history[-3:]
+
+    def test_max_history_caps_messages(self):
+        """Test that no more than max_history messages are kept, even within budget."""
+        builder = ContextBuilder(token_budget=10_000, max_history=4)
+
+        messages = builder.build("system", _history(10), "current")
+
+        assert messages[1:-1] == _history(10)[-4:]
+
+    def test_system_and_input_always_present(self):
+        """Test that a tiny budget still yields the system prompt and user input."""
+        messages = ContextBuilder(token_budget=1).build("system", _history(4), "current")
+
+        assert [m["role"] for m in messages] == ["system", "user"]
+
+    def test_memory_added_after_history(self):
+        """Test that memory goes into the turn instructions, keeping the system prompt static."""
+        messages = ContextBuilder().build(
+            "system", _history(2), "current", memory="Likes dinosaurs", instructions="Be kind."
+        )
+
+        assert messages[0] == {"role": "system", "content": "system"}
+        assert messages[1:3] == _history(2)
+        assert messages[-2]["role"] == "system"
+        assert messages[-2]["content"].startswith("Be kind.")
+        assert "Likes dinosaurs" in messages[-2]["content"]
+        assert messages[-1] == {"role": "user", "content": "current"}
+
+    def test_prefix_shared_across_instructions(self):
+        """Test that different per-turn instructions don't change the message prefix."""
+        builder = ContextBuilder(token_budget=10_000)
+
+        calm = builder.build("system", _history(4), "current", instructions="Be calm.")
+        cheerful = builder.build("system", _history(4), "current", instructions="Be cheerful.")
+
+        assert calm[:-2] == cheerful[:-2]
+        assert calm[-2] != cheerful[-2]
+
+    def test_trailing_current_input_not_duplicated(self):
+        """Test that history already ending with the current input does not repeat it."""
+        history = _history(2) + [{"role": "user", "content": "current"}]
+
+        messages = ContextBuilder().build("system", history, "current")
+
+        assert [m["content"] for m in messages].count("current") == 1
+
+    def test_frontend_type_field_normalized(self):
+        """Test that history entries using "type" instead of "role" are normalized."""
+        history = [{"type": "assistant", "content": "Hello!"}]
+
+        messages = ContextBuilder().build("system", history, "current")
+
+        assert messages[1] == {"role": "assistant", "content": "Hello!"}
+
+    def test_token_counts_cached(self):
+        """Test that each message is counted once across turns."""
+        builder = ContextBuilder(token_budget=10_000)
+        history = _history(8)
+
+        with patch(
+            "src.miramind.llm.langgraph.context_builder.count_tokens", return_value=3
+        ) as mock_count:
+            builder.build("system", history, "current")
+            first_calls = mock_count.call_count
+            builder.build("system", history + [{"role": "user", "content": "new"}], "next")
+
+        assert first_calls == 10  # system + user + 8 history messages
+        assert mock_count.call_count == first_calls + 2  # only "new" and "next"
+
+    def test_token_cache_bounded(self):
+        """Test that the token cache does not grow past its limit."""
+        builder = ContextBuilder(cache_size=5)
+
+        builder.build("system", _history(20), "current")
+
+        assert len(builder._token_cache) <= 5
+
+
+class TestTrimHistory:
+    """Test suite for trim_history."""
+
+    def test_trim_history_budget(self):
+        history = _history(10)
+        budget = sum(context_builder.message_tokens(m) for m in history[-2:])
+
+        assert trim_history(history, budget) == history[-2:]
+
+    def test_trim_history_skips_empty_messages(self):
+        history = [{"role": "user", "content": ""}, {"role": "user", "content": "hi"}]
+
+        assert trim_history(history) == [{"role": "user", "content": "hi"}]
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.emotion_batcher import EmotionBatcher
+
+
+def _reply_for(messages):
+    """Answer a batch prompt: 'sad' for messages containing 'sad', else 'happy'."""
+    items = json.loads(messages[1]["content"])
+    return json.dumps(
+        [
+            {
+                "id": item["id"],
+                "emotion": "sad" if "sad" in item["text"] else "happy",
+                "confidence": 0.9,
+            }
+            for item in items
+        ]
+    )
+
+
+class TestEmotionBatcher:
+    """Test suite for EmotionBatcher."""
+
+    @patch('src.miramind.llm.langgraph.emotion_batcher.call_openai')
+    def test_concurrent_requests_share_one_call(self, mock_call_openai):
+        """Test that concurrent callers are answered by a single batched request."""
+        mock_call_openai.side_effect = lambda client, messages, **kwargs: _reply_for(messages)
+        batcher = EmotionBatcher(Mock(), max_batch_size=8, max_wait_ms=200)
+        texts = ["I am sad", "yay", "so sad today", "hello"]
+        results = {}
+
+        def worker(text):
+            results[text] = batcher.classify(text, timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(text,)) for text in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_call_openai.call_count == 1
+        assert results["I am sad"] == ("sad", 0.9)
+        assert results["so sad today"] == ("sad", 0.9)
+        assert results["yay"] == ("happy", 0.9)
+        assert batcher.get_stats()["items_classified"] == 4
+
+    @patch('src.miramind.llm.langgraph.emotion_batcher.call_openai')
+    def test_max_batch_size_respected(self, mock_call_openai):
+        """Test that batches are split when more requests than max_batch_size arrive."""
+        mock_call_openai.side_effect = lambda client, messages, **kwargs: _reply_for(messages)
+        batcher = EmotionBatcher(Mock(), max_batch_size=2, max_wait_ms=200)
+
+        threads = [
+            threading.Thread(target=batcher.classify, args=(f"message {i}", 5)) for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for call in mock_call_openai.call_args_list:
+            assert len(json.loads(call[0][1][1]["content"])) <= 2
+        assert batcher.get_stats()["items_classified"] == 4
+
+    @patch('src.miramind.llm.langgraph.emotion_batcher.call_openai')
+    def test_failed_request_falls_back_to_neutral(self, mock_call_openai):
+        """Test that callers get the neutral fallback when the batch request fails."""
+        mock_call_openai.side_effect = Exception("API Error")
+        batcher = EmotionBatcher(Mock(), max_wait_ms=1)
+
+        assert batcher.classify("I am sad", timeout=5) == ("neutral", 0.0)
+
+    @patch('src.miramind.llm.langgraph.emotion_batcher.call_openai')
+    def test_missing_item_falls_back_to_neutral(self, mock_call_openai):
+        """Test that an item missing from the reply gets the neutral fallback."""
+        mock_call_openai.return_value = '{"results": []}'
+        batcher = EmotionBatcher(Mock(), max_wait_ms=1)
+
+        assert batcher.classify("hello", timeout=5) == ("neutral", 0.0)
@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.emotion_classifier import (
+    EMOTIONS,
+    ClassifierMetrics,
+    LocalEmotionClassifier,
+)
+
+
+class TestLocalEmotionClassifier:
+    """Test suite for LocalEmotionClassifier."""
+
+    def test_lexicon_only_prediction(self):
+        """Test that strong keywords are recognised without training."""
+        classifier = LocalEmotionClassifier()
+
+        emotion, confidence = classifier.predict("I feel so lonely and sad")
+
+        assert emotion == "sad"
+        assert confidence > 0.9
+
+    def test_negated_keyword_ignored(self):
+        """Test that negated keywords do not count as evidence."""
+        classifier = LocalEmotionClassifier()
+
+        emotion, confidence = classifier.predict("I am not happy")
+
+        assert emotion != "happy" or confidence < 0.5
+
+    def test_no_evidence_is_low_confidence(self):
+        """Test that text without any evidence is not confidently classified."""
+        classifier = LocalEmotionClassifier()
+
+        _, confidence = classifier.predict("tell me a story")
+
+        assert confidence < 0.5
+
+    def test_fit_learns_from_examples(self):
+        """Test that the hashed n-gram model learns labels absent from the lexicon."""
+        classifier = LocalEmotionClassifier().fit(
+            [
+                ("my tummy feels funny before school", "anxious"),
+                ("hi my name is adam", "neutral"),
+                ("hi im adam", "neutral"),
+            ]
+        )
+
+        assert classifier.predict("my tummy feels funny")[0] == "anxious"
+        assert classifier.predict("hi im adam") == pytest.approx(("neutral", 1.0), abs=0.2)
+
+    def test_from_log_skips_low_confidence_entries(self, tmp_path):
+        """Test training from an emotion log ignores fallback (0.0 confidence) labels."""
+        log_file = tmp_path / "emotion_log.json"
+        entries = [
+            {"input": "purple elephants", "emotion": "angry", "confidence": 0.0, "source": "llm"},
+            {"input": "hi im adam", "emotion": "neutral", "confidence": 0.9, "source": "llm"},
+        ]
+        log_file.write_text(json.dumps(entries))
+
+        classifier = LocalEmotionClassifier.from_log(str(log_file))
+
+        assert classifier.predict("purple elephants")[0] != "angry"
+        assert classifier.predict("hi im adam")[0] == "neutral"
+
+    def test_from_log_uses_only_llm_labels(self, tmp_path):
+        """Test that the classifier is not trained on its own (or unattributed) answers."""
+        log_file = tmp_path / "emotion_log.jsonl"
+        entries = [
+            {"input": "purple elephants", "emotion": "angry", "confidence": 0.9, "source": "local"},
+            {"input": "green giraffes", "emotion": "angry", "confidence": 0.9},
+            {"input": "hi im adam", "emotion": "neutral", "confidence": 0.9, "source": "llm"},
+        ]
+        log_file.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+        with patch.object(LocalEmotionClassifier, "fit", autospec=True) as fit:
+            LocalEmotionClassifier.from_log(str(log_file))
+
+        assert fit.call_args[0][1] == [("hi im adam", "neutral")]
+
+    def test_from_log_trains_on_legacy_log(self, tmp_path):
+        """Test that legacy JSON-array entries, which have no source, are LLM labels."""
+        legacy_file = tmp_path / "emotion_log.json"
+        entries = [
+            {
+                "input": "my tummy feels funny before school",
+                "emotion": "anxious",
+                "confidence": 0.9,
+            },
+            {"input": "hi im adam", "emotion": "neutral", "confidence": 0.9},
+        ]
+        legacy_file.write_text(json.dumps(entries))
+
+        classifier = LocalEmotionClassifier.from_log(
+            str(legacy_file), str(tmp_path / "emotion_log.jsonl")
+        )
+
+        assert classifier.predict("my tummy feels funny")[0] == "anxious"
+
+    def test_lexicon_counts_every_occurrence(self):
+        """Test that repeated cue words add up, and negated occurrences do not."""
+        hits = LocalEmotionClassifier._lexicon_hits("sad so sad not sad".split())
+
+        assert hits == {"sad": 2}
+
+    def test_from_log_missing_file(self, tmp_path):
+        """Test that a missing log yields a lexicon-only classifier."""
+        classifier = LocalEmotionClassifier.from_log(str(tmp_path / "missing.json"))
+
+        assert classifier.predict("I am scared of the monster")[0] == "scared"
+
+    def test_predict_returns_valid_label(self):
+        """Test that predictions are always one of the supported emotions."""
+        classifier = LocalEmotionClassifier()
+
+        for text in ["", "???", "I am angry and scared and happy"]:
+            emotion, confidence = classifier.predict(text)
+            assert emotion in EMOTIONS
+            assert 0.0 <= confidence <= 1.0
+
+
+class TestClassifierMetrics:
+    """Test suite for ClassifierMetrics."""
+
+    def test_metrics(self):
+        """Test avoided-call and agreement-rate accounting."""
+        metrics = ClassifierMetrics()
+        metrics.record_local_answer()
+        metrics.record_local_answer()
+        metrics.record_llm_answer("sad", "sad")
+        metrics.record_llm_answer("sad", "angry")
+
+        stats = metrics.get_stats()
+
+        assert stats["llm_calls_avoided"] == 2
+        assert stats["llm_calls"] == 2
+        assert stats["avoided_ratio"] == 0.5
+        assert stats["agreement_rate"] == 0.5
+
+    def test_empty_metrics(self):
+        """Test that empty metrics do not divide by zero."""
+        stats = ClassifierMetrics().get_stats()
+
+        assert stats["avoided_ratio"] == 0.0
+        assert stats["agreement_rate"] == 0.0
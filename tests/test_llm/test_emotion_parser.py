@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.emotion_parser import (
+    EMOTION_RESPONSE_FORMAT,
+    get_parse_stats,
+    parse_emotion,
+    parse_emotion_batch,
+    parse_stats,
+)
+
+
+class TestParseEmotion:
+    """Test suite for parse_emotion."""
+
+    def setup_method(self):
+        parse_stats.clear()
+
+    def test_parse_structured_reply(self):
+        """Test the fast path where the whole reply is the JSON object."""
+        assert parse_emotion('{"emotion": "sad", "confidence": 0.9}') == ("sad", 0.9)
+        assert get_parse_stats()["parsed"] == 1
+
+    def test_parse_reply_with_prose(self):
+        """Test that JSON surrounded by prose is still parsed."""
+        raw = 'Sure! {"emotion": "happy", "confidence": 0.75} Hope that helps {"x": 1}'
+        assert parse_emotion(raw) == ("happy", 0.75)
+
+    def test_missing_confidence_defaults_to_zero(self):
+        assert parse_emotion('{"emotion": "angry"}') == ("angry", 0.0)
+
+    @pytest.mark.parametrize(
+        "raw, reason",
+        [
+            ("", "empty"),
+            ("This is not valid JSON", "no_json"),
+            ('{"emotion": "sad", "confidence": ', "invalid_json"),
+            ('{"emotion": "bored", "confidence": 0.8}', "invalid_label"),
+            ('{"emotion": "sad", "confidence": "high"}', "invalid_label"),
+        ],
+    )
+    def test_failures_are_counted(self, raw, reason):
+        """Test that unusable replies return None and are counted by reason."""
+        assert parse_emotion(raw) is None
+
+        stats = get_parse_stats()
+        assert stats["failed"] == 1
+        assert stats["failures_by_reason"] == {reason: 1}
+        assert stats["failure_rate"] == 1.0
+
+    def test_response_format_lists_all_labels(self):
+        """Test that the structured-output schema restricts labels to valid emotions."""
+        schema = EMOTION_RESPONSE_FORMAT["json_schema"]["schema"]
+        assert set(schema["properties"]["emotion"]["enum"]) == {
+            "happy",
+            "sad",
+            "angry",
+            "scared",
+            "excited",
+            "embarrassed",
+            "anxious",
+            "neutral",
+        }
+
+
+class TestParseEmotionBatch:
+    """Test suite for parse_emotion_batch."""
+
+    def setup_method(self):
+        parse_stats.clear()
+
+    def test_parse_structured_batch(self):
+        raw = '{"results": [{"id": 0, "emotion": "sad", "confidence": 0.8}, {"id": 1, "emotion": "angry", "confidence": 0.6}]}'
+        assert parse_emotion_batch(raw) == {0: ("sad", 0.8), 1: ("angry", 0.6)}
+
+    def test_parse_bare_array_with_prose(self):
+        raw = 'Here you go: [{"id": 0, "emotion": "happy", "confidence": 0.7}] done'
+        assert parse_emotion_batch(raw) == {0: ("happy", 0.7)}
+
+    def test_invalid_items_skipped_and_counted(self):
+        raw = '[{"id": 0, "emotion": "bored"}, "junk", {"emotion": "sad"}, {"id": 3, "emotion": "sad"}]'
+
+        assert parse_emotion_batch(raw) == {3: ("sad", 0.0)}
+        assert get_parse_stats()["failures_by_reason"] == {"invalid_label": 3}
+
+    @pytest.mark.parametrize("raw", ["", "no json here", "[not json]", '{"results": 5}'])
+    def test_malformed_batch(self, raw):
+        assert parse_emotion_batch(raw) == {}
+        assert get_parse_stats()["failed"] == 1
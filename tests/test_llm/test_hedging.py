@@ -0,0 +1,222 @@
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.hedging import (
+    DeadlineExceeded,
+    HedgedCaller,
+    LatencyTracker,
+)
+
+
+class TransientError(Exception):
+    pass
+
+
+def _warm(caller: HedgedCaller, seconds: float = 0.01, samples: int = 5):
+    for _ in range(samples):
+        caller.latency.record(seconds)
+
+
+class TestLatencyTracker:
+    """Test suite for LatencyTracker."""
+
+    def test_percentile_needs_min_samples(self):
+        """Test that no percentile is given before enough latencies are recorded."""
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(0.1)
+        tracker.record(0.2)
+        assert tracker.percentile(0.95) is None
+
+        tracker.record(0.3)
+        assert tracker.percentile(0.95) == 0.3
+        assert tracker.percentile(0.5) == 0.2
+
+
+class TestHedgedCaller:
+    """Test suite for HedgedCaller."""
+
+    def test_runs_inline_without_latency_history(self):
+        """Test that the first calls run in the caller's thread with the full timeout."""
+        caller = HedgedCaller(min_samples=5)
+        seen = []
+
+        def attempt(timeout):
+            seen.append((timeout, threading.current_thread()))
+            return "ok"
+
+        assert caller.call(attempt, timeout=7.0) == "ok"
+        assert seen == [(7.0, threading.current_thread())]
+        assert caller.get_stats()["hedged"] == 0
+
+    def test_timeout_capped_by_deadline(self):
+        """Test that an attempt never waits past the request deadline."""
+        caller = HedgedCaller(min_samples=5)
+        timeouts = []
+
+        caller.call(lambda timeout: timeouts.append(timeout), deadline=time.monotonic() + 1.0)
+
+        assert 0 < timeouts[0] <= 1.0
+
+    def test_hedge_wins_over_slow_attempt(self):
+        """Test that a slow first attempt is hedged and the faster duplicate wins."""
+        caller = HedgedCaller(min_samples=5)
+        _warm(caller)
+        release = threading.Event()
+        calls = []
+
+        def attempt(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                release.wait(2.0)  # The first attempt hangs
+                return "slow"
+            return "fast"
+
+        start = time.monotonic()
+        assert caller.call(attempt, deadline=time.monotonic() + 2.0) == "fast"
+        assert time.monotonic() - start < 1.0
+        release.set()
+
+        stats = caller.get_stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["hedge_rate"] == 1.0
+
+    def test_no_hedge_when_fast(self):
+        """Test that attempts faster than the hedge delay are not duplicated."""
+        caller = HedgedCaller(min_samples=5)
+        _warm(caller, seconds=0.5)
+
+        assert caller.call(lambda timeout: "ok") == "ok"
+        assert caller.get_stats()["hedged"] == 0
+
+    def test_latency_tracked_per_key(self):
+        """Test that each key's hedge delay follows its own latencies."""
+        caller = HedgedCaller(min_samples=5)
+        _warm(caller)
+        for _ in range(5):
+            caller.latency_for("slow_flow").record(2.0)
+        calls = []
+
+        # "fast_flow" has no history of its own, so it is not hedged after the others' latency
+        assert caller.call(lambda timeout: calls.append(timeout) or "ok", key="fast_flow") == "ok"
+
+        stats = caller.get_stats()
+        assert stats["hedge_delay_ms"] == 10.0
+        assert stats["hedge_delay_ms_by_key"] == {"slow_flow": 2000.0, "fast_flow": None}
+        assert stats["hedged"] == 0
+
+    def test_queued_attempt_not_hedged(self):
+        """Test that time spent waiting for a free worker does not trigger a hedge."""
+        caller = HedgedCaller(min_samples=5, max_workers=1)
+        _warm(caller, seconds=0.05)
+        busy = caller._pool.submit(time.sleep, 0.3)  # Keeps the only worker busy
+        timeouts = []
+
+        result = caller.call(
+            lambda timeout: timeouts.append(timeout) or "ok", deadline=time.monotonic() + 2.0
+        )
+
+        assert result == "ok"
+        assert busy.done()
+        assert caller.get_stats()["hedged"] == 0
+        assert 1.0 < timeouts[0] <= 1.7  # Capped by the deadline when the attempt started
+
+    def test_queue_depth(self):
+        """Test that attempts waiting for a worker are counted until one starts them."""
+        caller = HedgedCaller(min_samples=5, max_workers=1)
+        _warm(caller, seconds=0.5)
+        release = threading.Event()
+        caller._pool.submit(release.wait, 2.0)  # Keeps the only worker busy
+        thread = threading.Thread(target=caller.call, args=(lambda timeout: "ok",))
+        thread.start()
+
+        for _ in range(100):
+            if caller.get_stats()["queue_depth"] == 1:
+                break
+            time.sleep(0.01)
+        assert caller.get_stats()["queue_depth"] == 1
+
+        release.set()
+        thread.join(2.0)
+        assert caller.get_stats()["queue_depth"] == 0
+
+    def test_hedging_disabled(self):
+        """Test that hedge_percentile=None never sends duplicates."""
+        caller = HedgedCaller(hedge_percentile=None, min_samples=1)
+        _warm(caller)
+        assert caller.call(lambda timeout: "ok") == "ok"
+        assert caller.get_stats()["hedge_delay_ms"] is None
+
+    def test_deadline_exceeded(self):
+        """Test that waiting stops at the deadline."""
+        caller = HedgedCaller(min_samples=5)
+        _warm(caller)
+        release = threading.Event()
+
+        with pytest.raises(DeadlineExceeded):
+            caller.call(lambda timeout: release.wait(2.0), deadline=time.monotonic() + 0.1)
+        release.set()
+
+        assert caller.get_stats()["deadline_exceeded"] == 1
+
+    def test_expired_deadline_sends_nothing(self):
+        """Test that no request is sent once the deadline has passed."""
+        caller = HedgedCaller()
+        calls = []
+
+        with pytest.raises(DeadlineExceeded):
+            caller.call(calls.append, deadline=time.monotonic() - 1)
+        assert calls == []
+
+    @patch('src.miramind.llm.langgraph.hedging.time.sleep')
+    def test_retries_transient_errors(self, mock_sleep):
+        """Test that retryable errors are retried with jittered backoff."""
+        caller = HedgedCaller(retryable=(TransientError,), max_retries=2, backoff_base=0.1)
+        results = [TransientError(), TransientError(), "ok"]
+
+        def attempt(timeout):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        assert caller.call(attempt) == "ok"
+        assert mock_sleep.call_count == 2
+        assert 0 <= mock_sleep.call_args_list[0][0][0] <= 0.1
+        assert 0 <= mock_sleep.call_args_list[1][0][0] <= 0.2
+        assert caller.get_stats()["retries"] == 2
+
+    @patch('src.miramind.llm.langgraph.hedging.time.sleep')
+    def test_no_retry_without_budget(self, mock_sleep):
+        """Test that no retry is attempted when the deadline leaves no time for one."""
+        caller = HedgedCaller(retryable=(TransientError,), min_samples=1)
+        caller.latency.record(5.0)  # A typical attempt takes longer than the time left
+
+        def attempt(timeout):
+            raise TransientError()
+
+        with pytest.raises(TransientError):
+            caller.call(attempt, deadline=time.monotonic() + 1.0)
+        mock_sleep.assert_not_called()
+        assert caller.get_stats()["failures"] == 1
+
+    def test_non_retryable_error_raised(self):
+        """Test that other errors are raised immediately."""
+        caller = HedgedCaller(retryable=(TransientError,))
+        calls = []
+
+        def attempt(timeout):
+            calls.append(timeout)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            caller.call(attempt)
+        assert len(calls) == 1
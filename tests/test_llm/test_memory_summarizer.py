@@ -0,0 +1,105 @@
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.llm.langgraph.memory_summarizer import MemorySummarizer
+
+
+class InlineExecutor:
+    """Executor running submitted work immediately, so tests are deterministic."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fn(*args)
+
+
+class TestMemorySummarizer:
+    """Test suite for MemorySummarizer."""
+
+    def _summarizer(self, **kwargs):
+        executor = InlineExecutor()
+        params = {"every_n_turns": 2, "max_chars": 50, "executor": executor}
+        params.update(kwargs)
+        return MemorySummarizer(Mock(), **params), executor
+
+    @patch('src.miramind.llm.langgraph.memory_summarizer.call_openai')
+    def test_summarizes_every_n_turns(self, mock_call_openai):
+        """Test that a summary is scheduled only once N turns are collected."""
+        mock_call_openai.return_value = "Likes dinosaurs."
+        summarizer, executor = self._summarizer()
+
+        summarizer.record_turn("s1", "I like dinosaurs", "Cool!")
+        assert executor.submitted == 0
+        assert summarizer.get_memory("s1") == ""
+
+        summarizer.record_turn("s1", "T-rex is best", "It is huge!")
+        assert executor.submitted == 1
+        assert summarizer.get_memory("s1") == "Likes dinosaurs."
+
+        prompt = mock_call_openai.call_args[0][1][1]["content"]
+        assert "I like dinosaurs" in prompt and "T-rex is best" in prompt
+
+    @patch('src.miramind.llm.langgraph.memory_summarizer.call_openai')
+    def test_previous_memory_is_merged(self, mock_call_openai):
+        """Test that the current memory is sent with the new turns."""
+        mock_call_openai.side_effect = ["first", "second"]
+        summarizer, _ = self._summarizer()
+
+        for turn in range(4):
+            summarizer.record_turn("s1", f"message {turn}", "reply")
+
+        assert "Current memory: first" in mock_call_openai.call_args[0][1][1]["content"]
+        assert summarizer.get_memory("s1") == "second"
+
+    @patch('src.miramind.llm.langgraph.memory_summarizer.call_openai')
+    def test_memory_is_bounded(self, mock_call_openai):
+        """Test that memory never exceeds max_chars."""
+        mock_call_openai.return_value = "x" * 500
+        summarizer, _ = self._summarizer(max_chars=50)
+
+        for turn in range(10):
+            summarizer.record_turn("s1", "a long message " * 20, "a long reply " * 20)
+
+        assert len(summarizer.get_memory("s1")) == 50
+
+    @patch('src.miramind.llm.langgraph.memory_summarizer.call_openai')
+    def test_failed_summary_keeps_turns(self, mock_call_openai):
+        """Test that turns of a failed summary are retried with the next batch."""
+        mock_call_openai.side_effect = [Exception("API down"), "recovered"]
+        summarizer, _ = self._summarizer()
+
+        summarizer.record_turn("s1", "turn one", "reply")
+        summarizer.record_turn("s1", "turn two", "reply")
+        assert summarizer.get_memory("s1") == ""
+
+        summarizer.record_turn("s1", "turn three", "reply")
+        prompt = mock_call_openai.call_args[0][1][1]["content"]
+        assert "turn one" in prompt and "turn three" in prompt
+        assert summarizer.get_memory("s1") == "recovered"
+
+    def test_sessions_are_isolated_and_seeded(self):
+        """Test that memory is per session and seeded from the client value."""
+        summarizer, _ = self._summarizer()
+
+        assert summarizer.get_memory("s1", "Name is Ala.") == "Name is Ala."
+        assert summarizer.get_memory("s2") == ""
+        # The seed is only used for a new session
+        assert summarizer.get_memory("s1", "other") == "Name is Ala."
+
+    def test_least_recently_used_sessions_are_dropped(self):
+        """Test that at most max_sessions sessions are kept."""
+        summarizer, _ = self._summarizer(max_sessions=2)
+
+        summarizer.get_memory("s1", "one")
+        summarizer.get_memory("s2", "two")
+        summarizer.get_memory("s1")
+        summarizer.get_memory("s3", "three")
+
+        assert summarizer.get_memory("s1") == "one"
+        assert summarizer.get_memory("s2") == ""
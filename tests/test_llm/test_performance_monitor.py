@@ -2,7 +2,7 @@ import os
 import sys
 import threading
 import time
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import Mock, patch
 
 import pytest
 
@@ -16,6 +16,10 @@ from src.miramind.llm.langgraph.performance_monitor import (
 )
 
 
+def _rss(mb: float):
+    return Mock(rss=mb * 1024 * 1024)
+
+
 class TestPerformanceMonitor:
     """Test suite for PerformanceMonitor class."""
 
@@ -25,89 +29,54 @@ class TestPerformanceMonitor:
 
     def test_performance_monitor_initialization(self):
         """Test PerformanceMonitor initialization."""
-        assert self.monitor.metrics == {}
-        assert self.monitor.start_times == {}
+        assert self.monitor.get_stats() == {}
+        assert self.monitor.track_memory is False
         assert self.monitor.lock is not None
 
-    @patch('time.time')
-    @patch('psutil.Process')
-    def test_track_operation_context_manager(self, mock_process, mock_time):
+    @patch('time.perf_counter_ns')
+    def test_track_operation_context_manager(self, mock_perf_counter):
         """Test track_operation context manager."""
-        # Mock time progression
-        mock_time.side_effect = [1000.0, 1001.5]  # 1.5 second duration
-
-        # Mock memory usage
-        mock_memory_info = Mock()
-        mock_memory_info.rss = 50 * 1024 * 1024  # 50MB start, 55MB end
-        mock_process.return_value.memory_info.side_effect = [
-            mock_memory_info,
-            type('MockMemoryInfo', (), {'rss': 55 * 1024 * 1024})(),
-        ]
-
-        # Track an operation
+        mock_perf_counter.side_effect = [1_000_000_000, 2_500_000_000]  # 1.5 second duration
+
         with self.monitor.track_operation("test_operation"):
             pass
 
-        # Check metrics were recorded
-        assert "test_operation" in self.monitor.metrics
-        assert len(self.monitor.metrics["test_operation"]) == 1
-
-        metric = self.monitor.metrics["test_operation"][0]
-        assert metric["duration"] == 1.5
-        assert metric["memory_delta"] == 5.0  # 5MB increase
-        assert metric["timestamp"] == 1000.0
+        stats = self.monitor.get_stats("test_operation")
+        assert stats["count"] == 1
+        assert stats["avg_duration"] == 1.5
+        assert "avg_memory_delta" not in stats
 
-    @patch('time.time')
     @patch('psutil.Process')
-    def test_track_operation_multiple_calls(self, mock_process, mock_time):
-        """Test tracking multiple operations."""
-        # Mock time progression for multiple operations
-        mock_time.side_effect = [1000.0, 1001.0, 1002.0, 1003.0]  # Two 1-second operations
+    def test_memory_not_sampled_by_default(self, mock_process):
+        """Test that no RSS syscalls are made unless memory tracking is enabled."""
+        with self.monitor.track_operation("test_op"):
+            pass
 
-        # Mock memory usage
-        mock_memory_info = Mock()
-        mock_memory_info.rss = 50 * 1024 * 1024
-        mock_process.return_value.memory_info.return_value = mock_memory_info
+        mock_process.assert_not_called()
 
-        # Track two operations
+    def test_track_operation_multiple_calls(self):
+        """Test tracking multiple operations."""
         with self.monitor.track_operation("test_op"):
             pass
 
         with self.monitor.track_operation("test_op"):
             pass
 
-        # Check both operations were recorded
-        assert len(self.monitor.metrics["test_op"]) == 2
-        assert self.monitor.metrics["test_op"][0]["duration"] == 1.0
-        assert self.monitor.metrics["test_op"][1]["duration"] == 1.0
+        assert self.monitor.count("test_op") == 2
 
-    @patch('time.time')
-    @patch('psutil.Process')
-    def test_track_operation_with_exception(self, mock_process, mock_time):
+    def test_track_operation_with_exception(self):
         """Test tracking operation when exception occurs."""
-        mock_time.side_effect = [1000.0, 1001.0]
-
-        mock_memory_info = Mock()
-        mock_memory_info.rss = 50 * 1024 * 1024
-        mock_process.return_value.memory_info.return_value = mock_memory_info
-
-        # Track operation that raises exception
         with pytest.raises(ValueError):
             with self.monitor.track_operation("error_operation"):
                 raise ValueError("Test error")
 
         # Metrics should still be recorded
-        assert "error_operation" in self.monitor.metrics
-        assert len(self.monitor.metrics["error_operation"]) == 1
+        assert self.monitor.count("error_operation") == 1
 
     def test_get_stats_single_operation(self):
         """Test get_stats for a single operation."""
-        # Manually add some test data
-        self.monitor.metrics["test_op"] = [
-            {"duration": 1.0, "memory_delta": 2.0, "timestamp": 1000.0},
-            {"duration": 2.0, "memory_delta": 3.0, "timestamp": 1001.0},
-            {"duration": 3.0, "memory_delta": 1.0, "timestamp": 1002.0},
-        ]
+        for duration in (1.0, 2.0, 3.0):
+            self.monitor.record("test_op", duration)
 
         stats = self.monitor.get_stats("test_op")
 
@@ -118,6 +87,34 @@ class TestPerformanceMonitor:
         assert stats["max_duration"] == 3.0
         assert stats["total_duration"] == 6.0
 
+    def test_percentiles(self):
+        """Test that p50/p90/p99/p999 are within the histogram's relative error."""
+        for ms in range(1, 1001):
+            self.monitor.record("test_op", ms / 1000)
+
+        stats = self.monitor.get_stats("test_op")
+
+        for key, expected in (
+            ("p50_duration", 0.5),
+            ("p90_duration", 0.9),
+            ("p99_duration", 0.99),
+            ("p999_duration", 0.999),
+        ):
+            assert stats[key] == pytest.approx(expected, rel=0.035)
+        assert stats["p999_duration"] <= stats["max_duration"] == 1.0
+
+    def test_memory_does_not_grow_with_samples(self):
+        """Test that samples go into fixed-size histograms instead of a growing list."""
+        self.monitor.record("test_op", 0.01)
+        histogram = self.monitor.histogram("test_op")
+        size = len(histogram.counts)
+
+        for _ in range(10_000):
+            self.monitor.record("test_op", 0.01)
+
+        assert len(self.monitor.histogram("test_op").counts) == size
+        assert self.monitor.count("test_op") == 10_001
+
     def test_get_stats_nonexistent_operation(self):
         """Test get_stats for non-existent operation."""
         stats = self.monitor.get_stats("nonexistent")
@@ -125,9 +122,8 @@ class TestPerformanceMonitor:
 
     def test_get_stats_all_operations(self):
         """Test get_stats for all operations."""
-        # Add test data for multiple operations
-        self.monitor.metrics["op1"] = [{"duration": 1.0, "memory_delta": 1.0, "timestamp": 1000.0}]
-        self.monitor.metrics["op2"] = [{"duration": 2.0, "memory_delta": 2.0, "timestamp": 1001.0}]
+        self.monitor.record("op1", 1.0)
+        self.monitor.record("op2", 2.0)
 
         stats = self.monitor.get_stats()
 
@@ -139,10 +135,7 @@ class TestPerformanceMonitor:
     @patch('builtins.print')
     def test_print_stats(self, mock_print):
         """Test print_stats method."""
-        # Add test data
-        self.monitor.metrics["test_op"] = [
-            {"duration": 1.5, "memory_delta": 2.0, "timestamp": 1000.0}
-        ]
+        self.monitor.record("test_op", 1.5)
 
         self.monitor.print_stats()
 
@@ -155,19 +148,19 @@ class TestPerformanceMonitor:
         assert any("TEST_OP:" in call for call in print_calls)
         assert any("Count: 1" in call for call in print_calls)
         assert any("1.500s" in call for call in print_calls)
+        assert any("p50/p90/p99/p999" in call for call in print_calls)
 
     def test_clear_stats(self):
         """Test clear_stats method."""
-        # Add test data
-        self.monitor.metrics["test_op"] = [
-            {"duration": 1.0, "memory_delta": 1.0, "timestamp": 1000.0}
-        ]
-
-        assert len(self.monitor.metrics) == 1
+        self.monitor.record("test_op", 1.0)
+        assert len(self.monitor.get_stats()) == 1
 
         self.monitor.clear_stats()
+        assert self.monitor.get_stats() == {}
 
-        assert len(self.monitor.metrics) == 0
+        # The thread's buffers start over after a clear
+        self.monitor.record("test_op", 2.0)
+        assert self.monitor.get_stats("test_op")["count"] == 1
 
     def test_thread_safety(self):
         """Test thread safety of the performance monitor."""
@@ -194,8 +187,44 @@ class TestPerformanceMonitor:
 
         # Check that all worker operations were recorded
         for i in range(5):
-            assert f"worker_{i}" in self.monitor.metrics
-            assert len(self.monitor.metrics[f"worker_{i}"]) == 1
+            assert self.monitor.count(f"worker_{i}") == 1
+            assert self.monitor.get_stats(f"worker_{i}")["min_duration"] >= 0.01
+
+    def test_threads_merged_per_operation(self):
+        """Test that samples recorded by different threads are merged in the stats."""
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for _ in range(250):
+                self.monitor.record("shared_op", 0.002)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.monitor.get_stats("shared_op")
+        assert stats["count"] == 1000
+        assert stats["total_duration"] == pytest.approx(2.0)
+
+    def test_counters(self):
+        """Test that counters incremented from several threads are summed."""
+
+        def worker():
+            self.monitor.increment("cache.hits")
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.monitor.increment("cache.misses", 2)
+
+        assert self.monitor.get_counters() == {"cache.hits": 3, "cache.misses": 2}
+        self.monitor.clear_stats()
+        assert self.monitor.get_counters() == {}
 
     def test_get_performance_monitor_singleton(self):
         """Test get_performance_monitor returns singleton instance."""
@@ -205,47 +234,42 @@ class TestPerformanceMonitor:
         assert monitor1 is monitor2
         assert monitor1 is performance_monitor
 
-    @patch('time.time')
     @patch('psutil.Process')
-    def test_memory_calculation(self, mock_process, mock_time):
+    def test_memory_calculation(self, mock_process):
         """Test memory delta calculation."""
-        mock_time.side_effect = [1000.0, 1001.0]
-
-        # Mock memory info with different values
-        start_memory = Mock()
-        start_memory.rss = 100 * 1024 * 1024  # 100MB
+        monitor = PerformanceMonitor(track_memory=True)
+        mock_process.return_value.memory_info.side_effect = [_rss(100), _rss(120)]
 
-        end_memory = Mock()
-        end_memory.rss = 120 * 1024 * 1024  # 120MB
-
-        mock_process.return_value.memory_info.side_effect = [start_memory, end_memory]
-
-        with self.monitor.track_operation("memory_test"):
+        with monitor.track_operation("memory_test"):
             pass
 
-        metric = self.monitor.metrics["memory_test"][0]
-        assert metric["memory_delta"] == 20.0  # 20MB increase
+        stats = monitor.get_stats("memory_test")
+        assert stats["avg_memory_delta"] == 20.0  # 20MB increase
+        assert stats["max_memory_delta"] == 20.0
 
-    @patch('time.time')
     @patch('psutil.Process')
-    def test_negative_memory_delta(self, mock_process, mock_time):
+    def test_negative_memory_delta(self, mock_process):
         """Test handling of negative memory delta."""
-        mock_time.side_effect = [1000.0, 1001.0]
+        monitor = PerformanceMonitor(track_memory=True)
+        mock_process.return_value.memory_info.side_effect = [_rss(100), _rss(80)]
 
-        # Mock memory decrease
-        start_memory = Mock()
-        start_memory.rss = 100 * 1024 * 1024  # 100MB
+        with monitor.track_operation("memory_decrease"):
+            pass
 
-        end_memory = Mock()
-        end_memory.rss = 80 * 1024 * 1024  # 80MB
+        assert monitor.get_stats("memory_decrease")["min_memory_delta"] == -20.0  # 20MB decrease
 
-        mock_process.return_value.memory_info.side_effect = [start_memory, end_memory]
+    @patch('psutil.Process')
+    def test_process_cached(self, mock_process):
+        """Test that the psutil Process is created once, not per sample."""
+        monitor = PerformanceMonitor(track_memory=True)
+        mock_process.return_value.memory_info.return_value = _rss(50)
 
-        with self.monitor.track_operation("memory_decrease"):
-            pass
+        for _ in range(3):
+            with monitor.track_operation("test_op"):
+                pass
 
-        metric = self.monitor.metrics["memory_decrease"][0]
-        assert metric["memory_delta"] == -20.0  # 20MB decrease
+        assert mock_process.call_count == 1
+        assert mock_process.return_value.memory_info.call_count == 6
 
     def test_stats_with_empty_metrics(self):
         """Test stats calculation with empty metrics."""
@@ -267,13 +291,8 @@ class TestPerformanceMonitor:
 
     def test_multiple_operations_different_names(self):
         """Test tracking multiple operations with different names."""
-        # Manually add test data
-        self.monitor.metrics["fast_op"] = [
-            {"duration": 0.1, "memory_delta": 1.0, "timestamp": 1000.0}
-        ]
-        self.monitor.metrics["slow_op"] = [
-            {"duration": 2.0, "memory_delta": 5.0, "timestamp": 1001.0}
-        ]
+        self.monitor.record("fast_op", 0.1, memory_delta=1.0)
+        self.monitor.record("slow_op", 2.0, memory_delta=5.0)
 
         fast_stats = self.monitor.get_stats("fast_op")
         slow_stats = self.monitor.get_stats("slow_op")
@@ -282,3 +301,4 @@ class TestPerformanceMonitor:
         assert slow_stats["avg_duration"] == 2.0
         assert fast_stats["count"] == 1
         assert slow_stats["count"] == 1
+        assert slow_stats["avg_memory_delta"] == 5.0
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import json
 import os
@@ -15,6 +16,7 @@ from src.miramind.llm.langgraph.run_chat import (
     executor,
     perf_monitor,
     process_chat_message,
+    process_chat_message_async,
     response_cache,
 )
 
@@ -323,3 +325,64 @@ class TestRunChat:
         # Different inputs should produce different keys
         key3 = _hash_input("Different input")
         assert key1 != key3
+
+
+class TestProcessChatMessageAsync:
+    """Test suite for process_chat_message_async."""
+
+    def setup_method(self):
+        response_cache.clear()
+
+    def teardown_method(self):
+        response_cache.clear()
+
+    def _chatbot(self, calls):
+        async def ainvoke(state):
+            calls.append(state["user_input"])
+            await asyncio.sleep(0.05)
+            return {**state, "response": f"Reply to {state['user_input']}", "emotion": "happy"}
+
+        chatbot = Mock()
+        chatbot.ainvoke = ainvoke
+        return chatbot
+
+    @patch('src.miramind.llm.langgraph.run_chat.get_memory_summarizer', return_value=None)
+    def test_identical_concurrent_messages_share_one_run(self, _):
+        """Test that the same message sent concurrently runs the chatbot once."""
+        calls = []
+
+        async def burst():
+            return await asyncio.gather(
+                *(process_chat_message_async("Hello!", defer_audio=True) for _ in range(3)),
+                process_chat_message_async("Goodbye", defer_audio=True),
+            )
+
+        with patch(
+            'src.miramind.llm.langgraph.run_chat.get_chatbot', return_value=self._chatbot(calls)
+        ):
+            results = asyncio.run(burst())
+
+        assert sorted(calls) == ["Goodbye", "Hello!"]
+        assert [r["response_text"] for r in results] == ["Reply to Hello!"] * 3 + [
+            "Reply to Goodbye"
+        ]
+
+    @patch('src.miramind.llm.langgraph.run_chat.get_memory_summarizer', return_value=None)
+    def test_different_conversations_not_coalesced(self, _):
+        """Test that the same message from sessions with different context runs apart."""
+        calls = []
+        history = [{"role": "user", "content": "My name is Sam"}]
+
+        async def burst():
+            return await asyncio.gather(
+                process_chat_message_async("Hello!", defer_audio=True),
+                process_chat_message_async("Hello!", history, defer_audio=True),
+                process_chat_message_async("Hello!", memory="Likes dogs", defer_audio=True),
+            )
+
+        with patch(
+            'src.miramind.llm.langgraph.run_chat.get_chatbot', return_value=self._chatbot(calls)
+        ):
+            asyncio.run(burst())
+
+        assert len(calls) == 3
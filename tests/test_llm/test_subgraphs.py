@@ -8,11 +8,15 @@ import pytest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
 from src.miramind.llm.langgraph.subgraphs import (
+    GREETINGS,
+    SAD_FOLLOW_UP,
     build_angry_flow,
     build_excited_flow,
     build_gentle_flow,
     build_neutral_flow,
     build_sad_flow,
+    fixed_phrases,
+    follow_up,
 )
 
 
@@ -22,7 +26,6 @@ class TestSubgraphs:
     def setup_method(self):
         """Setup test fixtures."""
         self.mock_client = Mock()
-        self.mock_tts_provider = Mock()
         self.mock_emotion_logger = Mock()
 
         self.test_state = {
@@ -38,15 +41,15 @@ class TestSubgraphs:
         mock_responder = Mock()
         mock_generate_response.return_value = mock_responder
 
-        graph = build_sad_flow(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+        graph = build_sad_flow(self.mock_client, self.mock_emotion_logger)
 
         # Verify graph structure
         assert graph is not None
         mock_generate_response.assert_called_once_with(
             "supportive and caring",
             self.mock_client,
-            self.mock_tts_provider,
             self.mock_emotion_logger,
+            flow="sad_flow",
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -55,12 +58,12 @@ class TestSubgraphs:
         mock_responder = Mock()
         mock_generate_response.return_value = mock_responder
 
-        graph = build_angry_flow(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+        graph = build_angry_flow(self.mock_client, self.mock_emotion_logger)
 
         # Verify graph structure
         assert graph is not None
         mock_generate_response.assert_called_once_with(
-            "calm and soothing", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
+            "calm and soothing", self.mock_client, self.mock_emotion_logger, flow="angry_flow"
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -69,17 +72,15 @@ class TestSubgraphs:
         mock_responder = Mock()
         mock_generate_response.return_value = mock_responder
 
-        graph = build_excited_flow(
-            self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        graph = build_excited_flow(self.mock_client, self.mock_emotion_logger)
 
         # Verify graph structure
         assert graph is not None
         mock_generate_response.assert_called_once_with(
             "enthusiastic and cheerful",
             self.mock_client,
-            self.mock_tts_provider,
             self.mock_emotion_logger,
+            flow="excited_flow",
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -88,17 +89,15 @@ class TestSubgraphs:
         mock_responder = Mock()
         mock_generate_response.return_value = mock_responder
 
-        graph = build_gentle_flow(
-            self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        graph = build_gentle_flow(self.mock_client, self.mock_emotion_logger)
 
         # Verify graph structure
         assert graph is not None
         mock_generate_response.assert_called_once_with(
             "gentle and reassuring",
             self.mock_client,
-            self.mock_tts_provider,
             self.mock_emotion_logger,
+            flow="gentle_flow",
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -107,17 +106,15 @@ class TestSubgraphs:
         mock_responder = Mock()
         mock_generate_response.return_value = mock_responder
 
-        graph = build_neutral_flow(
-            self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        graph = build_neutral_flow(self.mock_client, self.mock_emotion_logger)
 
         # Verify graph structure
         assert graph is not None
         mock_generate_response.assert_called_once_with(
             "neutral and friendly",
             self.mock_client,
-            self.mock_tts_provider,
             self.mock_emotion_logger,
+            flow="neutral_flow",
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -138,7 +135,7 @@ class TestSubgraphs:
 
         mock_generate_response.return_value = mock_response_func
 
-        graph = build_sad_flow(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+        graph = build_sad_flow(self.mock_client, self.mock_emotion_logger)
         compiled_graph = graph.compile()
 
         # Execute the graph
@@ -166,7 +163,7 @@ class TestSubgraphs:
         ]
 
         for builder in flow_builders:
-            graph = builder(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+            graph = builder(self.mock_client, self.mock_emotion_logger)
             compiled_graph = graph.compile()
 
             # Should be able to invoke without errors
@@ -175,10 +172,13 @@ class TestSubgraphs:
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
     def test_flow_state_preservation(self, mock_generate_response):
-        """Test that flows preserve input state."""
+        """Test that flows merge the node's delta into the input state."""
 
         def mock_response_func(state):
-            return {**state, "response": "Test response", "new_field": "added by flow"}
+            return {
+                "response": "Test response",
+                "chat_history": [{"role": "assistant", "content": "Test response"}],
+            }
 
         mock_generate_response.return_value = mock_response_func
 
@@ -187,12 +187,9 @@ class TestSubgraphs:
             "emotion": "happy",
             "emotion_confidence": 0.9,
             "chat_history": [{"role": "user", "content": "Previous message"}],
-            "custom_field": "should be preserved",
         }
 
-        graph = build_excited_flow(
-            self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        graph = build_excited_flow(self.mock_client, self.mock_emotion_logger)
         compiled_graph = graph.compile()
 
         result = compiled_graph.invoke(input_state)
@@ -201,11 +198,13 @@ class TestSubgraphs:
         assert result["user_input"] == "Hello"
         assert result["emotion"] == "happy"
         assert result["emotion_confidence"] == 0.9
-        assert result["custom_field"] == "should be preserved"
 
-        # Check that new fields are added
+        # Check that the delta is merged and chat_history is appended to
         assert result["response"] == "Test response"
-        assert result["new_field"] == "added by flow"
+        assert [m["content"] for m in result["chat_history"]] == [
+            "Previous message",
+            "Test response",
+        ]
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
     def test_flow_error_handling(self, mock_generate_response):
@@ -216,9 +215,7 @@ class TestSubgraphs:
 
         mock_generate_response.return_value = mock_response_func
 
-        graph = build_neutral_flow(
-            self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        graph = build_neutral_flow(self.mock_client, self.mock_emotion_logger)
         compiled_graph = graph.compile()
 
         # Should raise the exception (this is expected behavior)
@@ -242,7 +239,7 @@ class TestSubgraphs:
 
         mock_generate_response.return_value = mock_response_func
 
-        graph = build_sad_flow(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+        graph = build_sad_flow(self.mock_client, self.mock_emotion_logger)
         compiled_graph = graph.compile()
 
         result = compiled_graph.invoke(self.test_state)
@@ -265,19 +262,19 @@ class TestSubgraphs:
 
         # Test each flow with its expected style
         flow_styles = [
-            (build_sad_flow, "supportive and caring"),
-            (build_angry_flow, "calm and soothing"),
-            (build_excited_flow, "enthusiastic and cheerful"),
-            (build_gentle_flow, "gentle and reassuring"),
-            (build_neutral_flow, "neutral and friendly"),
+            (build_sad_flow, "supportive and caring", "sad_flow"),
+            (build_angry_flow, "calm and soothing", "angry_flow"),
+            (build_excited_flow, "enthusiastic and cheerful", "excited_flow"),
+            (build_gentle_flow, "gentle and reassuring", "gentle_flow"),
+            (build_neutral_flow, "neutral and friendly", "neutral_flow"),
         ]
 
-        for builder, expected_style in flow_styles:
+        for builder, expected_style, expected_flow in flow_styles:
             mock_generate_response.reset_mock()
-            graph = builder(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+            graph = builder(self.mock_client, self.mock_emotion_logger)
 
             mock_generate_response.assert_called_once_with(
-                expected_style, self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
+                expected_style, self.mock_client, self.mock_emotion_logger, flow=expected_flow
             )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -289,15 +286,14 @@ class TestSubgraphs:
 
         mock_generate_response.return_value = mock_response_func
 
-        # Test with specific client, tts, and logger mocks
+        # Test with specific client and logger mocks
         specific_client = Mock()
-        specific_tts = Mock()
         specific_logger = Mock()
 
-        graph = build_neutral_flow(specific_client, specific_tts, specific_logger)
+        graph = build_neutral_flow(specific_client, specific_logger)
 
         mock_generate_response.assert_called_once_with(
-            "neutral and friendly", specific_client, specific_tts, specific_logger
+            "neutral and friendly", specific_client, specific_logger, flow="neutral_flow"
         )
 
     @patch('src.miramind.llm.langgraph.subgraphs.generate_response')
@@ -325,7 +321,7 @@ class TestSubgraphs:
             ],
         }
 
-        graph = build_sad_flow(self.mock_client, self.mock_tts_provider, self.mock_emotion_logger)
+        graph = build_sad_flow(self.mock_client, self.mock_emotion_logger)
         compiled_graph = graph.compile()
 
         result = compiled_graph.invoke(initial_state)
@@ -341,3 +337,19 @@ class TestSubgraphs:
         ]
         assert len(followup_messages) == 1
         assert followup_messages[0]["role"] == "assistant"
+
+    def test_fixed_phrases(self):
+        """Test the phrases banked for the TTS and the styles they are banked in."""
+        phrases = fixed_phrases()
+
+        assert (SAD_FOLLOW_UP, "sad") in phrases
+        assert ("I'm listening. Can you tell me a little more?", "neutral") in phrases
+        assert (GREETINGS[0], "happy") in phrases
+        assert len(phrases) == len(set(phrases))
+
+    def test_follow_up_skipped_for_canned_reply(self):
+        """Test that a degraded (canned) reply gets no second question."""
+        state = {"response": "Canned reply?", "degraded": True}
+
+        assert follow_up(state) == {}
+        assert follow_up({"response": "Reply."})["response"] == f"Reply. {SAD_FOLLOW_UP}"
@@ -1,115 +1,152 @@
 import asyncio
+import io
 import json
 import os
 import sys
 import threading
-from unittest.mock import MagicMock, Mock, mock_open, patch
+import time
+import wave
+from unittest.mock import AsyncMock, MagicMock, Mock, mock_open, patch
 
 import pytest
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
+from src.miramind.audio.tts.phrase_bank import PhraseBank
+from src.miramind.llm.langgraph.emotion_log import read_emotion_log
+from src.miramind.llm.langgraph.prompt_cache import PromptCacheStats
 from src.miramind.llm.langgraph.utils import (
+    CANNED_REPLIES,
     DEFAULT_MODEL,
     LOG_FILE,
+    TTS_EMOTION_MAPPING,
     EmotionLogger,
     call_openai,
     call_openai_async,
+    context_builder,
     generate_response,
     main,
+    synthesize_speech,
+    text_to_speech,
 )
+from src.miramind.shared.circuit_breaker import CircuitBreaker
+from src.miramind.shared.rate_limit import InMemoryRateLimiter
 
 
 class TestEmotionLogger:
     """Test suite for EmotionLogger class."""
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_logger(self, tmp_path):
         """Setup test fixtures."""
-        self.log_file = "test_emotion_log.json"
+        self.log_file = str(tmp_path / "test_emotion_log.jsonl")
         self.logger = EmotionLogger(self.log_file)
-
-    def teardown_method(self):
-        """Clean up test files."""
-        if os.path.exists(self.log_file):
-            os.remove(self.log_file)
+        yield
+        self.logger.close()
 
     def test_emotion_logger_initialization(self):
         """Test EmotionLogger initialization."""
         assert self.logger.filepath == self.log_file
 
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('os.path.exists')
-    @patch('json.load')
-    @patch('json.dump')
-    def test_log_new_file(self, mock_json_dump, mock_json_load, mock_exists, mock_file):
-        """Test logging to a new file."""
-        mock_exists.return_value = False
-
+    def test_log_appends_jsonl(self):
+        """Test that each entry is appended as one JSON line."""
         self.logger.log("Hello", "happy", 0.85, "Great to hear!")
+        self.logger.log("Hello", "sad", 0.75, "I understand")
+        self.logger.flush()
+
+        with open(self.log_file, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        assert len(lines) == 2
+        assert json.loads(lines[0]) == {
+            "input": "Hello",
+            "emotion": "happy",
+            "confidence": 0.85,
+            "response": "Great to hear!",
+            "source": "llm",
+        }
+        assert json.loads(lines[1])["emotion"] == "sad"
 
-        # Should create new file with one entry
-        mock_json_dump.assert_called_once()
-        args, kwargs = mock_json_dump.call_args
-        logged_data = args[0]
-
-        assert len(logged_data) == 1
-        assert logged_data[0]["input"] == "Hello"
-        assert logged_data[0]["emotion"] == "happy"
-        assert logged_data[0]["confidence"] == 0.85
-        assert logged_data[0]["response"] == "Great to hear!"
-
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('os.path.exists')
-    @patch('json.load')
-    @patch('json.dump')
-    def test_log_existing_file(self, mock_json_dump, mock_json_load, mock_exists, mock_file):
-        """Test logging to an existing file."""
-        mock_exists.return_value = True
-        mock_json_load.return_value = [
-            {"input": "previous", "emotion": "neutral", "confidence": 0.5, "response": "ok"}
-        ]
+    def test_log_confidence_rounding(self):
+        """Test that confidence values are properly rounded."""
+        self.logger.log("Hello", "happy", 0.8547, "Great!")
+        self.logger.flush()
 
-        self.logger.log("Hello", "sad", 0.75, "I understand")
+        assert read_emotion_log(self.log_file)[0]["confidence"] == 0.85
 
-        # Should append to existing data
-        mock_json_dump.assert_called_once()
-        args, kwargs = mock_json_dump.call_args
-        logged_data = args[0]
+    def test_concurrent_logging(self):
+        """Test that concurrent callers never corrupt the log."""
 
-        assert len(logged_data) == 2
-        assert logged_data[0]["input"] == "previous"
-        assert logged_data[1]["input"] == "Hello"
-        assert logged_data[1]["emotion"] == "sad"
-        assert logged_data[1]["confidence"] == 0.75
-        assert logged_data[1]["response"] == "I understand"
+        def worker(n):
+            for i in range(50):
+                self.logger.log(f"thread {n} message {i}", "neutral", 0.5)
 
-    @patch('builtins.open', side_effect=IOError("File write error"))
-    @patch('os.path.exists')
-    @patch('builtins.print')
-    def test_log_file_error(self, mock_print, mock_exists, mock_open):
-        """Test logging when file operation fails."""
-        mock_exists.return_value = False
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.logger.flush()
 
-        # Should not raise exception, just print error
-        self.logger.log("Hello", "happy", 0.85, "Great!")
+        assert len(read_emotion_log(self.log_file)) == 400
 
-        mock_print.assert_called_once_with("Logging failed: File write error")
+    def test_log_does_not_block_when_queue_full(self):
+        """Test that entries are dropped instead of blocking when the writer falls behind."""
+        logger = EmotionLogger(self.log_file, max_queue_size=1)
+        release = threading.Event()
 
-    def test_log_confidence_rounding(self):
-        """Test that confidence values are properly rounded."""
-        with (
-            patch('builtins.open', new_callable=mock_open) as mock_file,
-            patch('os.path.exists', return_value=False),
-            patch('json.dump') as mock_json_dump,
-        ):
+        with patch.object(logger, "_write", side_effect=lambda entries: release.wait(5)):
+            for i in range(5):
+                logger.log(f"message {i}", "neutral", 0.5)
+            assert logger.dropped >= 3
+            release.set()
+            logger.close()
+
+    def test_rotation(self):
+        """Test that the log is rotated once it exceeds max_bytes."""
+        logger = EmotionLogger(self.log_file, max_bytes=200, backup_count=2)
+        for i in range(10):
+            logger.log(f"message {i}", "neutral", 0.5, "x" * 100)
+            logger.flush()
+        logger.close()
+
+        assert os.path.exists(self.log_file + ".1")
+        assert os.path.exists(self.log_file + ".2")
+        assert not os.path.exists(self.log_file + ".3")
+        inputs = [entry["input"] for entry in read_emotion_log(self.log_file)]
+        assert inputs == sorted(inputs) and inputs[-1] == "message 9"
+
+    def test_write_error_is_logged(self):
+        """Test that a failing write does not stop the writer thread."""
+        with patch('builtins.open', side_effect=IOError("File write error")):
+            self.logger.log("Hello", "happy", 0.85, "Great!")
+            self.logger.flush()
+
+        self.logger.log("Again", "happy", 0.85, "Great!")
+        self.logger.flush()
+
+        assert [entry["input"] for entry in read_emotion_log(self.log_file)] == ["Again"]
+
+
+class TestReadEmotionLog:
+    """Test suite for read_emotion_log."""
+
+    def test_reads_legacy_json_array(self, tmp_path, sample_log_entries):
+        """Test that the old JSON-array log is still readable."""
+        legacy = tmp_path / "emotion_log.json"
+        legacy.write_text(json.dumps(sample_log_entries, indent=2))
 
-            self.logger.log("Hello", "happy", 0.8547, "Great!")
+        assert read_emotion_log(str(legacy)) == sample_log_entries
 
-            args, kwargs = mock_json_dump.call_args
-            logged_data = args[0]
+    def test_skips_torn_lines_and_missing_files(self, tmp_path):
+        """Test that a partial last line and missing files are ignored."""
+        log_file = tmp_path / "emotion_log.jsonl"
+        log_file.write_text('{"input": "a", "emotion": "happy"}\n{"input": "b", "emo')
 
-            assert logged_data[0]["confidence"] == 0.85
+        entries = read_emotion_log(str(tmp_path / "missing.json"), str(log_file))
+
+        assert entries == [{"input": "a", "emotion": "happy"}]
 
 
 class TestCallOpenAI:
@@ -174,6 +211,104 @@ class TestCallOpenAI:
 
         assert result == ""
 
+    def test_call_openai_deadline(self):
+        """Test that the request timeout shrinks to the time left before the deadline."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        self.mock_client.chat.completions.create.return_value = mock_response
+
+        result = call_openai(self.mock_client, self.test_messages, deadline=time.monotonic() + 2.0)
+
+        assert result == "Hi"
+        assert 0 < self.mock_client.chat.completions.create.call_args.kwargs["timeout"] <= 2.0
+
+    def test_call_openai_records_cached_tokens(self):
+        """Test that cached prompt tokens of each response are counted under the call's label."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        mock_response.usage.prompt_tokens = 100
+        mock_response.usage.prompt_tokens_details.cached_tokens = 64
+        self.mock_client.chat.completions.create.return_value = mock_response
+
+        stats = PromptCacheStats()
+        with patch('src.miramind.llm.langgraph.utils.prompt_cache_stats', stats):
+            call_openai(self.mock_client, self.test_messages, label="sad_flow")
+
+        assert stats.get_stats()["sad_flow"] == {
+            "requests": 1,
+            "cache_hits": 1,
+            "prompt_tokens": 100,
+            "cached_tokens": 64,
+            "hit_ratio": 0.64,
+        }
+
+    def test_call_openai_waits_for_upstream_budget(self):
+        """Test that requests over the upstream budget are delayed, not sent at once."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        self.mock_client.chat.completions.create.return_value = mock_response
+        budget = InMemoryRateLimiter("openai_upstream", rate=20.0, capacity=1)
+        budget.reserve()  # Empty: the next token comes in 50 ms
+
+        start = time.monotonic()
+        with patch('src.miramind.llm.langgraph.utils.get_rate_limiter', return_value=budget):
+            result = call_openai(self.mock_client, self.test_messages)
+
+        assert result == "Hi"
+        assert time.monotonic() - start >= 0.04
+        assert budget.get_stats()["delayed"] == 1
+
+    def test_call_openai_budget_wait_before_attempt(self):
+        """Test that the attempt timeout is what is left of the deadline after the budget wait."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        self.mock_client.chat.completions.create.return_value = mock_response
+        budget = InMemoryRateLimiter("openai_upstream", rate=5.0, capacity=1)
+        budget.reserve()  # Empty: the next token comes in 200 ms
+
+        with patch('src.miramind.llm.langgraph.utils.get_rate_limiter', return_value=budget):
+            result = call_openai(
+                self.mock_client, self.test_messages, deadline=time.monotonic() + 0.5
+            )
+
+        assert result == "Hi"
+        assert self.mock_client.chat.completions.create.call_args.kwargs["timeout"] <= 0.31
+
+    def test_call_openai_budget_exhausted_before_deadline(self):
+        """Test that no request is sent when the budget cannot refill before the deadline."""
+        budget = InMemoryRateLimiter("openai_upstream", rate=1.0, capacity=1)
+        budget.reserve()
+
+        with patch('src.miramind.llm.langgraph.utils.get_rate_limiter', return_value=budget):
+            result = call_openai(
+                self.mock_client, self.test_messages, deadline=time.monotonic() + 0.1
+            )
+
+        assert result == ""
+        self.mock_client.chat.completions.create.assert_not_called()
+
+    def test_call_openai_circuit_open(self):
+        """Test that no request is sent while the OpenAI breaker is open."""
+        breaker = CircuitBreaker("openai", failure_threshold=1)
+        breaker.record_failure()
+
+        with patch('src.miramind.llm.langgraph.utils.openai_breaker', breaker):
+            result = call_openai(self.mock_client, self.test_messages)
+
+        assert result == ""
+        self.mock_client.chat.completions.create.assert_not_called()
+
+    def test_call_openai_deadline_passed(self):
+        """Test that no request is sent after the deadline."""
+        result = call_openai(self.mock_client, self.test_messages, deadline=time.monotonic() - 1)
+
+        assert result == ""
+        self.mock_client.chat.completions.create.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_call_openai_async_success(self):
         """Test successful async OpenAI API call."""
@@ -203,7 +338,6 @@ class TestGenerateResponse:
     def setup_method(self):
         """Setup test fixtures."""
         self.mock_client = Mock()
-        self.mock_tts_provider = Mock()
         self.mock_emotion_logger = Mock()
 
         self.test_state = {
@@ -220,159 +354,288 @@ class TestGenerateResponse:
     def test_generate_response_basic(self, mock_call_openai):
         """Test basic response generation."""
         mock_call_openai.return_value = "I understand you're feeling sad."
-        self.mock_tts_provider.synthesize.return_value = b"audio_data"
 
-        responder = generate_response(
-            "supportive", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        responder = generate_response("supportive", self.mock_client, self.mock_emotion_logger)
         result = responder(self.test_state)
 
         assert result["response"] == "I understand you're feeling sad."
-        assert result["response_audio"] == b"audio_data"
-        assert len(result["chat_history"]) == 4  # Original 2 + user input + assistant response
+        assert "response_audio" not in result  # Synthesized by the text_to_speech node
+        # Only this turn's messages; the graph's chat_history reducer appends them
+        assert result["chat_history"] == [
+            {"role": "user", "content": "I am feeling sad"},
+            {"role": "assistant", "content": "I understand you're feeling sad."},
+        ]
+
+    @patch('src.miramind.llm.langgraph.utils.call_openai')
+    def test_generate_response_skips_recorded_user_message(self, mock_call_openai):
+        """Test that a user message already appended by detect_emotion is not repeated."""
+        mock_call_openai.return_value = "Response"
+        state = {
+            **self.test_state,
+            "chat_history": self.test_state["chat_history"]
+            + [{"role": "user", "content": "I am feeling sad"}],
+        }
+
+        responder = generate_response("neutral", self.mock_client, self.mock_emotion_logger)
+        result = responder(state)
+
+        assert result["chat_history"] == [{"role": "assistant", "content": "Response"}]
 
     @patch('src.miramind.llm.langgraph.utils.call_openai')
     def test_generate_response_system_message(self, mock_call_openai):
         """Test that system message is properly formatted."""
         mock_call_openai.return_value = "Test response"
-        self.mock_tts_provider.synthesize.return_value = b"audio_data"
 
-        responder = generate_response(
-            "gentle", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        responder = generate_response("gentle", self.mock_client, self.mock_emotion_logger)
         responder(self.test_state)
 
         # Check that call_openai was called with correct system message
         mock_call_openai.assert_called_once()
         messages = mock_call_openai.call_args[0][1]
 
+        # The shared prompt comes first; the style goes after the history, before the user input
         system_message = messages[0]
         assert system_message["role"] == "system"
-        assert "gentle non-licensed therapist" in system_message["content"]
+        assert "non-licensed therapist" in system_message["content"]
         assert "neurodivergent children" in system_message["content"]
+        assert "gentle" not in system_message["content"]
+        assert messages[-2] == {"role": "system", "content": "Respond in a gentle way."}
+
+    @patch('src.miramind.llm.langgraph.utils.call_openai')
+    def test_generate_response_prefix_shared_across_styles(self, mock_call_openai):
+        """Test that every style sends the same prompt prefix, so the provider can cache it."""
+        mock_call_openai.return_value = "Response"
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+        state = {**self.test_state, "chat_history": history}
+
+        prefixes = []
+        for style in ("gentle", "calm and soothing"):
+            generate_response(style, self.mock_client, self.mock_emotion_logger)(state)
+            prefixes.append(mock_call_openai.call_args[0][1][:3])
+
+        assert prefixes[0] == prefixes[1]
+        assert prefixes[0][1:] == history
 
     @patch('src.miramind.llm.langgraph.utils.call_openai')
     def test_generate_response_chat_history_limit(self, mock_call_openai):
-        """Test that chat history is limited to last 4 messages."""
+        """Test that chat history is limited to the most recent turns fitting the token budget."""
         mock_call_openai.return_value = "Response"
-        self.mock_tts_provider.synthesize.return_value = b"audio_data"
 
         # Create state with long chat history
         long_history = [{"role": "user", "content": f"Message {i}"} for i in range(10)]
         state_with_long_history = {**self.test_state, "chat_history": long_history}
 
-        responder = generate_response(
-            "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
+        responder = generate_response("neutral", self.mock_client, self.mock_emotion_logger)
         responder(state_with_long_history)
+        system, style, user = (
+            mock_call_openai.call_args[0][1][0],
+            *mock_call_openai.call_args[0][1][-2:],
+        )
 
-        # Check that only last 4 messages + system + current user message are used
-        mock_call_openai.assert_called_once()
-        messages = mock_call_openai.call_args[0][1]
+        # Budget for system prompt + style + current user input + exactly the last 4 history messages
+        budget = sum(
+            context_builder.message_tokens(message)
+            for message in [system, style, user] + long_history[-4:]
+        )
+        mock_call_openai.reset_mock()
+        with patch.object(context_builder, "token_budget", budget):
+            responder(state_with_long_history)
 
-        # Should be: system + last 4 from history + current user input = 6 total
-        assert len(messages) == 6
+        # Should be: system + last 4 from history + style + current user input = 7 total
+        messages = mock_call_openai.call_args[0][1]
+        assert len(messages) == 7
+        assert messages[1:5] == long_history[-4:]
 
     @patch('src.miramind.llm.langgraph.utils.call_openai')
-    def test_generate_response_emotion_mapping(self, mock_call_openai):
-        """Test emotion mapping for TTS."""
+    def test_generate_response_logs_emotion(self, mock_call_openai):
+        """Test that the turn is handed to the emotion logger."""
         mock_call_openai.return_value = "Response"
-        self.mock_tts_provider.synthesize.return_value = b"audio_data"
-
-        # Test different emotions
-        test_cases = [
-            ("anxious", "scared"),
-            ("embarrassed", "neutral"),
-            ("excited", "excited"),
-            ("happy", "happy"),
-            ("sad", "sad"),
-            ("angry", "angry"),
-            ("scared", "scared"),
-            ("neutral", "neutral"),
-        ]
 
-        for input_emotion, expected_tts_emotion in test_cases:
-            state = {**self.test_state, "emotion": input_emotion}
-            responder = generate_response(
-                "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-            )
-            responder(state)
+        responder = generate_response("neutral", self.mock_client, self.mock_emotion_logger)
+        responder(self.test_state)
 
-            # Check TTS was called with correct emotion
-            self.mock_tts_provider.synthesize.assert_called()
-            tts_call_args = self.mock_tts_provider.synthesize.call_args[0][0]
-            tts_data = json.loads(tts_call_args)
-            assert tts_data["emotion"] == expected_tts_emotion
+        self.mock_emotion_logger.log.assert_called_once_with(
+            "I am feeling sad",
+            "sad",
+            self.test_state["emotion_confidence"],
+            "Response",
+            source="llm",
+        )
 
     @patch('src.miramind.llm.langgraph.utils.call_openai')
-    def test_generate_response_async_tts(self, mock_call_openai):
-        """Test async TTS when available."""
-        mock_call_openai.return_value = "Response"
-        self.mock_tts_provider.synthesize_async = Mock(return_value=asyncio.Future())
-        self.mock_tts_provider.synthesize_async.return_value.set_result(b"async_audio_data")
+    def test_generate_response_canned_reply(self, mock_call_openai):
+        """Test that a missing LLM reply degrades to the style's canned reply."""
+        mock_call_openai.return_value = ""
 
         responder = generate_response(
-            "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
+            "calm and soothing", self.mock_client, self.mock_emotion_logger
         )
         result = responder(self.test_state)
 
-        assert result["response_audio"] == b"async_audio_data"
+        assert result["response"] == CANNED_REPLIES["calm and soothing"]
+        assert result["degraded"] is True
+        assert result["chat_history"][-1]["content"] == result["response"]
+        self.mock_emotion_logger.log.assert_not_called()
 
     @patch('src.miramind.llm.langgraph.utils.call_openai')
-    def test_generate_response_tts_error(self, mock_call_openai):
-        """Test TTS error handling."""
+    def test_generate_response_returns_delta(self, mock_call_openai):
+        """Test that response generation returns only the keys it changes."""
         mock_call_openai.return_value = "Response"
-        self.mock_tts_provider.synthesize.side_effect = Exception("TTS Error")
 
-        responder = generate_response(
-            "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
-        result = responder(self.test_state)
+        original_state = {**self.test_state, "memory": "important context"}
 
-        assert result["response"] == "Response"
-        assert result["response_audio"] is None
+        responder = generate_response("neutral", self.mock_client, self.mock_emotion_logger)
+        result = responder(original_state)
 
-    @patch('src.miramind.llm.langgraph.utils.call_openai')
-    @patch('threading.Thread')
-    def test_generate_response_async_logging(self, mock_thread, mock_call_openai):
-        """Test async logging functionality."""
-        mock_call_openai.return_value = "Response"
-        self.mock_tts_provider.synthesize.return_value = b"audio_data"
+        assert set(result) == {"response", "chat_history"}
+        assert original_state["chat_history"] == self.test_state["chat_history"]
 
-        mock_thread_instance = Mock()
-        mock_thread.return_value = mock_thread_instance
 
-        responder = generate_response(
-            "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
-        )
-        responder(self.test_state)
+def _wav(sample: bytes) -> bytes:
+    output = io.BytesIO()
+    with wave.open(output, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(16000)
+        writer.writeframes(sample)
+    return output.getvalue()
 
-        # Check that logging thread was created and started
-        mock_thread.assert_called_once()
-        mock_thread_instance.start.assert_called_once()
 
-    @patch('src.miramind.llm.langgraph.utils.call_openai')
-    def test_generate_response_preserves_state(self, mock_call_openai):
-        """Test that response generation preserves original state."""
-        mock_call_openai.return_value = "Response"
+class TestTextToSpeech:
+    """Test suite for the text_to_speech graph node."""
+
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.mock_tts_provider = Mock(spec=["synthesize"])
+        self.test_state = {"user_input": "Hi", "emotion": "sad", "response": "Response"}
+
+    def test_sync_invoke(self):
+        """Test synthesis through invoke (runs on the shared TTS loop)."""
         self.mock_tts_provider.synthesize.return_value = b"audio_data"
 
-        original_state = {
-            **self.test_state,
-            "custom_field": "should be preserved",
-            "memory": "important context",
-        }
+        result = text_to_speech(self.mock_tts_provider).invoke(self.test_state)
 
-        responder = generate_response(
-            "neutral", self.mock_client, self.mock_tts_provider, self.mock_emotion_logger
+        assert result == {"response_audio": b"audio_data"}
+
+    def test_emotion_mapping(self):
+        """Test emotion mapping for TTS."""
+        self.mock_tts_provider.synthesize.return_value = b"audio_data"
+        node = text_to_speech(self.mock_tts_provider)
+
+        for input_emotion, expected_tts_emotion in TTS_EMOTION_MAPPING.items():
+            node.invoke({**self.test_state, "emotion": input_emotion})
+
+            tts_data = json.loads(self.mock_tts_provider.synthesize.call_args[0][0])
+            assert tts_data == {"text": "Response", "emotion": expected_tts_emotion}
+
+    def test_async_provider_under_ainvoke(self):
+        """Test that an async provider is awaited on the caller's event loop."""
+        provider = Mock()
+        provider.synthesize_async = AsyncMock(return_value=b"async_audio_data")
+        node = text_to_speech(provider)
+
+        result = asyncio.run(node.ainvoke(self.test_state))
+
+        assert result["response_audio"] == b"async_audio_data"
+        provider.synthesize_async.assert_awaited_once()
+        provider.synthesize.assert_not_called()
+
+    def test_async_provider_under_invoke_reuses_loop(self):
+        """Test that sync invocations share one long-lived TTS loop."""
+        loops = []
+
+        async def synthesize_async(request):
+            loops.append(asyncio.get_running_loop())
+            return b"audio_data"
+
+        provider = Mock()
+        provider.synthesize_async = synthesize_async
+        node = text_to_speech(provider)
+
+        for _ in range(3):
+            assert node.invoke(self.test_state)["response_audio"] == b"audio_data"
+
+        assert len(set(map(id, loops))) == 1
+        assert loops[0].is_running()
+
+    def test_identical_concurrent_requests_synthesized_once(self):
+        """Test that concurrent nodes speaking the same text share one synthesis."""
+        calls = []
+
+        async def synthesize_async(request):
+            calls.append(request)
+            await asyncio.sleep(0.02)
+            return b"audio_data"
+
+        provider = Mock()
+        provider.synthesize_async = synthesize_async
+        node = text_to_speech(provider)
+
+        async def burst():
+            return await asyncio.gather(*(node.ainvoke(self.test_state) for _ in range(3)))
+
+        results = asyncio.run(burst())
+
+        assert [r["response_audio"] for r in results] == [b"audio_data"] * 3
+        assert len(calls) == 1
+
+    def test_audio_format_in_request(self):
+        """Test that a requested encoding is passed to the provider and synthesized apart."""
+        self.mock_tts_provider.synthesize.side_effect = [b"wav", b"ogg"]
+
+        async def both():
+            return await asyncio.gather(
+                synthesize_speech(self.mock_tts_provider, "Hi", "happy"),
+                synthesize_speech(self.mock_tts_provider, "Hi", "happy", "ogg_opus"),
+            )
+
+        assert sorted(asyncio.run(both())) == [b"ogg", b"wav"]
+        requests = [json.loads(c[0][0]) for c in self.mock_tts_provider.synthesize.call_args_list]
+        assert {"text": "Hi", "emotion": "happy"} in requests
+        assert {"text": "Hi", "emotion": "happy", "format": "ogg_opus"} in requests
+
+    def test_phrase_bank_spliced(self):
+        """Test that only the text around banked phrases is synthesized."""
+        bank = PhraseBank(self.mock_tts_provider, gap=0)
+        bank.add("Tell me more?", "sad", _wav(b"\x02\x00"))
+        self.mock_tts_provider.synthesize.return_value = _wav(b"\x01\x00")
+
+        audio = asyncio.run(
+            synthesize_speech(
+                self.mock_tts_provider, "Oh no. Tell me more?", "sad", phrase_bank=bank
+            )
         )
-        result = responder(original_state)
 
-        # Check that original fields are preserved
-        assert result["custom_field"] == "should be preserved"
-        assert result["memory"] == "important context"
-        assert result["user_input"] == "I am feeling sad"
-        assert result["emotion"] == "sad"
+        tts_data = json.loads(self.mock_tts_provider.synthesize.call_args[0][0])
+        assert tts_data == {"text": "Oh no.", "emotion": "sad"}
+        with wave.open(io.BytesIO(audio)) as reader:
+            assert reader.readframes(reader.getnframes()) == b"\x01\x00\x02\x00"
+        assert bank.get_stats()["characters_saved"] == len(" Tell me more?")
+
+    def test_phrase_bank_not_used_for_compressed_audio(self):
+        """Test that compressed formats are synthesized whole (they cannot be spliced)."""
+        bank = PhraseBank(self.mock_tts_provider)
+        bank.add("Tell me more?", "sad", b"banked")
+        self.mock_tts_provider.synthesize.return_value = b"ogg"
+
+        audio = asyncio.run(
+            synthesize_speech(
+                self.mock_tts_provider, "Oh no. Tell me more?", "sad", "ogg_opus", bank
+            )
+        )
+
+        assert audio == b"ogg"
+        assert json.loads(self.mock_tts_provider.synthesize.call_args[0][0])["text"] == (
+            "Oh no. Tell me more?"
+        )
+
+    def test_tts_error(self):
+        """Test TTS error handling."""
+        self.mock_tts_provider.synthesize.side_effect = Exception("TTS Error")
+
+        result = text_to_speech(self.mock_tts_provider).invoke(self.test_state)
+
+        assert result == {"response_audio": None}
 
 
 class TestMain:
@@ -405,4 +668,4 @@ class TestMain:
     def test_constants(self):
         """Test module constants."""
         assert DEFAULT_MODEL == "gpt-4o"
-        assert LOG_FILE == "emotion_log.json"
+        assert LOG_FILE == "emotion_log.jsonl"
@@ -0,0 +1,135 @@
+import io
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+from src.miramind.audio.stt.stt_cache import (
+    TranscriptCache,
+    fingerprint_audio,
+    transcribe_with_cache,
+)
+
+
+def _encode(samples, sample_rate=16000, subtype="PCM_16", fmt="WAV"):
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, samplerate=sample_rate, format=fmt, subtype=subtype)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def samples():
+    return (np.sin(np.linspace(0, 200, 8000)) * 16000).astype(np.int16)
+
+
+class TestFingerprintAudio:
+    """Tests for fingerprint_audio."""
+
+    def test_same_audio_same_fingerprint(self, samples):
+        """Identical audio produces identical fingerprints."""
+        assert fingerprint_audio(_encode(samples)) == fingerprint_audio(_encode(samples))
+
+    def test_container_differences_ignored(self, samples):
+        """WAV and FLAC encodings of the same PCM share a fingerprint."""
+        wav = _encode(samples)
+        flac = _encode(samples, fmt="FLAC")
+        assert wav != flac
+        assert fingerprint_audio(wav) == fingerprint_audio(flac)
+
+    def test_different_audio_different_fingerprint(self, samples):
+        """Different samples produce different fingerprints."""
+        assert fingerprint_audio(_encode(samples)) != fingerprint_audio(_encode(samples // 2))
+
+    def test_undecodable_audio_falls_back_to_raw_hash(self):
+        """Data libsndfile cannot decode is hashed as raw bytes."""
+        assert fingerprint_audio(b"not audio") == fingerprint_audio(b"not audio")
+        assert fingerprint_audio(b"not audio") != fingerprint_audio(b"other bytes")
+
+
+class TestTranscriptCache:
+    """Tests for TranscriptCache."""
+
+    def test_put_and_get(self):
+        cache = TranscriptCache(max_entries=2, ttl=60)
+        cache.put("a", {"transcript": "hello"})
+
+        assert cache.get("a") == {"transcript": "hello"}
+        assert cache.hits == 1
+        assert cache.get("b") is None
+        assert cache.misses == 1
+
+    def test_lru_eviction(self):
+        cache = TranscriptCache(max_entries=2, ttl=60)
+        cache.put("a", {"transcript": "1"})
+        cache.put("b", {"transcript": "2"})
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", {"transcript": "3"})
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    @patch("src.miramind.audio.stt.stt_cache.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic):
+        cache = TranscriptCache(max_entries=2, ttl=10)
+        mock_monotonic.return_value = 100.0
+        cache.put("a", {"transcript": "hello"})
+
+        mock_monotonic.return_value = 105.0
+        assert cache.get("a") is not None
+
+        mock_monotonic.return_value = 111.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_clear(self):
+        cache = TranscriptCache()
+        cache.put("a", {"transcript": "hello"})
+        cache.get("a")
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.hits == 0
+
+
+class TestTranscribeWithCache:
+    """Tests for transcribe_with_cache."""
+
+    def test_repeated_audio_transcribed_once(self, samples):
+        stt = MagicMock()
+        stt.transcribe_bytes.return_value = {"transcript": "hello"}
+        cache = TranscriptCache()
+        audio = _encode(samples)
+
+        first, first_cached = transcribe_with_cache(stt, audio, cache)
+        second, second_cached = transcribe_with_cache(stt, audio, cache)
+
+        assert first == second == {"transcript": "hello"}
+        assert first_cached is False
+        assert second_cached is True
+        stt.transcribe_bytes.assert_called_once()
+
+    def test_buffer_has_name(self, samples):
+        stt = MagicMock()
+        stt.transcribe_bytes.return_value = {"transcript": "hello"}
+
+        transcribe_with_cache(stt, _encode(samples), TranscriptCache(), name="clip.wav")
+
+        buffer = stt.transcribe_bytes.call_args[0][0]
+        assert buffer.name == "clip.wav"
+
+    def test_empty_transcript_not_cached(self, samples):
+        stt = MagicMock()
+        stt.transcribe_bytes.return_value = {"transcript": ""}
+        cache = TranscriptCache()
+
+        transcribe_with_cache(stt, _encode(samples), cache)
+
+        assert len(cache) == 0
@@ -0,0 +1,51 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import httpx
+import openai
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+from src.miramind.audio.stt.stt_class import STT, stt_breaker
+
+
+def _error(cls, status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/audio/transcriptions")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+class TestSTTBreaker:
+    """Tests for the STT circuit breaker."""
+
+    def setup_method(self):
+        stt_breaker.reset()
+
+    def teardown_method(self):
+        stt_breaker.reset()
+
+    def test_bad_uploads_do_not_open_breaker(self):
+        """Rejected uploads fail on their own without affecting other users."""
+        client = MagicMock()
+        client.audio.transcriptions.create.side_effect = _error(openai.BadRequestError, 400)
+        stt = STT(client=client)
+
+        for _ in range(stt_breaker.failure_threshold + 1):
+            with pytest.raises(openai.BadRequestError):
+                stt.transcribe_bytes(b"not audio")
+
+        assert stt_breaker.state == "closed"
+
+    def test_outages_open_breaker(self):
+        """Server errors count as failures of the transcription service."""
+        client = MagicMock()
+        client.audio.transcriptions.create.side_effect = _error(openai.InternalServerError, 500)
+        stt = STT(client=client)
+
+        for _ in range(stt_breaker.failure_threshold):
+            with pytest.raises(openai.InternalServerError):
+                stt.transcribe_bytes(b"audio")
+
+        assert stt_breaker.state == "open"
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+from src.miramind.audio.tts.audio_formats import (
+    AUDIO_FORMATS,
+    MP3,
+    OGG_OPUS,
+    WAV,
+    get_audio_format,
+    negotiate_audio_format,
+    requested_audio_format,
+)
+from src.miramind.audio.tts.tts_azure import AzureTTSProvider
+
+
+class TestNegotiateAudioFormat:
+    """Test suite for choosing an encoding from an Accept header."""
+
+    def test_named_format_preferred(self):
+        """Test that the format a client names is chosen."""
+        assert negotiate_audio_format("audio/ogg", AUDIO_FORMATS) == OGG_OPUS
+        assert negotiate_audio_format("audio/mp3", AUDIO_FORMATS) == MP3
+
+    def test_quality_values(self):
+        """Test that q values order the client's preferences."""
+        accept = "audio/wav;q=0.5, audio/mpeg;q=0.8, audio/ogg;q=0"
+        assert negotiate_audio_format(accept, AUDIO_FORMATS) == MP3
+
+    def test_wildcard_picks_first_available(self):
+        """Test that a wildcard matches the preferred available format."""
+        assert negotiate_audio_format("*/*", [OGG_OPUS, WAV]) == OGG_OPUS
+        assert negotiate_audio_format(None, [MP3]) == MP3
+
+    def test_named_format_beats_wildcard(self):
+        """Test that a format named explicitly wins over a wildcard at the same q."""
+        assert negotiate_audio_format("audio/*, audio/wav", [OGG_OPUS, WAV]) == WAV
+
+    def test_nothing_acceptable(self):
+        """Test that None is returned when no available format is accepted."""
+        assert negotiate_audio_format("audio/ogg", [WAV]) is None
+        assert negotiate_audio_format("application/json", AUDIO_FORMATS) is None
+
+    def test_requested_format_ignores_wildcards(self):
+        """Test that only audio types named explicitly count as a request."""
+        assert requested_audio_format("application/json, audio/ogg") == OGG_OPUS
+        assert requested_audio_format("application/json, */*") is None
+        assert requested_audio_format(None) is None
+
+    def test_unknown_format_rejected(self):
+        """Test that an unsupported format name raises ValueError."""
+        with pytest.raises(ValueError, match="Unsupported audio format"):
+            get_audio_format("flac")
+
+
+class TestAzureOutputFormat:
+    """Test suite for the Azure provider's output encoding."""
+
+    def _synthesize(self, provider, request):
+        speechsdk = MagicMock()
+        result = speechsdk.SpeechSynthesizer.return_value.speak_ssml_async.return_value.get()
+        result.reason = speechsdk.ResultReason.SynthesizingAudioCompleted
+        result.audio_data = b"audio"
+        with patch("src.miramind.audio.tts.tts_azure.speechsdk", speechsdk):
+            assert asyncio.run(provider.synthesize_async(json.dumps(request))) == b"audio"
+        return speechsdk
+
+    def test_requested_format_set_on_sdk(self):
+        """Test that a request's format selects the SDK output format."""
+        provider = AzureTTSProvider("key", "https://test.api.cognitive.microsoft.com/")
+
+        speechsdk = self._synthesize(provider, {"text": "Hi", "format": OGG_OPUS})
+
+        speechsdk.SpeechConfig.return_value.set_speech_synthesis_output_format.assert_called_once_with(
+            speechsdk.SpeechSynthesisOutputFormat.Ogg24Khz16BitMonoOpus
+        )
+
+    def test_wav_keeps_sdk_default(self):
+        """Test that WAV requests leave the SDK default RIFF PCM output."""
+        provider = AzureTTSProvider("key", "https://test.api.cognitive.microsoft.com/")
+
+        speechsdk = self._synthesize(provider, {"text": "Hi"})
+
+        speechsdk.SpeechConfig.return_value.set_speech_synthesis_output_format.assert_not_called()
+
+    def test_provider_default_format(self):
+        """Test that the provider's output_format applies to requests naming none."""
+        provider = AzureTTSProvider(
+            "key", "https://test.api.cognitive.microsoft.com/", output_format=MP3
+        )
+
+        speechsdk = self._synthesize(provider, {"text": "Hi"})
+
+        speechsdk.SpeechConfig.return_value.set_speech_synthesis_output_format.assert_called_once_with(
+            speechsdk.SpeechSynthesisOutputFormat.Audio24Khz48KBitRateMonoMp3
+        )
+
+    def test_unknown_format_rejected_before_synthesis(self):
+        """Test that an unsupported format fails as invalid input."""
+        provider = AzureTTSProvider("key", "https://test.api.cognitive.microsoft.com/")
+
+        with pytest.raises(ValueError):
+            asyncio.run(provider.synthesize_async(json.dumps({"text": "Hi", "format": "flac"})))
@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import sys
+import wave
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+from src.miramind.audio.tts.phrase_bank import PhraseBank, concat_wav
+
+
+def _wav(frames: int, value: int = 1, framerate: int = 16000) -> bytes:
+    output = io.BytesIO()
+    with wave.open(output, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(framerate)
+        writer.writeframes(value.to_bytes(2, "little") * frames)
+    return output.getvalue()
+
+
+def _frames(audio: bytes) -> bytes:
+    with wave.open(io.BytesIO(audio)) as reader:
+        return reader.readframes(reader.getnframes())
+
+
+class TestConcatWav:
+    """Test suite for joining WAV segments."""
+
+    def test_samples_joined_with_gap(self):
+        """Test that segments are joined at the sample level with silence between."""
+        audio = concat_wav([_wav(3, 1), _wav(2, 2)], gap=0.001)
+
+        assert _frames(audio) == b"\x01\x00" * 3 + b"\x00\x00" * 16 + b"\x02\x00" * 2
+
+    def test_different_formats_rejected(self):
+        """Test that segments of different sample rates are not joined."""
+        with pytest.raises(ValueError, match="differ"):
+            concat_wav([_wav(3), _wav(3, framerate=24000)])
+
+    def test_non_wav_rejected(self):
+        """Test that compressed or invalid audio is rejected."""
+        with pytest.raises(ValueError, match="Not a WAV"):
+            concat_wav([b"OggS not a wav"])
+
+
+class TestPhraseBank:
+    """Test suite for PhraseBank."""
+
+    def setup_method(self):
+        self.provider = Mock(spec=["synthesize", "voice_name"])
+        self.provider.voice_name = "en-US-JennyNeural"
+        self.provider.synthesize.return_value = _wav(4)
+
+    def test_split_prefix_and_suffix(self):
+        """Test that banked phrases at either end are split from the text to synthesize."""
+        bank = PhraseBank(self.provider)
+        bank.add("Hi there!", "sad", b"hi")
+        bank.add("Would you like to tell me more?", "sad", b"more")
+
+        split = bank.split("Hi there! That sounds hard. Would you like to tell me more?", "sad")
+
+        assert split == (b"hi", "That sounds hard.", b"more")
+
+    def test_split_whole_and_word_boundaries(self):
+        """Test whole-phrase hits, and that phrases only match at word boundaries."""
+        bank = PhraseBank(self.provider)
+        bank.add("Hi!", "neutral", b"hi")
+
+        assert bank.split("Hi!", "neutral") == (b"hi", "", None)
+        assert bank.split("Hi!!", "neutral") == (None, "Hi!!", None)
+        # Phrases are kept per emotion style
+        assert bank.split("Hi! Nice to see you.", "happy") == (None, "Hi! Nice to see you.", None)
+
+    def test_load_synthesizes_and_saves(self, tmp_path):
+        """Test that phrases are synthesized once and loaded from disk afterwards."""
+        PhraseBank(self.provider, cache_dir=str(tmp_path)).load([("Hello!", "happy")])
+
+        request = json.loads(self.provider.synthesize.call_args[0][0])
+        assert request == {"text": "Hello!", "emotion": "happy", "format": "wav"}
+
+        self.provider.synthesize.reset_mock()
+        bank = PhraseBank(self.provider, cache_dir=str(tmp_path))
+        bank.load([("Hello!", "happy")])
+
+        self.provider.synthesize.assert_not_called()
+        assert bank.get("Hello!", "happy") == _wav(4)
+
+    @patch('src.miramind.audio.tts.phrase_bank.time.sleep')
+    def test_load_paces_tts_requests(self, mock_sleep, tmp_path):
+        """Test that TTS requests are spaced by the interval, and disk loads are not."""
+        PhraseBank(self.provider, cache_dir=str(tmp_path)).load([("Hello!", "happy")])
+        bank = PhraseBank(self.provider, cache_dir=str(tmp_path))
+
+        bank.load([("Hello!", "happy"), ("Hi!", "happy"), ("Bye!", "happy")], interval=0.5)
+
+        assert len(bank) == 3
+        assert mock_sleep.call_args_list == [((0.5,),)]  # Only between the two syntheses
+
+    def test_load_stops_at_tts_failure(self):
+        """Test that a failing TTS leaves the bank partly filled instead of raising."""
+        self.provider.synthesize.side_effect = [_wav(4), RuntimeError("no key"), _wav(4)]
+        bank = PhraseBank(self.provider)
+
+        bank.load([("Hello!", "happy"), ("Hi!", "happy"), ("Bye!", "happy")])
+
+        assert len(bank) == 1
+        assert self.provider.synthesize.call_count == 2
+
+    def test_load_skips_non_wav(self):
+        """Test that audio that cannot be spliced is not banked."""
+        self.provider.synthesize.return_value = b"ID3 mp3 audio"
+        bank = PhraseBank(self.provider)
+
+        bank.load([("Hello!", "happy")])
+
+        assert len(bank) == 0
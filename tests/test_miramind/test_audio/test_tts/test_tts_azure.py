@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import azure.cognitiveservices.speech as speechsdk
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+from src.miramind.audio.tts.tts_azure import AzureTTSProvider, TTSServiceError, tts_breaker
+
+
+class TestAzureTTSBreaker:
+    """Tests for which synthesis failures count against the Azure TTS breaker."""
+
+    def setup_method(self):
+        tts_breaker.reset()
+
+    def teardown_method(self):
+        tts_breaker.reset()
+
+    def _fail(self, error_code):
+        synthesizer = MagicMock()
+        result = synthesizer.speak_ssml_async.return_value.get.return_value
+        result.reason = speechsdk.ResultReason.Canceled
+        result.cancellation_details.reason = speechsdk.CancellationReason.Error
+        result.cancellation_details.error_code = error_code
+        provider = AzureTTSProvider("key", "https://test.api.cognitive.microsoft.com/")
+        with patch(
+            "src.miramind.audio.tts.tts_azure.speechsdk.SpeechSynthesizer",
+            return_value=synthesizer,
+        ):
+            asyncio.run(provider.synthesize_async(json.dumps({"text": "Hi"})))
+
+    def test_service_errors_open_breaker(self):
+        """Test that Azure outages open the breaker."""
+        for _ in range(tts_breaker.failure_threshold):
+            with pytest.raises(TTSServiceError):
+                self._fail(speechsdk.CancellationErrorCode.ServiceUnavailable)
+
+        assert tts_breaker.state == "open"
+
+    def test_rejected_requests_do_not_open_breaker(self):
+        """Test that errors of the request itself are not counted as outages."""
+        for _ in range(tts_breaker.failure_threshold + 1):
+            with pytest.raises(RuntimeError) as excinfo:
+                self._fail(speechsdk.CancellationErrorCode.BadRequest)
+            assert not isinstance(excinfo.value, TTSServiceError)
+
+        assert tts_breaker.state == "closed"
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.shared.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    get_breaker_stats,
+)
+
+
+class DependencyError(Exception):
+    pass
+
+
+def _fail():
+    raise DependencyError("down")
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+
+    def _open(self, breaker):
+        for _ in range(breaker.failure_threshold):
+            with pytest.raises(DependencyError):
+                breaker.call(_fail)
+        assert breaker.state == OPEN
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker opens at the failure threshold and then fails fast."""
+        breaker = CircuitBreaker("dep", failure_threshold=3, recovery_timeout=60)
+        self._open(breaker)
+
+        calls = []
+        with pytest.raises(CircuitOpenError):
+            breaker.call(calls.append, 1)
+        assert calls == []
+        assert breaker.get_stats()["rejected"] == 1
+        assert breaker.get_stats()["times_opened"] == 1
+
+    def test_success_resets_failures(self):
+        """Test that only consecutive failures count."""
+        breaker = CircuitBreaker("dep", failure_threshold=2)
+        with pytest.raises(DependencyError):
+            breaker.call(_fail)
+        assert breaker.call(lambda: "ok") == "ok"
+        with pytest.raises(DependencyError):
+            breaker.call(_fail)
+        assert breaker.state == CLOSED
+
+    def test_ignores_other_exceptions(self):
+        """Test that errors outside failure_exceptions don't open the breaker."""
+        breaker = CircuitBreaker("dep", failure_threshold=1, failure_exceptions=(DependencyError,))
+
+        def bad_input():
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            breaker.call(bad_input)
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_closes(self):
+        """Test that after the recovery timeout one probe is let through and closes the breaker."""
+        breaker = CircuitBreaker("dep", failure_threshold=1, recovery_timeout=10)
+        with patch('src.miramind.shared.circuit_breaker.time.monotonic', return_value=100.0):
+            self._open(breaker)
+        with patch('src.miramind.shared.circuit_breaker.time.monotonic', return_value=111.0):
+            assert breaker.state == HALF_OPEN
+            assert breaker.allow_request() is True
+            assert breaker.allow_request() is False  # Only one probe at a time
+            breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_failure_reopens(self):
+        """Test that a failed probe opens the breaker for another recovery period."""
+        breaker = CircuitBreaker("dep", failure_threshold=1, recovery_timeout=10)
+        with patch('src.miramind.shared.circuit_breaker.time.monotonic', return_value=100.0):
+            self._open(breaker)
+        with patch('src.miramind.shared.circuit_breaker.time.monotonic', return_value=111.0):
+            with pytest.raises(DependencyError):
+                breaker.call(_fail)
+            assert breaker.state == OPEN
+        with patch('src.miramind.shared.circuit_breaker.time.monotonic', return_value=115.0):
+            assert breaker.state == OPEN
+        assert breaker.get_stats()["times_opened"] == 2
+
+    def test_call_async(self):
+        """Test the breaker around coroutine functions."""
+        breaker = CircuitBreaker("dep", failure_threshold=1)
+
+        async def fail():
+            raise DependencyError("down")
+
+        with pytest.raises(DependencyError):
+            asyncio.run(breaker.call_async(fail))
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(breaker.call_async(fail))
+
+
+class TestBreakerRegistry:
+    """Test suite for the process-wide breaker registry."""
+
+    def test_get_breaker_returns_shared_instance(self):
+        """Test that a dependency has one breaker, created with the first call's settings."""
+        first = get_breaker("registry-test", failure_threshold=7)
+        second = get_breaker("registry-test", failure_threshold=1)
+
+        assert first is second
+        assert first.failure_threshold == 7
+        assert get_breaker_stats()["registry-test"]["state"] == CLOSED
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.shared.histogram import (
+    BUCKET_COUNT,
+    MAX_VALUE_US,
+    LogHistogram,
+    bucket_bounds,
+    bucket_index,
+)
+
+
+class TestBuckets:
+    """Test suite for the log-bucket layout."""
+
+    def test_buckets_cover_range_without_gaps(self):
+        """Test that consecutive buckets are adjacent and map back to themselves."""
+        for index in range(BUCKET_COUNT - 1):
+            low, high = bucket_bounds(index)
+            assert bucket_index(low) == bucket_index(high) == index
+            assert bucket_bounds(index + 1)[0] == high + 1
+
+    def test_relative_error_bounded(self):
+        """Test that every bucket is at most ~3% wide relative to its values."""
+        for index in range(BUCKET_COUNT):
+            low, high = bucket_bounds(index)
+            assert (high - low) <= max(1, low) * 0.032
+
+    def test_large_values_clamped(self):
+        """Test that values beyond the range land in the last bucket."""
+        assert bucket_index(MAX_VALUE_US * 10) == BUCKET_COUNT - 1
+
+
+class TestLogHistogram:
+    """Test suite for LogHistogram."""
+
+    def test_empty(self):
+        """Test that an empty histogram has no percentiles."""
+        histogram = LogHistogram()
+        assert histogram.percentile(0.5) is None
+        assert histogram.percentiles({"p99": 0.99}) == {"p99": None}
+
+    def test_percentiles(self):
+        """Test percentiles of a uniform distribution."""
+        histogram = LogHistogram()
+        for value in range(1, 100_001):
+            histogram.record(value)
+
+        results = histogram.percentiles({"p50": 0.5, "p99": 0.99, "p999": 0.999})
+
+        assert results["p50"] == pytest.approx(50_000, rel=0.032)
+        assert results["p99"] == pytest.approx(99_000, rel=0.032)
+        assert results["p999"] == pytest.approx(99_900, rel=0.032)
+        assert histogram.percentile(1.0) == 100_000
+
+    def test_merge(self):
+        """Test that merging adds counts and keeps the exact extremes."""
+        first, second = LogHistogram(), LogHistogram()
+        first.record(10)
+        second.record(5)
+        second.record(1000)
+
+        first.merge(second)
+
+        assert first.count == 3
+        assert first.total == 1015
+        assert (first.min, first.max) == (5, 1000)
+        assert list(first.buckets()) == [(5, 1), (10, 1), (bucket_bounds(bucket_index(1000))[1], 1)]
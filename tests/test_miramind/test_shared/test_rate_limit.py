@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.shared import rate_limit
+from src.miramind.shared.rate_limit import (
+    REDIS_URL_ENV,
+    InMemoryRateLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    acquire,
+    create_rate_limiter,
+)
+
+
+class TestTokenBucket:
+    """Test suite for TokenBucket."""
+
+    def test_burst_then_smoothed(self):
+        """Test that a full bucket lets a burst through and then spaces requests out."""
+        bucket = TokenBucket(rate=2.0, capacity=2, now=0.0)
+
+        assert bucket.reserve(1, max_wait=1.0, now=0.0) == (True, 0.0)
+        assert bucket.reserve(1, max_wait=1.0, now=0.0) == (True, 0.0)
+        # Reservations that wait queue up behind each other
+        assert bucket.reserve(1, max_wait=1.0, now=0.0) == (True, 0.5)
+        assert bucket.reserve(1, max_wait=1.0, now=0.0) == (True, 1.0)
+
+    def test_rejects_past_max_wait_without_taking(self):
+        """Test that a rejected reservation reports its wait and takes nothing."""
+        bucket = TokenBucket(rate=1.0, capacity=1, now=0.0)
+        bucket.reserve(1, max_wait=0.0, now=0.0)
+
+        assert bucket.reserve(1, max_wait=0.5, now=0.0) == (False, 1.0)
+        assert bucket.reserve(1, max_wait=0.0, now=1.0) == (True, 0.0)
+
+    def test_refill_capped_at_capacity(self):
+        """Test that an idle bucket refills no further than its capacity."""
+        bucket = TokenBucket(rate=10.0, capacity=3, now=0.0)
+        bucket.reserve(3, max_wait=0.0, now=0.0)
+
+        bucket.reserve(0, max_wait=0.0, now=100.0)
+        assert bucket.tokens == 3
+
+
+class TestInMemoryRateLimiter:
+    """Test suite for InMemoryRateLimiter."""
+
+    def test_keys_have_separate_buckets(self):
+        """Test that one session using up its bucket does not slow another."""
+        limiter = InMemoryRateLimiter("session", rate=1.0, capacity=1)
+
+        assert limiter.reserve("a") == (True, 0.0)
+        assert limiter.reserve("a")[0] is False
+        assert limiter.reserve("b") == (True, 0.0)
+        assert limiter.get_stats()["rejected"] == 1
+
+    def test_refund_returns_tokens(self):
+        """Test that refunded tokens can be reserved again, up to the capacity."""
+        limiter = InMemoryRateLimiter("session", rate=0.1, capacity=2)
+        limiter.reserve("a", 2)
+        assert limiter.reserve("a")[0] is False
+
+        limiter.refund("a", 2)
+        limiter.refund("a", 2)
+        limiter.refund("unknown", 1)
+
+        assert limiter.reserve("a", 2) == (True, 0.0)
+        assert limiter.reserve("a")[0] is False
+
+    def test_least_recently_used_keys_dropped(self):
+        """Test that the number of buckets kept is bounded."""
+        limiter = InMemoryRateLimiter("session", rate=1.0, capacity=1, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.reserve(key)
+
+        assert limiter.get_stats()["keys"] == 2
+
+    def test_acquire_sleeps_for_reservation(self):
+        """Test that acquire delays a request instead of rejecting it."""
+        limiter = InMemoryRateLimiter("upstream", rate=20.0, capacity=1)
+        limiter.reserve()
+
+        start = time.monotonic()
+        acquire(limiter, max_wait=1.0)
+
+        assert time.monotonic() - start >= 0.04
+        assert limiter.get_stats()["delayed"] == 1
+
+    def test_acquire_bounded_by_deadline(self):
+        """Test that acquire fails at once when the tokens would come after the deadline."""
+        limiter = InMemoryRateLimiter("upstream", rate=1.0, capacity=1)
+        limiter.reserve()
+
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            acquire(limiter, max_wait=5.0, deadline=time.monotonic() + 0.1)
+        assert excinfo.value.retry_after == pytest.approx(1.0, abs=0.05)
+
+
+class TestBackendSelection:
+    """Test suite for choosing the limiter backend."""
+
+    def test_in_memory_by_default(self):
+        """Test that limiters are per process without a Redis URL."""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop(REDIS_URL_ENV, None)
+            limiter = create_rate_limiter("session", 1.0, 1)
+        assert isinstance(limiter, InMemoryRateLimiter)
+
+    def test_falls_back_without_redis_package(self):
+        """Test that a Redis URL without the redis package still yields a working limiter."""
+        with (
+            patch.dict(os.environ, {REDIS_URL_ENV: "redis://localhost:6379/0"}),
+            patch.object(rate_limit, "RedisRateLimiter", side_effect=ImportError),
+        ):
+            limiter = create_rate_limiter("session", 1.0, 1)
+        assert isinstance(limiter, InMemoryRateLimiter)
+
+    def test_registry_returns_same_limiter(self):
+        """Test that limiters are process-wide by name."""
+        rate_limit.reset_rate_limiters()
+        try:
+            first = rate_limit.get_rate_limiter("test", 1.0, 1)
+            assert rate_limit.get_rate_limiter("test", 5.0, 5) is first
+            assert "test" in rate_limit.get_rate_limit_stats()
+        finally:
+            rate_limit.reset_rate_limiters()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.shared.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test that concurrent calls with the same key run the work once."""
+        flight = SingleFlight("test")
+        runs = []
+
+        async def work(key):
+            runs.append(key)
+            await asyncio.sleep(0.01)
+            return f"result {key}"
+
+        async def burst():
+            return await asyncio.gather(
+                flight.do("a", lambda: work("a")),
+                flight.do("a", lambda: work("a")),
+                flight.do("b", lambda: work("b")),
+            )
+
+        assert asyncio.run(burst()) == ["result a", "result a", "result b"]
+        assert runs == ["a", "b"]
+        assert flight.get_stats() == {"executed": 2, "coalesced": 1, "in_flight": 0}
+
+    def test_results_not_kept_after_flight(self):
+        """Test that a call after the previous one finished runs the work again."""
+        flight = SingleFlight("test")
+        runs = []
+
+        async def work():
+            runs.append(1)
+            return len(runs)
+
+        async def sequential():
+            return [await flight.do("a", work), await flight.do("a", work)]
+
+        assert asyncio.run(sequential()) == [1, 2]
+
+    def test_exception_shared(self):
+        """Test that every caller of a failed flight gets its exception."""
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def burst():
+            return await asyncio.gather(
+                flight.do("a", work), flight.do("a", work), return_exceptions=True
+            )
+
+        results = asyncio.run(burst())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the work goes on for the other callers when the first is cancelled."""
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            first = asyncio.create_task(flight.do("a", work))
+            second = asyncio.create_task(flight.do("a", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from src.miramind.shared import tracing
+from src.miramind.shared.tracing import (
+    ChromeTraceExporter,
+    OTLPFileExporter,
+    current_span,
+    in_context,
+    server_timing,
+    span,
+    start_trace,
+    to_otlp,
+)
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, spans):
+        self.exported.append(spans)
+
+
+class TestSpans:
+    """Test suite for span propagation."""
+
+    def test_span_outside_trace_is_noop(self):
+        """Test that span() records nothing without a trace."""
+        with span("work") as work:
+            assert work is None
+        assert current_span() is None
+
+    def test_nested_spans(self):
+        """Test that spans are children of the span open around them."""
+        with start_trace("request") as root:
+            with span("outer") as outer:
+                with span("inner", key="value") as inner:
+                    pass
+
+        assert outer.parent_id == root.span_id
+        assert inner.parent_id == outer.span_id
+        assert inner.attributes == {"key": "value"}
+        assert [s.name for s in root.trace.finished_spans()] == ["inner", "outer", "request"]
+        assert current_span() is None
+
+    def test_error_recorded(self):
+        """Test that an exception marks the span as failed."""
+        with start_trace("request") as root:
+            try:
+                with span("failing"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+
+        failing = root.trace.finished_spans()[0]
+        assert "boom" in failing.error
+
+    def test_in_context_propagates_to_thread_pool(self):
+        """Test that work submitted with in_context joins the caller's trace."""
+
+        def work():
+            with span("in_thread"):
+                pass
+
+        with start_trace("request") as root, ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(in_context(work)).result()
+
+        in_thread = root.trace.finished_spans()[0]
+        assert in_thread.name == "in_thread"
+        assert in_thread.parent_id == root.span_id
+
+    def test_asyncio_tasks_inherit_trace(self):
+        """Test that spans in concurrent tasks attach to the request's trace."""
+
+        async def stage(name):
+            with span(name):
+                await asyncio.sleep(0)
+
+        async def request():
+            with start_trace("request") as root:
+                await asyncio.gather(stage("a"), stage("b"), asyncio.to_thread(lambda: None))
+            return root
+
+        root = asyncio.run(request())
+        names = {s.name for s in root.trace.finished_spans()}
+        assert names == {"a", "b", "request"}
+
+    def test_server_timing(self):
+        """Test that Server-Timing sums the durations per span name."""
+        with start_trace("request") as root:
+            for _ in range(2):
+                with span("openai"):
+                    pass
+            with span("text to speech"):
+                pass
+
+        header = server_timing(root.trace, exclude=root)
+        names = [entry.split(";")[0] for entry in header.split(", ")]
+        assert names == ["openai", "text_to_speech"]
+        assert "request" not in header
+
+
+class TestExporters:
+    """Test suite for trace exporters."""
+
+    def test_otlp_json(self):
+        """Test the OTLP/JSON structure of a trace."""
+        with start_trace("request") as root:
+            with span("openai", model="gpt-4o-mini"):
+                pass
+
+        request = to_otlp(root.trace.finished_spans())
+        spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        child, parent = spans
+
+        assert len(child["traceId"]) == 32 and len(child["spanId"]) == 16
+        assert child["parentSpanId"] == parent["spanId"]
+        assert "parentSpanId" not in parent
+        assert child["attributes"] == [{"key": "model", "value": {"stringValue": "gpt-4o-mini"}}]
+        assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+
+    def test_file_exporters(self, tmp_path):
+        """Test that OTLP and Chrome trace files are written in their formats."""
+        with start_trace("request") as root:
+            with span("stage"):
+                pass
+        spans = root.trace.finished_spans()
+
+        otlp_path = tmp_path / "traces.jsonl"
+        OTLPFileExporter(str(otlp_path)).export(spans)
+        assert json.loads(otlp_path.read_text())["resourceSpans"]
+
+        chrome_path = tmp_path / "trace.json"
+        exporter = ChromeTraceExporter(str(chrome_path))
+        exporter.export(spans)
+        exporter.export(spans)
+        # The open array is valid trace-event JSON once closed
+        events = json.loads(chrome_path.read_text().rstrip(",\n") + "]")
+        assert [event["name"] for event in events] == ["stage", "request"] * 2
+        assert events[0]["ph"] == "X"
+
+    def test_traces_exported_in_background(self):
+        """Test that finished traces are handed to the configured exporters."""
+        exporter = CollectingExporter()
+        tracing.set_exporters([exporter])
+        try:
+            with start_trace("request"):
+                with span("stage"):
+                    pass
+            tracing.flush()
+        finally:
+            tracing.set_exporters([])
+
+        assert [[s.name for s in spans] for spans in exporter.exported] == [["stage", "request"]]